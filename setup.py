@@ -5,6 +5,10 @@ setup(
     version='0.6.2',
     packages=['simplemodels'],
     install_requires=['six'],
+    extras_require={
+        'parallel': ['futures; python_version < "3"'],
+        'numpy': ['numpy'],
+    },
     url='https://github.com/prawn-cake/simple-models',
     license='MIT',
     author='Maksim Ekimovskii',
@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+"""Asyncio construction path of documents, python 3.5+ only.
+
+Coroutine field validators and `validate_<field>` hooks are skipped by the
+regular synchronous constructor, it issues `AsyncValidationWarning`.
+`create` builds the document synchronously first and then awaits them:
+validators of all fields (nested documents included) run concurrently,
+hooks run after all fields are validated.
+"""
+import asyncio
+
+from simplemodels.fields import DocumentField, ListField
+from simplemodels.models import _find_validation_hooks
+from simplemodels.utils import awaiting_async, is_document
+
+__all__ = ['create', 'validate', 'has_async_validation']
+
+
+async def create(model, data=None, **kwargs):
+    """Create a document and run its async validators.
+
+    :param model: Document class
+    :param data: document data mapping
+    :param kwargs: init parameters, see `Document.__init__`
+    :return: document
+    """
+    with awaiting_async():
+        document = model(data, **kwargs)
+    await validate(document)
+    return document
+
+
+async def validate(document):
+    """Run async field validators and async post-init hooks of the document
+    and its nested documents. It's a no-op for documents without them.
+
+    :param document: Document instance
+    """
+    cls = type(document)
+    if not has_async_validation(cls):
+        return
+
+    # Lazy nested documents are built on access, their coroutine validators
+    # are awaited here
+    with awaiting_async():
+        checks = [
+            _validate_field(cls._fields[name], document[name], validators)
+            for name, validators in cls._async_validators.items()]
+        for name, field in cls._fields.items():
+            nested_model = _nested_model(field)
+            if nested_model is None or \
+                    not has_async_validation(nested_model):
+                continue
+            value = document[name]
+            if value is None:
+                continue
+            if isinstance(field, DocumentField):
+                checks.append(validate(value))
+            else:
+                checks.extend(validate(item) for item in value)
+    if checks:
+        await asyncio.gather(*checks)
+
+    hooks = cls._async_validation_hooks
+    if document._extra_fields:
+        hooks += _find_validation_hooks(
+            cls, document._extra_fields, is_async=True)
+    if hooks:
+        with awaiting_async():
+            hooks = [method(document, document[field_name])
+                     for field_name, _, method in hooks]
+        await asyncio.gather(*hooks)
+
+
+def has_async_validation(model, _seen=None):
+    """Check if the model or its nested models have async validators or
+    hooks, i.e. the async construction path makes sense for the model.
+
+    :param model: Document class
+    :return: bool
+    """
+    _seen = _seen or set()
+    if model in _seen:
+        return False
+    _seen.add(model)
+
+    # extra fields may have async hooks
+    if model._async_validators or model._async_validation_hooks or \
+            model._meta['ALLOW_EXTRA_FIELDS']:
+        return True
+    for field in model._fields.values():
+        nested_model = _nested_model(field)
+        if nested_model is not None and \
+                has_async_validation(nested_model, _seen):
+            return True
+    return False
+
+
+def _nested_model(field):
+    """Get the model of nested documents of the field if any"""
+    if isinstance(field, DocumentField):
+        model = field._model
+    elif isinstance(field, ListField):
+        model = field._of
+    else:
+        return None
+    if field._reference is not None:
+        model = field._reference.get()
+    return model if is_document(model) else None
+
+
+async def _validate_field(field, value, validators):
+    value = field._extract_value(value)
+    for validator in validators:
+        if not await validator(value):
+            raise field._validation_error(value, validator)
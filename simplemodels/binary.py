@@ -0,0 +1,586 @@
+# -*- coding: utf-8 -*-
+"""Compact binary serialization of documents.
+
+Field values are written positionally, ordered by field names, without
+the names: integers as zigzag varints, floats as raw little-endian doubles,
+datetimes as epoch microseconds followed by the UTC offset of timezone
+aware values, strings length-prefixed utf-8, nested documents and lists
+recursively. Values of other fields are written as
+length-prefixed JSON of their `to_python` result.
+
+The header holds the schema fingerprint, data written by another version
+of the model is rejected. Decoding is the same as `Document.construct` of
+the `as_dict` result, so use it for the data of trusted services only or
+pass `validate=True`.
+
+Usage:
+
+    from simplemodels import binary
+
+    payload = binary.dumps(post)
+    post = binary.loads(Post, payload)
+"""
+import array
+import hashlib
+import json
+import struct
+import sys
+from datetime import datetime, timedelta, tzinfo
+from decimal import Decimal
+
+import six
+
+from simplemodels.compiler import _CodeBuilder, defined_by, slot_member
+from simplemodels.exceptions import DocumentError
+from simplemodels.fields import BooleanField, CharField, DateTimeField, \
+    DecimalField, DocumentField, FloatField, IntegerField, ListField, \
+    SimpleField
+from simplemodels.utils import owned_data_kwargs
+
+__all__ = ['dumps', 'loads', 'dumps_many', 'loads_many', 'fingerprint']
+
+MAGIC = b'SMB\x01'
+HEADER_SIZE = len(MAGIC) + 8
+
+_DOUBLE = struct.Struct('<d')
+_INT64 = struct.Struct('<q')
+_BYTES = [six.int2byte(i) for i in range(256)]
+_EPOCH = datetime(1970, 1, 1)
+
+
+class _FixedOffset(tzinfo):
+    """Timezone of decoded timezone aware datetimes, it keeps the UTC offset
+    of the written value
+    """
+
+    def __init__(self, offset, name):
+        self._offset = offset
+        self._name = name
+
+    def utcoffset(self, dt):
+        return self._offset
+
+    def tzname(self, dt):
+        return self._name
+
+    def dst(self, dt):
+        return timedelta(0)
+
+    def __reduce__(self):
+        return _FixedOffset, (self._offset, self._name)
+
+    def __repr__(self):
+        return '<%s>' % self._name
+
+
+UTC = _FixedOffset(timedelta(0), 'UTC')
+
+
+def dumps(document):
+    """Serialize the document
+
+    :param document: Document instance
+    :return: bytes
+    """
+    codec = _codec(type(document))
+    parts = [codec.header]
+    codec.encode(document, parts.append)
+    return b''.join(parts)
+
+
+def loads(model, data, validate=False):
+    """Deserialize the document
+
+    :param model: Document class
+    :param data: bytes of the `dumps` result
+    :param validate: create the document the regular way instead of
+    `model.construct`
+    :return: document
+    :raise DocumentError: if the data is written by another schema
+    :raise ValueError: if the data is malformed
+    """
+    return _read(model, data, validate, many=False)
+
+
+def dumps_many(model, documents):
+    """Serialize documents of the same model, the header is written once
+
+    :param model: Document class
+    :param documents: iterable of documents
+    :return: bytes
+    """
+    codec = _codec(model)
+    documents = list(documents)
+    parts = [codec.header, _varint(len(documents))]
+    encode, append = codec.encode, parts.append
+    for document in documents:
+        encode(document, append)
+    return b''.join(parts)
+
+
+def loads_many(model, data, validate=False):
+    """Deserialize documents of the `dumps_many` result
+
+    :return: list of documents
+    :raise DocumentError: if the data is written by another schema
+    :raise ValueError: if the data is malformed
+    """
+    return _read(model, data, validate, many=True)
+
+
+def fingerprint(model):
+    """Get the schema fingerprint of the model: field names, their value
+    kinds and fingerprints of nested models.
+
+    :param model: Document class
+    :return: 8 bytes
+    """
+    return _codec(model).fingerprint
+
+
+def _decode(decode, buf, pos):
+    try:
+        return decode(buf, pos)
+    except (IndexError, struct.error, OverflowError):
+        raise ValueError('Truncated data')
+
+
+def _read(model, data, validate, many):
+    codec = _codec(model)
+    buf = bytearray(data)
+    if buf[:len(MAGIC)] != MAGIC:
+        raise ValueError('Not a simplemodels binary data')
+    if buf[len(MAGIC):HEADER_SIZE] != codec.fingerprint:
+        raise DocumentError(
+            "Data is written by an incompatible schema of '%s' model"
+            % model.__name__)
+
+    if validate:
+        kwargs = owned_data_kwargs(model, {})
+        create = lambda row: model(row, **kwargs)
+    else:
+        create = model.construct
+    decode = codec.decode
+    if many:
+        count, pos = _decode(_read_varint, buf, HEADER_SIZE)
+        result = []
+        for _ in range(count):
+            row, pos = _decode(decode, buf, pos)
+            result.append(create(row))
+    else:
+        row, pos = _decode(decode, buf, HEADER_SIZE)
+        result = create(row)
+    if pos != len(buf):
+        raise ValueError('Truncated data' if pos > len(buf)
+                         else 'Extra data after the document')
+    return result
+
+
+def _codec(model):
+    """Get the codec of the model, it's compiled on the first use and kept
+    in the class. The codec of the class which schema is refreshed since
+    then is rebuilt, see `DocumentMeta.refresh_schema`.
+    """
+    codec = model.__dict__.get('_binary_codec')
+    if codec is None or codec.init_fields is not model._init_fields:
+        codec = _Codec(model)
+        model._binary_codec = codec
+    return codec
+
+
+class _Codec(object):
+
+    def __init__(self, model):
+        self.init_fields = model._init_fields
+        kinds = [(field, _field_kind(field)) for field in _ordered(model)]
+        # the same schema gets the same fingerprint on python 2 and 3
+        self.fingerprint = hashlib.sha1(json.dumps(
+            _schema(model, set())).encode('utf-8')).digest()[:8]
+        self.header = MAGIC + self.fingerprint
+        self.encode = _compile_encode(model, kinds)
+        self.decode = _compile_decode(model, kinds)
+
+
+def _ordered(model):
+    """Get fields of the model in the order which doesn't depend on
+    the python version
+    """
+    return sorted(model._fields.values(), key=lambda field: field.name)
+
+
+class _Nested(object):
+    """Codec of the nested model, string model references are resolved on
+    the first use
+    """
+
+    def __init__(self, field):
+        self._field = field
+
+    def get(self):
+        return _codec(_nested_model(self._field))
+
+
+def _nested_model(field):
+    if field._reference is not None:
+        return field._reference.resolve()
+    return field._of if isinstance(field, ListField) else field._model
+
+
+# Value kinds by the `_typecast` class of fields with the default
+# `to_python`, values of the rest of fields are written as JSON
+_KINDS = {
+    IntegerField: 'int',
+    FloatField: 'float',
+    BooleanField: 'bool',
+    CharField: 'text',
+    DecimalField: 'decimal',
+}
+
+# Value kinds of list items by `ListField(of=...)`
+_ITEM_KINDS = {
+    int: 'int',
+    float: 'float',
+    bool: 'bool',
+    str: 'text',
+    six.text_type: 'text',
+}
+
+
+def _field_kind(field):
+    """Get the kind of field values.
+
+    :return: kind name or tuple ('list', kind of items)
+    """
+    to_python_cls = defined_by(field, 'to_python')
+    if to_python_cls is SimpleField:
+        return _KINDS.get(defined_by(field, '_typecast'), 'json')
+    elif to_python_cls is DateTimeField:
+        return 'datetime'
+    elif to_python_cls is DocumentField:
+        return 'document'
+    elif to_python_cls is ListField:
+        if field._reference is not None or hasattr(field._of, 'as_dict'):
+            return 'list', 'document'
+        if field._of in _ITEM_KINDS:
+            return 'list', _ITEM_KINDS[field._of]
+    return 'json'
+
+
+def _schema(model, seen):
+    """Describe the model schema, nested models are described once"""
+    name = '%s.%s' % (model.__module__, model.__name__)
+    if model in seen:
+        return name
+    seen.add(model)
+    schema = [name, bool(model._meta['ALLOW_EXTRA_FIELDS'])]
+    for field in _ordered(model):
+        kind = _field_kind(field)
+        nested = None
+        if 'document' in (kind, kind[1]):
+            nested = _schema(_nested_model(field), seen)
+        schema.append((field.name, kind, nested))
+    return schema
+
+
+def _varint(value):
+    if value < 0x80:
+        return _BYTES[value]
+    result = bytearray()
+    while value >= 0x80:
+        result.append(value & 0x7f | 0x80)
+        value >>= 7
+    result.append(value)
+    return bytes(result)
+
+
+def _read_varint(buf, pos):
+    result = shift = 0
+    while True:
+        byte = buf[pos]
+        pos += 1
+        result |= (byte & 0x7f) << shift
+        if byte < 0x80:
+            return result, pos
+        shift += 7
+
+
+def _utf8(value):
+    if isinstance(value, six.binary_type):
+        return value
+    return six.text_type(value).encode('utf-8')
+
+
+def _datetime_to_int(value):
+    """Get epoch microseconds shifted left by one bit, the lowest bit is
+    set for timezone aware values, they are stored in UTC
+    """
+    aware = 0
+    if value.tzinfo is not None and value.utcoffset() is not None:
+        value = value.replace(tzinfo=None) - value.utcoffset()
+        aware = 1
+    delta = value - _EPOCH
+    return ((delta.days * 86400 + delta.seconds) * 1000000 +
+            delta.microseconds) * 2 + aware
+
+
+def _utc_offset(value):
+    """Get UTC offset in seconds of timezone aware datetime"""
+    offset = value.utcoffset()
+    return offset.days * 86400 + offset.seconds
+
+
+def _int_to_datetime(value, offset=None):
+    """
+    :param value: integer, see `_datetime_to_int`
+    :param offset: UTC offset in seconds of timezone aware values
+    :return: datetime
+    """
+    result = _EPOCH + timedelta(microseconds=value >> 1)
+    if value & 1:
+        if not offset:
+            return result.replace(tzinfo=UTC)
+        offset = timedelta(seconds=offset)
+        result = (result + offset).replace(
+            tzinfo=_FixedOffset(offset, _offset_name(offset)))
+    return result
+
+
+def _offset_name(offset):
+    seconds = offset.days * 86400 + offset.seconds
+    sign = '-' if seconds < 0 else '+'
+    minutes, seconds = divmod(abs(seconds), 60)
+    name = 'UTC%s%02d:%02d' % (sign, minutes // 60, minutes % 60)
+    return name + (':%02d' % seconds if seconds else '')
+
+
+def _dump_json(value):
+    return json.dumps(value, separators=(',', ':'))
+
+
+def _floats_to_bytes(value):
+    if isinstance(value, array.array) and value.typecode == 'd':
+        if sys.byteorder != 'little':
+            value = array.array('d', value)
+            value.byteswap()
+        return value.tostring() if six.PY2 else value.tobytes()
+    return struct.pack('<%dd' % len(value), *value)
+
+
+def _bools_to_bytes(value):
+    return bytes(bytearray([1 if item else 0 for item in value]))
+
+
+def _bind_helpers(builder):
+    for name, value in (
+            ('BYTES', _BYTES), ('VARINT', _varint), ('READ', _read_varint),
+            ('TEXT', six.text_type), ('UTF8', _utf8), ('DOUBLE', _DOUBLE),
+            ('INT64', _INT64), ('DT_INT', _datetime_to_int),
+            ('INT_DT', _int_to_datetime), ('UTC_OFFSET', _utc_offset),
+            ('DECIMAL', Decimal),
+            ('DUMP_JSON', _dump_json), ('LOAD_JSON', json.loads),
+            ('FLOATS', _floats_to_bytes), ('BOOLS', _bools_to_bytes),
+            ('unpack_from', struct.unpack_from)):
+        builder.bind(name, value)
+
+
+# Generated code of writing the `x` variable of the kind, the output is
+# written by the `append` function
+_WRITE_VARINT = ['append(BYTES[x] if x < 128 else VARINT(x))']
+_WRITE_TEXT = [
+    "x = x.encode('utf-8') if type(x) is TEXT else UTF8(x)",
+    'size = len(x)',
+    'append(BYTES[size] if size < 128 else VARINT(size))',
+    'append(x)',
+]
+# zigzag encoding of signed integers
+_WRITE_INT = ['x = x << 1 if x >= 0 else (-x << 1) - 1'] + _WRITE_VARINT
+_WRITE_LINES = {
+    'int': _WRITE_INT,
+    'float': ['append(DOUBLE.pack(x))'],
+    'bool': ["append(b'\\x01' if x else b'\\x00')"],
+    'text': _WRITE_TEXT,
+    'decimal': ['x = TEXT(x)'] + _WRITE_TEXT,
+    # UTC offset of timezone aware values follows the timestamp
+    'datetime': [
+        'value = x',
+        'x = DT_INT(x)',
+        'append(INT64.pack(x))',
+        'if x & 1:',
+        '    x = UTC_OFFSET(value)',
+    ] + ['    ' + line for line in _WRITE_INT],
+    'json': ['x = DUMP_JSON(x)'] + _WRITE_TEXT,
+}
+
+# Generated code of reading the `x` variable of the kind from the `buf`
+# buffer at the `pos` position
+_READ_VARINT = [
+    'x = buf[pos]',
+    'if x < 128:',
+    '    pos += 1',
+    'else:',
+    '    x, pos = READ(buf, pos)',
+]
+_READ_TEXT = _READ_VARINT + [
+    'end = pos + x',
+    "x = buf[pos:end].decode('utf-8')",
+    'pos = end',
+]
+_READ_INT = _READ_VARINT + ['x = (x >> 1) ^ -(x & 1)']
+_READ_LINES = {
+    'int': _READ_INT,
+    'float': ['x = DOUBLE.unpack_from(buf, pos)[0]', 'pos += 8'],
+    'bool': ['x = buf[pos] == 1', 'pos += 1'],
+    'text': _READ_TEXT,
+    'decimal': _READ_TEXT + ['x = DECIMAL(x)'],
+    'datetime': [
+        'stamp = INT64.unpack_from(buf, pos)[0]',
+        'pos += 8',
+        'if stamp & 1:',
+    ] + ['    ' + line for line in _READ_INT] + [
+        '    x = INT_DT(stamp, x)',
+        'else:',
+        '    x = INT_DT(stamp)',
+    ],
+    'json': _READ_TEXT + ['x = LOAD_JSON(x)'],
+}
+
+
+def _add_lines(builder, lines, indent):
+    for line in lines:
+        builder.add(line, indent)
+
+
+def _compile_encode(model, kinds):
+    """Compile the function which writes document values
+
+    :return: function(document, append)
+    """
+    builder = _CodeBuilder()
+    _bind_helpers(builder)
+    builder.bind('cls', model)
+    builder.add('def encode(self, append):', indent=0)
+    members = [slot_member(model, field) for field, _ in kinds]
+    if any(member is None for member in members):
+        builder.add('storage = self.__dict__')
+
+    for idx, ((field, kind), member) in enumerate(zip(kinds, members)):
+        if defined_by(field, '__get__') is not SimpleField:
+            getter = builder.bind('g%d' % idx, field.__get__)
+            builder.add('v%d = %s(self, cls)' % (idx, getter))
+        elif member is not None:
+            builder.add('v%d = self.%s' % (idx, field._name))
+        else:
+            key = builder.bind('k%d' % idx, field.name)
+            builder.add('v%d = storage.get(%s)' % (idx, key))
+
+    # bit mask of None values
+    builder.add('x = %s' % (' | '.join(
+        '(v%d is None) << %d' % (idx, idx) for idx in range(len(kinds)))
+        or '0'))
+    _add_lines(builder, _WRITE_VARINT, 1)
+
+    for idx, (field, kind) in enumerate(kinds):
+        builder.add('x = v%d' % idx)
+        builder.add('if x is not None:')
+        if kind == 'json' and \
+                defined_by(field, 'to_python') is not SimpleField:
+            to_python = builder.bind('tp%d' % idx, field.to_python)
+            builder.add('x = %s(x)' % to_python, 2)
+
+        if kind == 'document':
+            nested = builder.bind('n%d' % idx, _Nested(field))
+            builder.add('%s.get().encode(x, append)' % nested, 2)
+        elif not isinstance(kind, tuple):
+            _add_lines(builder, _WRITE_LINES[kind], 2)
+        else:
+            builder.add('items = x', 2)
+            builder.add('x = len(items)', 2)
+            _add_lines(builder, _WRITE_VARINT, 2)
+            item_kind = kind[1]
+            if item_kind == 'float':
+                builder.add('append(FLOATS(items))', 2)
+            elif item_kind == 'bool':
+                builder.add('append(BOOLS(items))', 2)
+            elif item_kind == 'document':
+                nested = builder.bind('n%d' % idx, _Nested(field))
+                builder.add('encode = %s.get().encode' % nested, 2)
+                builder.add('for x in items:', 2)
+                builder.add('encode(x, append)', 3)
+            else:
+                builder.add('for x in items:', 2)
+                _add_lines(builder, _WRITE_LINES[item_kind], 3)
+
+    if model._meta['ALLOW_EXTRA_FIELDS']:
+        builder.add('x = len(self._extra_fields)')
+        _add_lines(builder, _WRITE_VARINT, 1)
+        builder.add('for name in self._extra_fields:')
+        builder.add('x = name', 2)
+        _add_lines(builder, _WRITE_TEXT, 2)
+        builder.add('x = getattr(self, name)', 2)
+        _add_lines(builder, _WRITE_LINES['json'], 2)
+
+    filename = '<simplemodels %s.%s binary encode>' % (
+        model.__module__, model.__name__)
+    return builder.build('encode', filename)
+
+
+def _compile_decode(model, kinds):
+    """Compile the function which reads document values to the dict
+
+    :return: function(buf, pos) -> (data, pos)
+    """
+    builder = _CodeBuilder()
+    _bind_helpers(builder)
+    builder.add('def decode(buf, pos):', indent=0)
+    builder.add('data = {}')
+    _add_lines(builder, _READ_VARINT, 1)
+    builder.add('nulls = x')
+
+    for idx, (field, kind) in enumerate(kinds):
+        key = builder.bind('k%d' % idx, field.name)
+        builder.add('if nulls & %d:' % (1 << idx))
+        builder.add('data[%s] = None' % key, 2)
+        builder.add('else:')
+        if kind == 'document':
+            nested = builder.bind('n%d' % idx, _Nested(field))
+            builder.add('x, pos = %s.get().decode(buf, pos)' % nested, 2)
+        elif not isinstance(kind, tuple):
+            _add_lines(builder, _READ_LINES[kind], 2)
+        else:
+            _add_lines(builder, _READ_VARINT, 2)
+            item_kind = kind[1]
+            if item_kind == 'float':
+                builder.add("items = list(unpack_from('<%dd' % x, buf, pos))",
+                            2)
+                builder.add('pos += 8 * x', 2)
+            elif item_kind == 'bool':
+                builder.add('end = pos + x', 2)
+                builder.add('items = [x == 1 for x in buf[pos:end]]', 2)
+                builder.add('pos = end', 2)
+            elif item_kind == 'document':
+                nested = builder.bind('n%d' % idx, _Nested(field))
+                builder.add('decode = %s.get().decode' % nested, 2)
+                builder.add('items = []', 2)
+                builder.add('for _ in range(x):', 2)
+                builder.add('x, pos = decode(buf, pos)', 3)
+                builder.add('items.append(x)', 3)
+            else:
+                builder.add('items = []', 2)
+                builder.add('for _ in range(x):', 2)
+                _add_lines(builder, _READ_LINES[item_kind], 3)
+                builder.add('items.append(x)', 3)
+            builder.add('x = items', 2)
+        builder.add('data[%s] = x' % key, 2)
+
+    if model._meta['ALLOW_EXTRA_FIELDS']:
+        _add_lines(builder, _READ_VARINT, 1)
+        builder.add('for _ in range(x):')
+        _add_lines(builder, _READ_TEXT, 2)
+        builder.add('name = x', 2)
+        _add_lines(builder, _READ_LINES['json'], 2)
+        builder.add('data[name] = x', 2)
+
+    builder.add('return data, pos')
+    filename = '<simplemodels %s.%s binary decode>' % (
+        model.__module__, model.__name__)
+    return builder.build('decode', filename)
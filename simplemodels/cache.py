@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+"""Bounded caches, e.g. interning of immutable documents, see
+`ImmutableDocument.intern`.
+"""
+from collections import Mapping, MutableSequence, OrderedDict
+
+import six
+
+__all__ = ['LRUCache', 'freeze']
+
+
+class LRUCache(object):
+    """Mapping-like cache which keeps up to `size` recently used items"""
+
+    def __init__(self, size):
+        """
+        :param size: max number of items
+        """
+        self.size = size
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+
+    def get(self, key, default=None):
+        data = self._data
+        try:
+            # move the item to the end of the queue
+            value = data.pop(key)
+        except KeyError:
+            self.misses += 1
+            return default
+        data[key] = value
+        self.hits += 1
+        return value
+
+    def __setitem__(self, key, value):
+        data = self._data
+        data.pop(key, None)
+        data[key] = value
+        while len(data) > self.size:
+            try:
+                data.popitem(last=False)
+            except KeyError:  # emptied by another thread
+                break
+
+    def __contains__(self, key):
+        return key in self._data
+
+    def __len__(self):
+        return len(self._data)
+
+    def clear(self):
+        self._data.clear()
+        self.hits = self.misses = 0
+
+    def __repr__(self):
+        return '<%s: %d/%d items, %d hits, %d misses>' % (
+            self.__class__.__name__, len(self), self.size,
+            self.hits, self.misses)
+
+
+def freeze(value):
+    """Build a hashable canonical representation of the raw data, equal data
+    gets equal keys regardless of the mappings order. Values are tagged with
+    their types, so e.g. `1`, `1.0` and `True` get different keys.
+
+    :param value: data of json-like structure
+    :return: hashable value
+    :raise TypeError: if the value has unhashable items, e.g. sets
+    """
+    cls = type(value)
+    # exact types are checked first, abstract ones are slow
+    if cls is six.text_type:
+        return value
+    if cls is dict:
+        return dict, frozenset([(key, freeze(item))
+                                for key, item in value.items()])
+    if cls is list:
+        return list, tuple([freeze(item) for item in value])
+    if isinstance(value, Mapping):
+        return dict, frozenset([(key, freeze(item))
+                                for key, item in six.iteritems(value)])
+    if isinstance(value, (tuple, MutableSequence)):
+        return list, tuple([freeze(item) for item in value])
+    key = cls, value
+    hash(key)
+    return key
@@ -0,0 +1,296 @@
+# -*- coding: utf-8 -*-
+"""Columnar (struct-of-arrays) storage of documents for bulk analytics.
+
+It requires numpy: pip install simple-models[numpy]
+"""
+import warnings
+
+import six
+
+from simplemodels.compiler import defined_by
+from simplemodels.fields import BooleanField, CharField, DateTimeField, \
+    FloatField, IntegerField, SimpleField
+from simplemodels.utils import owned_data_kwargs
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+__all__ = ['DocumentBatch']
+
+_NUMBERS = six.integer_types + (float, bool)
+
+
+# Field classes which values are stored in numpy typed columns:
+# {field class: (dtype, null value, python types which numpy converts
+# the same way as the field)}
+_COLUMN_TYPES = {
+    IntegerField: ('int64', 0, six.integer_types + (bool,)),
+    FloatField: ('float64', float('nan'), six.integer_types + (float, bool)),
+    BooleanField: ('bool', False, (bool,)),
+    DateTimeField: ('datetime64[us]', 'NaT', ()),
+}
+
+
+class DocumentBatch(object):
+    """Documents of the same model stored by columns, one numpy array per
+    field.
+
+    Integer, float and boolean fields are stored in columns of the numpy
+    types, datetime fields in `datetime64[us]` columns, char fields and
+    the rest of fields are stored in object columns. Null (None) values
+    are marked in the `nulls` masks.
+
+    Usage:
+
+        batch = DocumentBatch.from_rows(Event, rows)
+        batch.column('duration').mean()
+        event = batch[0]  # Event instance
+    """
+
+    def __init__(self, model, columns, nulls, errors=None):
+        """
+        :param model: Document class
+        :param columns: dict of {field name: numpy array}
+        :param nulls: dict of {field name: boolean numpy array of nulls}
+        :param errors: dict of {row index: validation error}
+        """
+        self.model = model
+        self.columns = columns
+        self.nulls = nulls
+        self.errors = errors or {}
+
+    @classmethod
+    def from_rows(cls, model, rows, raise_errors=True,
+                  fixed_width_chars=False):
+        """Build the batch from the data mappings, values are cast and
+        validated by columns.
+
+        Fields validators are run, `validate_<field>` hooks are not, they
+        are run on the document access.
+
+        :param model: Document class
+        :param rows: iterable of data mappings, e.g. dicts or documents
+        :param raise_errors: raise the error of the first invalid row,
+        otherwise invalid rows are reported in the `errors` attribute
+        :param fixed_width_chars: store char fields in fixed width unicode
+        columns instead of object ones
+        :return: DocumentBatch
+        :raise ValidationError:
+        """
+        if np is None:
+            raise ImportError("DocumentBatch requires 'numpy' package")
+
+        rows = list(rows)
+        columns, nulls, errors = {}, {}, {}
+        for name, field in model._fields.items():
+            values = _field_values(field, rows)
+            column, column_nulls = _build_column(
+                field, values, errors, fixed_width_chars)
+            columns[name] = column
+            nulls[name] = column_nulls
+
+        if errors and raise_errors:
+            raise errors[min(errors)]
+        return cls(model, columns, nulls, errors)
+
+    @property
+    def valid(self):
+        """Boolean mask of valid rows"""
+        mask = np.ones(len(self), dtype=bool)
+        mask[list(self.errors)] = False
+        return mask
+
+    def column(self, name):
+        return self.columns[name]
+
+    def __len__(self):
+        for column in self.columns.values():
+            return len(column)
+        return 0
+
+    def __getitem__(self, index):
+        """Get the document of the row
+
+        :param index: row index
+        :return: Document instance
+        """
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError('batch index out of range')
+        if index in self.errors:
+            raise self.errors[index]
+        return self.model(self._row(index),
+                          **owned_data_kwargs(self.model, {}))
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+
+    def _row(self, index):
+        return {name: _to_python(column[index], self.nulls[name][index])
+                for name, column in self.columns.items()}
+
+    def to_dicts(self):
+        """Convert the batch to the list of dicts with the same values as
+        the documents have, invalid rows are skipped.
+
+        :return: list of dicts
+        """
+        names = list(self.columns)
+        values = [self._column_values(name) for name in names]
+        return [dict(zip(names, row)) for index, row in enumerate(zip(*values))
+                if index not in self.errors]
+
+    def _column_values(self, name):
+        column, nulls = self.columns[name], self.nulls[name]
+        if column.dtype.kind == 'M':
+            values = column.astype('datetime64[us]').tolist()
+        else:
+            values = column.tolist()
+        if nulls.any():
+            for index in np.flatnonzero(nulls).tolist():
+                values[index] = None
+        return values
+
+    def __repr__(self):
+        return '<%s of %s: %d rows>' % (
+            self.__class__.__name__, self.model.__name__, len(self))
+
+
+def _field_values(field, rows):
+    """Get the field values of the rows, defaults are applied"""
+    name = field.name
+    values = []
+    append = values.append
+    for row in rows:
+        if name in row:
+            append(row[name])
+        else:
+            append(field.default)
+    return values
+
+
+def _typecast(field, values, errors):
+    """Cast the values one by one as the document does, errors are
+    reported per row
+    """
+    result = []
+    for index, value in enumerate(values):
+        try:
+            value = field._typecast(value)
+        except Exception as err:
+            errors.setdefault(index, err)
+            value = None
+        result.append(value)
+    return result
+
+
+def _build_column(field, values, errors, fixed_width_chars):
+    """Build the typed column of the field values and validate them.
+
+    :return: tuple (column, nulls)
+    """
+    column_type = _COLUMN_TYPES.get(defined_by(field, '_typecast'))
+    types = column_type[2] if column_type else ()
+    if not all(type(value) in types for value in values):
+        values = _typecast(field, values, errors)
+
+    nulls = np.fromiter((value is None for value in values), bool,
+                        len(values))
+    column = None
+    if column_type is not None:
+        dtype, null_value, _ = column_type
+        try:
+            with warnings.catch_warnings():
+                warnings.simplefilter('error')
+                column = np.array(
+                    [null_value if value is None else value
+                     for value in values], dtype=dtype)
+        except (TypeError, ValueError, OverflowError, DeprecationWarning):
+            # e.g. timezone aware datetime values or big integers
+            pass
+    elif fixed_width_chars and defined_by(field, '_typecast') is CharField:
+        width = max([len(value) for value in values if value] or [1])
+        column = np.array([u'' if value is None else value
+                           for value in values], dtype='U%d' % width)
+    if column is None:
+        # values may be sequences, they're set one by one to prevent
+        # broadcasting
+        column = np.empty(len(values), dtype=object)
+        for index, value in enumerate(values):
+            column[index] = value
+
+    _validate(field, values, column, nulls, errors)
+    return column, nulls
+
+
+def _validate(field, values, column, nulls, errors):
+    """Run the field validators chain over the column, required and
+    choices checks are vectorized.
+    """
+    if defined_by(field, 'validate') is not SimpleField or \
+            defined_by(field, '_extract_value') is not SimpleField:
+        _validate_each(field.validate, values, errors)
+        return
+
+    for validator in field.validators:
+        if validator == field._validate_required and \
+                defined_by(field, '_validate_required') is SimpleField:
+            if field.required:
+                invalid = nulls
+                if column.dtype.kind in 'OU':
+                    invalid = invalid | (column == u'')
+                _report(validator, values, invalid, errors)
+        elif validator == field._validate_choices and \
+                defined_by(field, '_validate_choices') is SimpleField:
+            if field.choices:
+                _report(validator, values,
+                        _not_in_choices(field.choices, values, column, nulls),
+                        errors)
+        else:
+            def check(value, validator=validator):
+                if not validator(value):
+                    raise field._validation_error(value, validator)
+            _validate_each(check, values, errors)
+
+
+def _not_in_choices(choices, values, column, nulls):
+    """Get the mask of values which are not in the choices"""
+    if column.dtype.kind in 'iufb' and \
+            all(isinstance(choice, _NUMBERS) for choice in choices):
+        return np.where(nulls, None not in choices,
+                        ~np.isin(column, list(choices)))
+    return np.fromiter((value not in choices for value in values), bool,
+                       len(values))
+
+
+def _report(validator, values, invalid, errors):
+    """Get errors of invalid values from the validator"""
+    for index in np.flatnonzero(invalid).tolist():
+        if index not in errors:
+            try:
+                validator(values[index])
+            except Exception as err:
+                errors[index] = err
+
+
+def _validate_each(validate, values, errors):
+    for index, value in enumerate(values):
+        if index not in errors:
+            try:
+                validate(value)
+            except Exception as err:
+                errors[index] = err
+
+
+def _to_python(value, is_null):
+    if is_null:
+        return None
+    if isinstance(value, np.datetime64):
+        return value.astype('datetime64[us]').tolist()
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
@@ -0,0 +1,481 @@
+# -*- coding: utf-8 -*-
+"""Per-class code generation helpers used by the DocumentMeta.
+
+Document classes are schema driven, so everything which depends only on the
+schema is resolved once at class creation and compiled into a plain python
+function instead of being interpreted for every document instance.
+"""
+import linecache
+from decimal import Decimal
+from json.encoder import encode_basestring_ascii
+from types import MemberDescriptorType
+
+import six
+
+from simplemodels.fields import BooleanField, CharField, DateTimeField, \
+    DecimalField, DictField, DocumentField, FloatField, IntegerField, \
+    ListField, SimpleField
+
+__all__ = ['compile_init', 'compile_as_dict', 'compile_to_json',
+           'slot_member']
+
+
+# Marker for keys which are not presented in the init data
+MISSING = object()
+
+# Field classes whose `_typecast` is a plain None-safe call of a type.
+# Values are functions which return the type for a given field instance.
+_CASTERS = {
+    SimpleField: lambda field: None,
+    IntegerField: lambda field: int,
+    FloatField: lambda field: float,
+    DecimalField: lambda field: Decimal,
+    BooleanField: lambda field: bool,
+    CharField: lambda field: field._caster,
+    DictField: lambda field: field._dict_cls,
+}
+
+
+def defined_by(obj, attr_name):
+    """Get the class of the object which defines given attribute.
+
+    :param obj: any object
+    :param attr_name: attribute name
+    :return: class or None
+    """
+    for klass in type(obj).__mro__:
+        if attr_name in klass.__dict__:
+            return klass
+    return None
+
+
+def slot_member(cls, field):
+    """Get the slot member descriptor which stores the field value for
+    documents with `USE_SLOTS` meta option.
+
+    :param cls: Document class
+    :param field: SimpleField instance
+    :return: member descriptor or None if the value is stored in `__dict__`
+    """
+    for klass in cls.__mro__:
+        if field._name in klass.__dict__:
+            member = klass.__dict__[field._name]
+            if isinstance(member, MemberDescriptorType):
+                return member
+            return None
+    return None
+
+
+class _CodeBuilder(object):
+    """Source code accumulator with the namespace for the generated code"""
+
+    def __init__(self):
+        self.lines = []
+        self.namespace = {}
+
+    def add(self, line, indent=1):
+        self.lines.append('    ' * indent + line)
+
+    def bind(self, name, value):
+        """Bind the value to the generated code namespace
+
+        :param name: variable name in the generated code
+        :param value: any object
+        :return: name
+        """
+        self.namespace[name] = value
+        return name
+
+    def build(self, func_name, filename):
+        source = '\n'.join(self.lines) + '\n'
+        code = compile(source, filename, 'exec')
+        six.exec_(code, self.namespace)
+
+        # Make the generated source available in tracebacks
+        linecache.cache[filename] = (
+            len(source), None, source.splitlines(True), filename)
+        return self.namespace[func_name]
+
+
+def _store_line(builder, idx, field, member, indent, value='value'):
+    if member is None:
+        key = builder.bind('k%d' % idx, field.name)
+        builder.add('storage[%s] = %s' % (key, value), indent)
+    else:
+        setter = builder.bind('m%d' % idx, member.__set__)
+        builder.add('%s(self, %s)' % (setter, value), indent)
+
+
+def _set_value_lines(builder, idx, field, member, indent):
+    """Generate typecast, validation and storing of the `value` variable
+    for a single field. Mirrors `SimpleField.__set_value__`.
+    """
+    add = builder.add
+
+    if defined_by(field, '__set_value__') is not SimpleField:
+        set_value = builder.bind('sv%d' % idx, field.__set_value__)
+        add('%s(self, value, **kwargs)' % set_value, indent)
+        return
+
+    # Typecast
+    typecast_cls = defined_by(field, '_typecast')
+    if typecast_cls in _CASTERS:
+        caster = _CASTERS[typecast_cls](field)
+        if caster is not None:
+            caster = builder.bind('c%d' % idx, caster)
+            add('if value is not None:', indent)
+            add('value = %s(value)' % caster, indent + 1)
+    else:
+        typecast = builder.bind('t%d' % idx, field._typecast)
+        add('value = %s(value, **kwargs)' % typecast, indent)
+
+    # Validation
+    if defined_by(field, 'validate') is not SimpleField or \
+            defined_by(field, '_extract_value') is not SimpleField:
+        validate = builder.bind('vf%d' % idx, field.validate)
+        add('%s(value)' % validate, indent)
+    else:
+        _validators_lines(builder, idx, field, indent)
+
+    _store_line(builder, idx, field, member, indent)
+
+
+def _validators_lines(builder, idx, field, indent):
+    """Unroll field validators chain, skip default validators which are
+    no-op for the given field options.
+    """
+    add = builder.add
+    for v_idx, validator in enumerate(field.validators):
+        if validator == field._validate_required and \
+                defined_by(field, '_validate_required') is SimpleField:
+            if field.required:
+                check = builder.bind('r%d' % idx, validator)
+                add("if value is None or value == '':", indent)
+                add('%s(value)' % check, indent + 1)
+        elif validator == field._validate_choices and \
+                defined_by(field, '_validate_choices') is SimpleField:
+            if field.choices:
+                choices = builder.bind('ch%d' % idx, field.choices)
+                check = builder.bind('h%d' % idx, validator)
+                add('if value not in %s:' % choices, indent)
+                add('%s(value)' % check, indent + 1)
+        else:
+            check = builder.bind('v%d_%d' % (idx, v_idx), validator)
+            error = builder.bind('e%d' % idx, field._validation_error)
+            add('if not %s(value):' % check, indent)
+            add('raise %s(value, %s)' % (error, check), indent + 1)
+
+
+def _default_expr(builder, idx, field):
+    """Get an expression of the field default value"""
+    if defined_by(field, 'default') is not SimpleField:
+        return '%s.default' % builder.bind('f%d' % idx, field)
+
+    default = builder.bind('d%d' % idx, field._default)
+    if callable(field._default):
+        return '%s()' % default
+    return default
+
+
+def compile_init(cls):
+    """Compile the function which sets document fields from the init data.
+
+    Generated code is an unrolled version of the loop over `cls._fields`:
+    default values, typecasts and validators of every field are resolved
+    at compile time. Known fields are popped from the given data, so only
+    extra fields are left in it after the call.
+
+    :param cls: Document class
+    :return: function(document, data, kwargs)
+    """
+    builder = _CodeBuilder()
+    builder.bind('MISSING', MISSING)
+    omit_missed = cls._meta.get('OMIT_MISSED_FIELDS')
+    fields = [(field, slot_member(cls, field))
+              for field in cls._fields.values()]
+
+    builder.add('def _init_fields(self, data, kwargs):', indent=0)
+    if any(member is None for _, member in fields):
+        builder.add('storage = self.__dict__')
+
+    for idx, (field, member) in enumerate(fields):
+        key = builder.bind('k%d' % idx, field.name)
+        builder.add('# %s' % field._name)
+        builder.add('value = data.pop(%s, MISSING)' % key)
+        builder.add('if value is MISSING:')
+        builder.add('value = %s' % _default_expr(builder, idx, field), 2)
+        if omit_missed:
+            # Missed fields are not set, but validated to check 'required'
+            # and other attributes
+            validate = builder.bind('vf%d' % idx, field.validate)
+            builder.add('if value is None:', 2)
+            builder.add('%s(value)' % validate, 3)
+            if member is not None:
+                # slot must be initialized anyway
+                _store_line(builder, idx, field, member, 3, value='None')
+            builder.add('else:', 2)
+            _set_value_lines(builder, idx, field, member, indent=3)
+            builder.add('else:')
+            _set_value_lines(builder, idx, field, member, indent=2)
+        else:
+            _set_value_lines(builder, idx, field, member, indent=1)
+
+    builder.add('return data')
+    filename = '<simplemodels %s.%s._init_fields>' % (
+        cls.__module__, cls.__name__)
+    return builder.build('_init_fields', filename)
+
+
+def _construct_lines(builder, idx, field, member, indent):
+    """Generate storing of the trusted `value` variable for a single field.
+    Mirrors `Document.construct`: no typecasts and validation, only nested
+    documents and containers are built.
+    """
+    if defined_by(field, '_construct') is SimpleField:
+        if defined_by(field, '__set_value__') is not SimpleField:
+            # custom field storage, the value is set the regular way
+            set_value = builder.bind('sv%d' % idx, field.__set_value__)
+            builder.add('%s(self, value, **kwargs)' % set_value, indent)
+            return
+    else:
+        construct = builder.bind('cs%d' % idx, field._construct)
+        builder.add('value = %s(value, **kwargs)' % construct, indent)
+    _store_line(builder, idx, field, member, indent)
+
+
+def compile_construct(cls):
+    """Compile the function which sets document fields from the trusted
+    data, see `Document.construct`. Unlike `compile_init` it doesn't
+    modify the data.
+
+    :param cls: Document class
+    :return: function(document, data, kwargs)
+    """
+    builder = _CodeBuilder()
+    builder.bind('MISSING', MISSING)
+    omit_missed = cls._meta.get('OMIT_MISSED_FIELDS')
+    fields = [(field, slot_member(cls, field))
+              for field in cls._fields.values()]
+
+    builder.add('def _construct_fields(self, data, kwargs):', indent=0)
+    if any(member is None for _, member in fields):
+        builder.add('storage = self.__dict__')
+
+    for idx, (field, member) in enumerate(fields):
+        key = builder.bind('k%d' % idx, field.name)
+        builder.add('# %s' % field._name)
+        builder.add('value = data.get(%s, MISSING)' % key)
+        builder.add('if value is MISSING:')
+        builder.add('value = %s' % _default_expr(builder, idx, field), 2)
+        if omit_missed:
+            # Missed fields are not set, but slot must be initialized
+            if member is not None:
+                builder.add('if value is None:', 2)
+                _store_line(builder, idx, field, member, 3, value='None')
+                builder.add('else:', 2)
+            else:
+                builder.add('if value is not None:', 2)
+            _construct_lines(builder, idx, field, member, indent=3)
+            builder.add('else:')
+            _construct_lines(builder, idx, field, member, indent=2)
+        else:
+            _construct_lines(builder, idx, field, member, indent=1)
+
+    filename = '<simplemodels %s.%s._construct_fields>' % (
+        cls.__module__, cls.__name__)
+    if len(builder.lines) == 1:
+        builder.add('pass')
+    return builder.build('_construct_fields', filename)
+
+
+def _to_python_expr(builder, idx, field):
+    """Get an expression which converts the `value` variable
+    as `field.to_python` does.
+    """
+    to_python_cls = defined_by(field, 'to_python')
+    if to_python_cls is SimpleField:
+        return 'value'
+    elif to_python_cls is DocumentField:
+        return 'value.as_dict()'
+    elif to_python_cls is ListField and field._compact:
+        return 'value.tolist()'
+    elif to_python_cls is ListField and not isinstance(field._of, str):
+        if hasattr(field._of, 'as_dict'):
+            return '[item.as_dict() for item in value]'
+        return 'list(value)'
+    return '%s(value)' % builder.bind('tp%d' % idx, field.to_python)
+
+
+def compile_as_dict(cls):
+    """Compile the function which serializes a document to the dict.
+
+    It reads stored values directly and converts only values of the fields
+    which need it, e.g. nested documents. The result is the same as
+    `{name: field.to_python(value) for name, value in document.items()}`.
+
+    :param cls: Document class
+    :return: function(document)
+    """
+    builder = _CodeBuilder()
+    builder.bind('cls', cls)
+    omit_missed = cls._meta.get('OMIT_MISSED_FIELDS')
+    fields = [(field, slot_member(cls, field))
+              for field in cls._fields.values()]
+
+    builder.add('def _as_dict(self):', indent=0)
+    if any(member is None for _, member in fields):
+        builder.add('storage = self.__dict__')
+    builder.add('result = {}')
+
+    for idx, (field, member) in enumerate(fields):
+        key = builder.bind('k%d' % idx, field.name)
+        if defined_by(field, '__get__') is not SimpleField:
+            getter = builder.bind('g%d' % idx, field.__get__)
+            builder.add('value = %s(self, cls)' % getter)
+        elif member is not None:
+            builder.add('value = self.%s' % field._name)
+        else:
+            builder.add('value = storage.get(%s)' % key)
+
+        expr = _to_python_expr(builder, idx, field)
+        if omit_missed:
+            builder.add('if value is not None:')
+            builder.add('result[%s] = %s' % (key, expr), 2)
+        else:
+            builder.add('result[%s] = %s' % (key, expr))
+
+    # Extra fields are stored as is, see fields.ExtraField
+    builder.add('for name in self._extra_fields:')
+    builder.add('value = self.__dict__[name]', 2)
+    if omit_missed:
+        builder.add('if value is not None:', 2)
+        builder.add('result[name] = value', 3)
+    else:
+        builder.add('result[name] = value', 2)
+
+    builder.add('return result')
+    filename = '<simplemodels %s.%s._as_dict>' % (cls.__module__, cls.__name__)
+    return builder.build('_as_dict', filename)
+
+
+# JSON encoding expressions of the `x` variable by the `_typecast` class of
+# the field. Stored values of trusted documents may have other types, so
+# the type is checked and other values are encoded by the json module.
+_JSON_EXPRESSIONS = {
+    IntegerField: 'INT(x) if type(x) is int else enc(x)',
+    FloatField: 'FLOAT(x) if type(x) is float and NINF < x < INF '
+                'else enc(x)',
+    BooleanField: "(u'true' if x else u'false') if type(x) is bool "
+                  "else enc(x)",
+    CharField: 'esc(x) if type(x) is TEXT else enc(x)',
+    DecimalField: 'dec(x) if type(x) is DECIMAL else enc(x)',
+}
+
+
+def _to_json_expr(builder, idx, field):
+    """Get an expression which encodes the `x` variable as
+    `json.dumps(field.to_python(x))` does.
+    """
+    to_python_cls = defined_by(field, 'to_python')
+    if to_python_cls is SimpleField:
+        return _JSON_EXPRESSIONS.get(
+            defined_by(field, '_typecast'), 'enc(x)')
+    elif to_python_cls is DateTimeField:
+        to_python = builder.bind('tp%d' % idx, field.to_python)
+        date_fmt = field._date_fmt
+        if field._fast_format is not None and \
+                encode_basestring_ascii(date_fmt) == '"%s"' % date_fmt:
+            # the formatted value doesn't need escaping
+            fast_format = builder.bind('ff%d' % idx, field._fast_format)
+            return "u'\"%%s\"' %% %s(x) if x.year >= 1000 else esc(%s(x))" \
+                % (fast_format, to_python)
+        return 'esc(%s(x))' % to_python
+    elif to_python_cls is DocumentField:
+        return 'x._to_json(encoder)'
+    elif to_python_cls is ListField and field._compact:
+        if field._of is int:
+            return "u'[%s]' % u','.join(map(INT, x))"
+        return 'enc(x.tolist())'
+    elif to_python_cls is ListField:
+        if isinstance(field._of, str) or hasattr(field._of, 'as_dict'):
+            return "u'[%s]' % u','.join([i._to_json(encoder) for i in x])"
+        return 'enc(x.list)'
+    return 'enc(%s(x))' % builder.bind('tp%d' % idx, field.to_python)
+
+
+def compile_to_json(cls):
+    """Compile the function which encodes a document to JSON directly from
+    stored values, see `Document.to_json`. The result is the same as
+    `json.dumps(document.as_dict())` in the compact form.
+
+    Key fragments are encoded beforehand, values are encoded by the field
+    type, nested documents are encoded by their own compiled functions.
+
+    :param cls: Document class
+    :return: function(document, encoder)
+    """
+    builder = _CodeBuilder()
+    builder.bind('cls', cls)
+    for name, value in (('INT', int.__repr__), ('FLOAT', float.__repr__),
+                        ('INF', float('inf')), ('NINF', float('-inf')),
+                        ('TEXT', six.text_type), ('DECIMAL', Decimal)):
+        builder.bind(name, value)
+    omit_missed = cls._meta.get('OMIT_MISSED_FIELDS')
+    fields = [(field, slot_member(cls, field))
+              for field in cls._fields.values()]
+
+    builder.add('def _to_json(self, encoder):', indent=0)
+    builder.add('enc = encoder.encode')
+    builder.add('esc = encoder.string')
+    if any(isinstance(field, DecimalField) for field, _ in fields):
+        builder.add('dec = encoder.decimal')
+    if any(member is None for _, member in fields):
+        builder.add('storage = self.__dict__')
+
+    values = []
+    for idx, (field, member) in enumerate(fields):
+        key = builder.bind('k%d' % idx, field.name)
+        if defined_by(field, '__get__') is not SimpleField:
+            getter = builder.bind('g%d' % idx, field.__get__)
+            builder.add('x = %s(self, cls)' % getter)
+        elif member is not None:
+            builder.add('x = self.%s' % field._name)
+        else:
+            builder.add('x = storage.get(%s)' % key)
+
+        expr = _to_json_expr(builder, idx, field)
+        key_json = six.text_type(encode_basestring_ascii(field.name))
+        if omit_missed:
+            if idx == 0:
+                builder.add('parts = []')
+            fragment = builder.bind('kj%d' % idx, key_json + u':')
+            builder.add('if x is not None:')
+            builder.add('parts.append(%s + (%s))' % (fragment, expr), 2)
+        else:
+            builder.add("v%d = u'null' if x is None else %s" % (idx, expr))
+            values.append(key_json.replace(u'%', u'%%') + u':%s')
+
+    # Extra fields are stored as is, see fields.ExtraField
+    if omit_missed:
+        if not fields:
+            builder.add('parts = []')
+        builder.add('for name in self._extra_fields:')
+        builder.add('x = getattr(self, name)', 2)
+        builder.add('if x is not None:', 2)
+        builder.add("parts.append(u'%s:%s' % (esc(name), enc(x)))", 3)
+        builder.add("return u'{%s}' % u','.join(parts)")
+    else:
+        template = builder.bind(
+            'TEMPLATE', u'{' + u','.join(values) + u'%s}')
+        builder.add("extra = u''")
+        builder.add('if self._extra_fields:')
+        builder.add("extra = u''.join([u',%s:%s' % (esc(name), "
+                    "enc(getattr(self, name))) "
+                    "for name in self._extra_fields])", 2)
+        if not fields:
+            builder.add('extra = extra[1:]', 2)
+        builder.add('return %s %% (%s)' % (template, u''.join(
+            'v%d, ' % idx for idx in range(len(fields))) + 'extra'))
+
+    filename = '<simplemodels %s.%s._to_json>' % (cls.__module__, cls.__name__)
+    return builder.build('_to_json', filename)
@@ -7,7 +7,8 @@ __all__ = [
     'DefaultValueError',
     'DocumentError'
     'ImmutableFieldError',
-    'ModelValidationError'
+    'ModelValidationError',
+    'AsyncValidationWarning'
 ]
 
 
@@ -48,3 +49,10 @@ class DocumentError(ValidationError):
 class ImmutableFieldError(FieldError):
     """Raised when try to set certain immutable field in a document"""
     pass
+
+
+class AsyncValidationWarning(RuntimeWarning):
+    """Issued when coroutine validators are skipped by the synchronous
+    validation, e.g. by the regular document constructor
+    """
+    pass
@@ -1,5 +1,9 @@
 # -*- coding: utf-8 -*-
+import array
 import copy
+import functools
+import operator
+import re
 import warnings
 from collections import Mapping, MutableSequence
 from datetime import datetime
@@ -9,8 +13,10 @@ import six
 
 from simplemodels import PYTHON_VERSION
 from simplemodels.exceptions import FieldError, FieldRequiredError, ImmutableFieldError, \
-    ModelNotFoundError, ValidationError
-from simplemodels.utils import is_document
+    ValidationError
+from simplemodels.registry import ModelReference
+from simplemodels.utils import is_coroutine_function, is_document, \
+    owned_data_kwargs, warn_async_skipped
 
 __all__ = ['SimpleField', 'IntegerField', 'FloatField', 'DecimalField',
            'CharField', 'BooleanField', 'DateTimeField', 'ListField',
@@ -30,7 +36,8 @@ class SimpleField(object):
         :param default: default value
         :param required: is field required
         :param choices: choices list.
-        :param validators: list of callable objects - validators
+        :param validators: list of callable objects - validators.
+        Coroutine functions are awaited by `Document.acreate` only
         :param immutable: immutable field type
         :param kwargs: for future options
         """
@@ -52,6 +59,15 @@ class SimpleField(object):
             raise FieldError('validators must be list, tuple or set, '
                              '%r is given' % validators)
 
+        # Async validators can't be run synchronously, they're awaited by
+        # the async construction path, see simplemodels.aio. The sync path
+        # warns about them.
+        self.async_validators = [
+            v for v in self.validators if is_coroutine_function(v)]
+        if self.async_validators:
+            self.validators = [v for v in self.validators
+                               if v not in self.async_validators]
+
         self._add_validator(self._validate_required)
         self._add_validator(self._validate_choices)
 
@@ -149,10 +165,20 @@ class SimpleField(object):
         # Run validators chain
         for validate in self.validators:
             if not validate(value):
-                raise ValidationError(
-                    "Value '{value}' of the `{name}` field haven't passed validation '{validate}'".format(
-                        value=value, name=self.name, validate=validate)
-                )
+                raise self._validation_error(value, validate)
+
+    def _validation_error(self, value, validator):
+        """Build an error for the validator which hasn't passed.
+
+        :param value: validated value
+        :param validator: failed validator
+        :return: ValidationError
+        """
+        return ValidationError(
+            "Value '{value}' of the `{name}` field haven't passed "
+            "validation '{validate}'".format(
+                value=value, name=self.name, validate=validator)
+        )
 
     def _add_validator(self, validator):
         """
@@ -165,7 +191,10 @@ class SimpleField(object):
                 "Validator '%r' for field '%r' is not callable!" %
                 (validator, self))
 
-        if validator not in self.validators:
+        if is_coroutine_function(validator):
+            if validator not in self.async_validators:
+                self.async_validators.append(validator)
+        elif validator not in self.validators:
             self.validators.append(validator)
 
     def __get__(self, instance, owner):
@@ -192,6 +221,15 @@ class SimpleField(object):
         instance.__dict__[self.name] = value
         return value
 
+    def _construct(self, value, **kwargs):
+        """Get the value to store from the trusted, i.e. already typed and
+        validated, value, see `Document.construct`. No checks are done.
+
+        :param value: trusted value, e.g. the `to_python` result
+        :return: value as is by default
+        """
+        return value
+
     def __set__(self, instance, value):
         """Descriptor setter
 
@@ -201,7 +239,10 @@ class SimpleField(object):
         """
         if self._immutable:
             raise ImmutableFieldError('{!r} field is immutable'.format(self))
+        if self.async_validators:
+            warn_async_skipped(repr(self), stacklevel=2)
         self.__set_value__(instance, value)
+        instance._mark_changed(self.name)
 
     def __repr__(self):
         if self._holder_name and self.name:
@@ -272,29 +313,107 @@ class BooleanField(SimpleField):
         return super(BooleanField, self)._typecast(value, bool, **{})
 
 
+# Zero padded numeric directives which have a fast path in DateTimeField:
+# {directive: (width, datetime attribute)}
+_DATETIME_DIRECTIVES = {
+    'Y': (4, 'year'), 'm': (2, 'month'), 'd': (2, 'day'),
+    'H': (2, 'hour'), 'M': (2, 'minute'), 'S': (2, 'second'),
+}
+_DATETIME_ARGS = ('year', 'month', 'day', 'hour', 'minute', 'second')
+
+
+def _compile_date_fmt(date_fmt):
+    """Build fast parser and formatter of the datetime format which consists
+    of zero padded numeric directives (e.g. ISO 8601 formats) and literals.
+
+    :param date_fmt: strptime/strftime format
+    :return: tuple (parse function, format function) or (None, None) if the
+    format is not supported. Parse function returns None if the value
+    doesn't match the format.
+    """
+    pattern, template, attrs, slices = [], [], [], {}
+    offset = 0
+    chars = iter(date_fmt)
+    for char in chars:
+        if char == '%':
+            char = next(chars, '')
+            if char in _DATETIME_DIRECTIVES:
+                width, attr = _DATETIME_DIRECTIVES[char]
+                if attr in slices:
+                    return None, None
+                slices[attr] = 'value[%d:%d]' % (offset, offset + width)
+                attrs.append(attr)
+                pattern.append(r'\d{%d}' % width)
+                template.append('%%0%dd' % width)
+                offset += width
+                continue
+            elif char != '%':
+                return None, None
+        pattern.append(re.escape(char))
+        template.append(char.replace('%', '%%'))
+        offset += 1
+    if not {'year', 'month', 'day'}.issubset(slices):
+        return None, None
+
+    # values are sliced by offsets once the whole value matches the format
+    source = (
+        'def parse(value):\n'
+        '    if match(value) is None:\n'
+        '        return None\n'
+        '    return datetime(%s)\n' % ', '.join(
+            'int(%s)' % slices[arg] if arg in slices else '0'
+            for arg in _DATETIME_ARGS))
+    namespace = {'datetime': datetime,
+                 'match': re.compile(''.join(pattern) + r'\Z').match}
+    exec(compile(source, '<date_fmt %r>' % date_fmt, 'exec'), namespace)
+
+    template = ''.join(template)
+    getter = operator.attrgetter(*attrs)
+    return namespace['parse'], lambda value: template % getter(value)
+
+
 class DateTimeField(SimpleField):
     DATE_FORMAT = '%Y-%m-%dT%H:%M:%SZ'
 
     def __init__(self, date_fmt=None, **kwargs):
         self._date_fmt = date_fmt or self.DATE_FORMAT
+        # fast path for ISO like formats
+        self._fast_parse, self._fast_format = _compile_date_fmt(self._date_fmt)
         super(DateTimeField, self).__init__(**kwargs)
 
+    def _parse(self, value):
+        if self._fast_parse is not None:
+            try:
+                result = self._fast_parse(value)
+            except ValueError:
+                # out of range values, strptime raises a proper error
+                result = None
+            if result is not None:
+                return result
+        return datetime.strptime(value, self._date_fmt)
+
     def _typecast(self, value, **kwargs):
         if isinstance(value, six.string_types):
-            func = lambda val: datetime.strptime(val, self._date_fmt)
+            return self._parse(value)
         elif isinstance(value, (int, float)):
-            func = datetime.fromtimestamp
+            return datetime.fromtimestamp(value)
         elif isinstance(value, datetime) or value is None:
-            func = None
+            return value
         else:
             raise ValueError("Incorrect type '{type}' for '{name}' field!".format(
                 type=type(value).__name__, name=self.name
             ))
 
-        return super(DateTimeField, self)._typecast(value, func, **{})
+    def _construct(self, value, **kwargs):
+        if isinstance(value, six.string_types):
+            return self._parse(value)
+        return value
 
     def to_python(self, value):
         if value is not None:
+            # strftime doesn't pad years < 1000 on some platforms
+            if self._fast_format is not None and value.year >= 1000:
+                return self._fast_format(value)
             return value.strftime(self._date_fmt)
 
 
@@ -310,28 +429,86 @@ class DocumentField(SimpleField):
             website = DocumentField(model=Website)  # or model='Website'
     """
 
-    def __init__(self, model, **kwargs):
+    def __new__(cls, *args, **kwargs):
+        # lazy is the second positional parameter of __init__
+        lazy = args[1] if len(args) > 1 else kwargs.get('lazy')
+        if lazy and cls is DocumentField:
+            cls = LazyDocumentField
+        return super(DocumentField, cls).__new__(cls)
+
+    def __init__(self, model, lazy=False, **kwargs):
+        """
+        :param model: Document class or its name
+        :param lazy: build the nested document on the first access, see
+        LazyDocumentField
+        """
         self._model = model
+        # string model name is resolved on the first use
+        self._reference = \
+            ModelReference(model) if isinstance(model, str) else None
         super(DocumentField, self).__init__(**kwargs)
 
     def _typecast(self, value, **kwargs):
-        if isinstance(self._model, str):
-            from simplemodels.models import registry
-            model = registry.get(self._model)
-            if not model:
-                raise ModelNotFoundError(
-                    "Model '%s' does not exist" %
-                    self._model)
+        if self._reference is not None:
+            model = self._reference.resolve()
         else:
             model = self._model
 
-        return super(DocumentField, self)._typecast(
-            value or {}, model, **kwargs)
+        # the value is owned by the parent document, see `__set__`
+        kwargs = owned_data_kwargs(model, kwargs)
+        if getattr(model, '_intern_cache', None) is not None:
+            return model.intern(value or {}, **kwargs)
+        return model(value or {}, **kwargs)
+
+    def __set__(self, instance, value):
+        # assigned value is not owned by the document, it must be copied
+        super(DocumentField, self).__set__(instance, copy.deepcopy(value))
+
+    def _construct(self, value, **kwargs):
+        if self._reference is not None:
+            model = self._reference.resolve()
+        else:
+            model = self._model
+        # abstract isinstance check is slow, dicts are checked first
+        if value is not None and type(value) is not dict and \
+                isinstance(value, model):
+            return value
+        return model.construct(value, **kwargs)
 
     def to_python(self, value):
         return value.as_dict()
 
 
+class _RawDocument(object):
+    """Data of the nested document which is not built yet"""
+
+    def __init__(self, data, kwargs):
+        self.data = data
+        self.kwargs = kwargs
+
+
+class LazyDocumentField(DocumentField):
+    """Embedded document field which keeps the given data as is and builds
+    (and validates) the nested document on the first access, including
+    `as_dict`. Use `Document.validate_all` to get validation errors
+    beforehand.
+
+    It's created by `DocumentField(model, lazy=True)`.
+    """
+
+    def __set_value__(self, instance, value, **kwargs):
+        value = _RawDocument(value, kwargs)
+        instance.__dict__[self.name] = value
+        return value
+
+    def __get__(self, instance, owner):
+        value = instance.__dict__.get(self.name)
+        if type(value) is _RawDocument:
+            value = super(LazyDocumentField, self).__set_value__(
+                instance, value.data, **value.kwargs)
+        return value
+
+
 class ListType(MutableSequence):
     """
     Special sequence class which is instantiated for `ListField`.
@@ -339,48 +516,119 @@ class ListType(MutableSequence):
     When you add a `ListField` and create an instance of it,
     original field descriptor is saved in `<SomeDocument>._fields`,
     and you field attribute is replaces with instance of `ListType`.
+
+    Items of the lazy list are converted one by one on access, e.g.
+    `len()` or reading the first item doesn't convert the rest of them.
     """
 
-    def __init__(self, value, of, **kwargs):
+    # It's set if the list is changed in place, see `Document.as_patch`
+    _modified = False
+
+    def __init__(self, value, of, lazy=False, **kwargs):
         if not isinstance(value, MutableSequence):
             raise ValueError('Value %r is not a sequence' % value)
 
         self._of = of
-        self._raw_value = value
         self._kwargs = kwargs
         # if `of` is string - postpone type casting
-        self._list = None if isinstance(self._of, str) else self.list
+        if lazy or isinstance(self._of, str):
+            self._list = list(value)
+            # flags of converted items, None if all items are converted
+            self._converted = bytearray(len(self._list))
+        else:
+            convert = self._converter()
+            self._list = [convert(item) for item in value]
+            self._converted = None
+
+    def _converter(self):
+        """Get a function which converts a raw item"""
+        if isinstance(self._of, str):
+            self._of = ModelReference(self._of).resolve()
+
+        if is_document(self._of):
+            # items are owned by the list, see `ListField.__set__`
+            kwargs = owned_data_kwargs(self._of, self._kwargs)
+            if self._of._intern_cache is not None:
+                return functools.partial(self._of.intern, **kwargs)
+            return functools.partial(self._of, **kwargs)
+        return self._of
+
+    @classmethod
+    def _trusted(cls, items, of, kwargs):
+        """Create the list of already converted items
+
+        :param items: list, it's used as is
+        """
+        result = cls.__new__(cls)
+        result._of = of
+        result._kwargs = kwargs
+        result._list = items
+        result._converted = None
+        return result
+
+    def _get(self, index):
+        """Get the item by the non-negative index, convert it if needed"""
+        if not self._converted[index]:
+            self._list[index] = self._converter()(self._list[index])
+            self._converted[index] = 1
+        return self._list[index]
 
     @property
     def list(self):
-        if hasattr(self, '_raw_value'):
-            if isinstance(self._of, str):
-                from simplemodels.models import registry
-                self._of = registry.get(self._of)
-                if not self._of:
-                    raise ModelNotFoundError(
-                        "Model '%s' does not exist" % self._of)
-
-            if is_document(self._of):
-                self._list = [self._of(data, **self._kwargs)
-                              for data in self._raw_value]
-            else:
-                self._list = [self._of(data) for data in self._raw_value]
-            delattr(self, '_raw_value')
+        if self._converted is not None:
+            if not all(self._converted):
+                convert = self._converter()
+                for index, converted in enumerate(self._converted):
+                    if not converted:
+                        self._list[index] = convert(self._list[index])
+            self._converted = None
 
         return self._list
 
     def __len__(self):
-        return len(self.list)
+        return len(self._list)
 
     def __getitem__(self, index):
-        return self.list[index]
+        if self._converted is None:
+            return self._list[index]
+        if isinstance(index, slice):
+            return [self._get(idx)
+                    for idx in range(*index.indices(len(self._list)))]
+        if index < 0:
+            index += len(self._list)
+        if not 0 <= index < len(self._list):
+            raise IndexError('list index out of range')
+        return self._get(index)
+
+    def __iter__(self):
+        if self._converted is None:
+            return iter(self._list)
+        return self._iter_lazy()
+
+    def _iter_lazy(self):
+        index = 0
+        while index < len(self._list):
+            if self._converted is None:
+                item = self._list[index]
+            else:
+                item = self._get(index)
+            yield item
+            index += 1
 
     def __setitem__(self, index, value):
-        self.list[index] = value
+        self._modified = True
+        if isinstance(index, slice):
+            self.list[index] = value
+            return
+        self._list[index] = value
+        if self._converted is not None:
+            self._converted[index] = 1
 
     def __delitem__(self, index):
-        del self.list[index]
+        self._modified = True
+        del self._list[index]
+        if self._converted is not None:
+            del self._converted[index]
 
     def __eq__(self, other):
         return self.list == other
@@ -395,30 +643,114 @@ class ListType(MutableSequence):
         return self.list.__repr__()
 
     def sort(self, key=None, reverse=False):
+        self._modified = True
         self._list = sorted(self.list, key=key, reverse=reverse)
 
     def insert(self, index, value):
-        from simplemodels.models import Document
-
-        if isinstance(value, (Document, ListField)):
-            value = self._of(data=value, **self._kwargs)
+        convert = self._converter()
+        if is_document(self._of):
+            # inserted value is not owned by the list, it must be copied
+            create = self._of.intern \
+                if self._of._intern_cache is not None else self._of
+            value = create(value, **self._kwargs)
         else:
-            value = self._of(value)
-        self.list.insert(index, value)
+            value = convert(value)
+        self._list.insert(index, value)
+        self._modified = True
+        if self._converted is not None:
+            self._converted.insert(index, 1)
+
+
+def _compact_typecode(of):
+    if of is float:
+        return 'd'
+    try:
+        array.array('q')
+        return 'q'
+    except ValueError:  # python 2
+        return 'l'
+
+
+class CompactListType(array.array):
+    """
+    Sequence of numbers stored as C values, it's instantiated for
+    `ListField(of=int, compact=True)` and `ListField(of=float, compact=True)`.
+
+    It's an `array.array`, so it supports the buffer protocol, e.g.
+    `memoryview(value)` or `numpy.frombuffer(value)`. It equals to the list
+    of the same numbers.
+    """
+
+    # It's set if the list is changed in place, see `Document.as_patch`.
+    # Writes through the buffer protocol are not tracked.
+    _modified = False
+
+    def __eq__(self, other):
+        if isinstance(other, array.array):
+            return array.array.__eq__(self, other)
+        return self.tolist() == other
+
+    def __ne__(self, other):
+        return not self == other
+
+    __hash__ = None
+
+    def __repr__(self):
+        return repr(self.tolist())
+
+    def __copy__(self):
+        return type(self)(self.typecode, self)
+
+    def __deepcopy__(self, memo):
+        return type(self)(self.typecode, self)
+
+
+def _tracked(method):
+    def wrapper(self, *args):
+        self._modified = True
+        return method(self, *args)
+    wrapper.__name__ = method.__name__
+    wrapper.__doc__ = method.__doc__
+    return wrapper
+
+
+for _name in ('append', 'extend', 'insert', 'pop', 'remove', 'reverse',
+              'byteswap', 'fromlist', 'frombytes', 'fromstring', 'fromfile',
+              '__setitem__', '__delitem__', '__iadd__', '__imul__',
+              '__setslice__', '__delslice__'):
+    if hasattr(array.array, _name):
+        setattr(CompactListType, _name,
+                _tracked(getattr(array.array, _name)))
+del _name
+
+MutableSequence.register(CompactListType)
 
 
 class ListField(SimpleField):
     """ List of items field"""
 
-    def __init__(self, of, **kwargs):
+    def __init__(self, of, lazy=False, compact=False, **kwargs):
         """
 
         :param of: callable: single validator,
                    e.g: 'str', 'lambda x: str(x).upper()'
+        :param lazy: convert items on access instead of the document init,
+        lists of string model names are always lazy
+        :param compact: store numbers as C values in `CompactListType`
+        instead of a list of python objects, `of` must be `int` or `float`
         :param kwargs:
         """
 
         self._of = of
+        self._lazy = lazy
+        self._compact = compact
+        # string model name is resolved on the first use
+        self._reference = ModelReference(of) if isinstance(of, str) else None
+        if compact:
+            if of not in (int, float):
+                raise FieldError(
+                    'Compact list must be of int or float, %r is given' % of)
+            self._typecode = _compact_typecode(of)
 
         # NOTE: forbid to have external validators for the ListField
         if 'validators' in kwargs:
@@ -430,10 +762,64 @@ class ListField(SimpleField):
         super(ListField, self).__init__(**kwargs)
 
     def _typecast(self, value, **kwargs):
-        return ListType(value=value or [], of=self._of, **kwargs)
+        if self._compact:
+            return self._compact_list(value or [])
+        of = self._of
+        if self._reference is not None:
+            # lists of model names are lazy, the model is resolved by the
+            # list if it's not registered yet
+            return ListType(value=value or [],
+                            of=self._reference.get() or of, lazy=True,
+                            **kwargs)
+        return ListType(value=value or [], of=of, lazy=self._lazy, **kwargs)
+
+    def __set__(self, instance, value):
+        if self._reference is not None or is_document(self._of):
+            # assigned items are not owned by the document, they must be
+            # copied
+            value = copy.deepcopy(value)
+        super(ListField, self).__set__(instance, value)
+
+    def _compact_list(self, value):
+        if not isinstance(value, (MutableSequence, array.array)):
+            raise ValueError('Value %r is not a sequence' % value)
+        try:
+            try:
+                # fast path for numbers of the proper type
+                return CompactListType(self._typecode, value)
+            except TypeError:
+                return CompactListType(self._typecode, map(self._of, value))
+        except OverflowError as err:
+            raise ValueError('Value of the {!r} field is out of range of the '
+                             'compact list: {}'.format(self, err))
+
+    def _construct(self, value, **kwargs):
+        if value is None:
+            value = []
+        if self._compact:
+            if isinstance(value, CompactListType):
+                return value
+            # numbers are converted the same way as on init
+            return self._compact_list(value)
+
+        of = self._of
+        if self._reference is not None:
+            of = self._reference.resolve()
+        if hasattr(of, '_construct_fields'):
+            construct = of.construct
+            value = [construct(item, **kwargs) if type(item) is dict or
+                     not isinstance(item, of) else item for item in value]
+        elif type(value) is not list:
+            value = list(value)
+        return ListType._trusted(value, of, kwargs)
 
     def to_python(self, value):
-        if hasattr(self._of, 'as_dict'):
+        if self._compact:
+            return value.tolist()
+        of = self._of
+        if self._reference is not None:
+            of = self._reference.resolve()
+        if hasattr(of, 'as_dict'):
             return [item.as_dict() for item in value]
         return [item for item in value]
 
@@ -451,3 +837,8 @@ class DictField(SimpleField):
 
     def _typecast(self, value, **kwargs):
         return super(DictField, self)._typecast(value, self._dict_cls, **{})
+
+    def _construct(self, value, **kwargs):
+        if value is None or type(value) is self._dict_cls:
+            return value
+        return self._dict_cls(value)
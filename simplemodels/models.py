@@ -1,18 +1,35 @@
 # -*- coding: utf-8 -*-
 import copy
 import inspect
-import weakref
+import operator
+import random
 from abc import ABCMeta
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+from itertools import chain
+from types import MemberDescriptorType
 from collections import MutableMapping
 
 import six
 
-from simplemodels.exceptions import ModelValidationError, DocumentError
-from simplemodels.fields import ExtraField, SimpleField
+from simplemodels.cache import LRUCache, freeze
+from simplemodels.compiler import compile_as_dict, compile_construct, \
+    compile_init, compile_to_json, defined_by, slot_member
+from simplemodels.exceptions import ModelValidationError, DocumentError, \
+    ImmutableFieldError
+from simplemodels.fields import CompactListType, DictField, DocumentField, \
+    ExtraField, ListField, ListType, SimpleField
+from simplemodels.parallel import validate_parallel
+from simplemodels.registry import register, registry, resolve_models
+from simplemodels.streams import DEFAULT_ENCODER, DocumentEncoder, \
+    dump_documents, iter_documents, load_document
+from simplemodels.utils import is_coroutine_function, warn_async_skipped
 
 __all__ = ['Document', 'ImmutableDocument']
 
-registry = weakref.WeakValueDictionary()
+# All extra fields behave the same, so a single field instance is shared
+# between them
+EXTRA_FIELD = ExtraField()
 
 
 class DocumentMeta(ABCMeta):
@@ -52,14 +69,383 @@ class DocumentMeta(ABCMeta):
             elif all([field_name == 'Meta', inspect.isclass(obj)]):
                 _meta.update(obj.__dict__)
 
+        if _meta.get('USE_SLOTS'):
+            _prepare_slots(parents, dct, _fields)
+        if _meta.get('ALLOW_EXTRA_FIELDS') and '__setattr__' not in dct:
+            mro = [klass for parent_cls in parents
+                   for klass in parent_cls.__mro__]
+            if _lookup(mro, '__setattr__') is object.__dict__['__setattr__']:
+                dct['__setattr__'] = _extra_fields_setattr
+
         dct['_fields'] = _fields
         dct['_parents'] = tuple(parents)
         dct['_meta'] = _meta
 
         cls = super(DocumentMeta, mcs).__new__(mcs, name, parents, dct)
-        registry[name] = cls
+        if _meta.get('INTERN_CACHE_SIZE'):
+            _check_internable(cls)
+        mcs.refresh_schema(cls)
+
+        register(cls)
         return cls
 
+    def refresh_schema(cls):
+        """Build per-class construction routine and post-init validation
+        hooks table.
+
+        It's done on class creation, call it explicitly if the class is
+        changed afterwards, e.g. `validate_<field>` method is added.
+        Subclasses are refreshed as well.
+        """
+        cls._init_fields = compile_init(cls)
+        cls._construct_fields = _construct_impl(cls)
+        cls._as_dict = _as_dict_impl(cls)
+        cls._to_json = _to_json_impl(cls)
+        cls._validation_hooks = _find_validation_hooks(cls, cls._fields)
+        cls._async_validation_hooks = _find_validation_hooks(
+            cls, cls._fields, is_async=True)
+        cls._async_validators = {
+            field.name: tuple(field.async_validators)
+            for field in cls._fields.values() if field.async_validators}
+        cls._has_async_validation = bool(
+            cls._async_validators or cls._async_validation_hooks)
+        cls._slot_fields = {
+            field._name: field for field in cls._fields.values()
+            if slot_member(cls, field) is not None}
+        # fields which values may be changed in place:
+        # (field, storage key, slot name or None)
+        cls._container_fields = tuple(
+            (field, field.name,
+             field._name if field._name in cls._slot_fields else None)
+            for field in cls._fields.values()
+            if isinstance(field, (DocumentField, ListField)))
+        intern_cache_size = cls._meta.get('INTERN_CACHE_SIZE')
+        cls._intern_cache = \
+            LRUCache(intern_cache_size) if intern_cache_size else None
+
+        for subclass in cls.__subclasses__():
+            DocumentMeta.refresh_schema(subclass)
+
+
+def _check_internable(cls):
+    """Interned documents are shared, so INTERN_CACHE_SIZE meta option
+    requires a model which values can't be changed in place. Values of
+    generic fields are checked by `ImmutableDocument.intern`.
+
+    :param cls: Document class
+    :raise DocumentError:
+    """
+    immutable_cls = globals()['ImmutableDocument']
+    if not issubclass(cls, immutable_cls):
+        raise DocumentError(
+            "INTERN_CACHE_SIZE meta option of '%s' requires "
+            "ImmutableDocument model" % cls.__name__)
+    for field in cls._fields.values():
+        if isinstance(field, (ListField, DictField)) or \
+                isinstance(field, DocumentField) and \
+                field._reference is None and \
+                not issubclass(field._model, immutable_cls):
+            raise DocumentError(
+                "INTERN_CACHE_SIZE meta option of '%s' doesn't support "
+                "mutable values of %r field" % (cls.__name__, field))
+
+
+def _as_dict_impl(cls):
+    """Get document serialization function. Compiled one reads stored values
+    directly, so it can't be used if the document overrides the mapping
+    interface methods.
+    """
+    if _overrides_mapping(cls):
+        return globals().get('Document', cls).__dict__['_generic_as_dict']
+    return compile_as_dict(cls)
+
+
+def _to_json_impl(cls):
+    """Get document JSON encoding function, see `_as_dict_impl`"""
+    if _overrides_mapping(cls):
+        return globals().get('Document', cls).__dict__['_generic_to_json']
+    return compile_to_json(cls)
+
+
+def _overrides_mapping(cls):
+    base_cls = globals().get('Document', cls)
+    for method_name in ('__iter__', '__getitem__', 'get', 'items'):
+        method = _lookup(cls.__mro__, method_name)
+        if method is not _lookup(base_cls.__mro__, method_name):
+            return True
+    return False
+
+
+def _construct_impl(cls):
+    """Get trusted construction routine, see `Document.construct`. It's None
+    if the document overrides `__init__`, such documents are created the
+    regular way.
+    """
+    base_cls = globals().get('Document', cls)
+    if _lookup(cls.__mro__, '__init__') is not \
+            _lookup(base_cls.__mro__, '__init__'):
+        return None
+    return compile_construct(cls)
+
+
+def _lookup(classes, name):
+    """Get raw attribute value from the first class which defines it
+
+    :param classes: iterable of classes
+    :param name: attribute name
+    :return: attribute value or None
+    """
+    for klass in classes:
+        if name in klass.__dict__:
+            return klass.__dict__[name]
+    return None
+
+
+def _prepare_slots(parents, dct, fields):
+    """Declare `__slots__` for the document fields if USE_SLOTS meta option
+    is on.
+
+    Field descriptors are replaced with slot members, so values are read
+    directly from the slots and validated on set by the `_slots_setattr`.
+    Fields with custom descriptor methods are stored in `__dict__` as usual.
+
+    :param parents: class parents
+    :param dct: class namespace
+    :param fields: dict of all document fields
+    """
+    mro = [klass for parent_cls in parents for klass in parent_cls.__mro__]
+    setattr_impl = dct.get('__setattr__') or _lookup(mro, '__setattr__')
+    if setattr_impl is object.__dict__['__setattr__'] or \
+            setattr_impl is _extra_fields_setattr:
+        dct['__setattr__'] = _slots_setattr
+    elif setattr_impl is not _slots_setattr and \
+            setattr_impl is not _lookup(
+                [globals().get('ImmutableDocument', object)], '__setattr__'):
+        # custom __setattr__ may bypass the fields validation
+        return
+    dct.setdefault('__setstate__', _slots_setstate)
+
+    slots = list(dct.get('__slots__', ()))
+    for field in fields.values():
+        if any(defined_by(field, method) is not SimpleField
+               for method in ('__get__', '__set__', '__set_value__')):
+            continue
+
+        attr_name = field._name
+        if dct.get(attr_name) is field:
+            del dct[attr_name]
+        if not isinstance(_lookup(mro, attr_name), MemberDescriptorType):
+            slots.append(attr_name)
+
+        # Access by verbose name, e.g. document['Interest Rate']
+        if field.name != attr_name and field.name not in dct:
+            dct[field.name] = property(
+                operator.attrgetter(attr_name),
+                lambda self, value, name=attr_name: setattr(self, name, value))
+
+    # Changed fields are kept in a slot as well, see `Document._mark_changed`
+    if not isinstance(_lookup(mro, _CHANGED_SLOT), MemberDescriptorType):
+        slots.append(_CHANGED_SLOT)
+    dct.setdefault('_changed_fields', _SLOT_CHANGED_FIELDS)
+
+    dct['__slots__'] = tuple(slots)
+
+
+_CHANGED_SLOT = '_changed_fields_slot'
+
+
+def _get_slot_changes(self):
+    return getattr(self, _CHANGED_SLOT, frozenset())
+
+
+def _set_slot_changes(self, value):
+    object.__setattr__(self, _CHANGED_SLOT, value)
+
+
+def _del_slot_changes(self):
+    object.__delattr__(self, _CHANGED_SLOT)
+
+
+# `_changed_fields` of documents with USE_SLOTS meta option, the slot is
+# unset until some field is changed
+_SLOT_CHANGED_FIELDS = property(
+    _get_slot_changes, _set_slot_changes, _del_slot_changes)
+
+
+def _slots_setattr(self, name, value):
+    """Set attribute of a document with USE_SLOTS meta option. It does the
+    same as `SimpleField.__set__` for fields stored in slots.
+    """
+    field = self._slot_fields.get(name)
+    if field is not None:
+        if field._immutable:
+            raise ImmutableFieldError('{!r} field is immutable'.format(field))
+        if field.async_validators:
+            warn_async_skipped(repr(field), stacklevel=2)
+        value = field._typecast(value)
+        field.validate(value)
+        object.__setattr__(self, name, value)
+        self._mark_changed(field.name)
+    else:
+        object.__setattr__(self, name, value)
+        if name in self._extra_fields:
+            self._mark_changed(name)
+
+
+def _extra_fields_setattr(self, name, value):
+    """Set attribute of a document with ALLOW_EXTRA_FIELDS meta option,
+    changes of extra fields are tracked, see `Document.changed_fields`
+    """
+    object.__setattr__(self, name, value)
+    if name in self._extra_fields:
+        self._mark_changed(name)
+
+
+def _slots_setstate(self, state):
+    """Restore pickled (or copied) document with USE_SLOTS meta option
+    without validation of already validated values.
+    """
+    if isinstance(state, tuple):
+        state, slots_state = state
+    else:
+        slots_state = None
+    if state:
+        self.__dict__.update(state)
+    for key, value in (slots_state or {}).items():
+        object.__setattr__(self, key, value)
+
+
+# Immutable types, their values are shared instead of being copied
+_ATOMIC_TYPES = frozenset(
+    (type(None), bool, int, float, complex, str, bytes, Decimal, datetime,
+     date, time, timedelta, six.binary_type, six.text_type) +
+    six.integer_types + six.string_types)
+
+
+def _is_changed(value):
+    """Check if the stored value of the nested document or list is changed
+    in place. Abstract isinstance checks are slow, so documents are duck
+    typed.
+    """
+    if type(value) is ListType:
+        if value._modified:
+            return True
+        # raw items of lazy lists have no tracking
+        if hasattr(value._of, 'is_dirty'):
+            for item in value._list:
+                if getattr(item, 'is_dirty', False):
+                    return True
+        return False
+    if type(value) is CompactListType:
+        return value._modified
+    return getattr(value, 'is_dirty', False)
+
+
+def _is_frozen(value):
+    """Check if the stored value can't be changed in place, see
+    `ImmutableDocument.intern`
+    """
+    cls = type(value)
+    if cls in _ATOMIC_TYPES:
+        return True
+    if cls is tuple or cls is frozenset:
+        return all(_is_frozen(item) for item in value)
+    if isinstance(value, ImmutableDocument):
+        return all(_is_frozen(item) for item in value.values())
+    return False
+
+
+def _replacement_patch(document):
+    """Get the patch which replaces values of the document it's applied to:
+    it's the `as_dict` result with all fields, missed values are None.
+
+    :param document: Document instance
+    :return: dict
+    """
+    fields = document._fields
+    patch = {}
+    for field_name, field in fields.items():
+        value = document[field_name]
+        if value is None:
+            patch[field_name] = None
+        elif isinstance(field, DocumentField):
+            patch[field_name] = _replacement_patch(value)
+        else:
+            patch[field_name] = field.to_python(value)
+    for field_name in document._extra_fields:
+        patch[field_name] = document[field_name]
+    return patch
+
+
+def _mark_clean(value):
+    if type(value) is ListType:
+        value.__dict__.pop('_modified', None)
+        if hasattr(value._of, 'mark_clean'):
+            for item in value._list:
+                if hasattr(item, 'mark_clean'):
+                    item.mark_clean()
+    elif type(value) is CompactListType:
+        value.__dict__.pop('_modified', None)
+    elif hasattr(value, 'mark_clean'):
+        value.mark_clean()
+
+
+def _deepcopy(value, memo=None):
+    """Same as `copy.deepcopy`, but plain dicts, lists and atomic values,
+    which make up the most of the init data, are copied without generic
+    dispatching.
+
+    :param value: any value
+    :param memo: deepcopy memo dict
+    :return: deep copy of the value
+    """
+    cls = type(value)
+    if cls in _ATOMIC_TYPES:
+        return value
+    if memo is None:
+        memo = {}
+    elif id(value) in memo:
+        return memo[id(value)]
+
+    if cls is dict:
+        result = memo[id(value)] = {}
+        for key, item in value.items():
+            result[_deepcopy(key, memo)] = \
+                item if type(item) in _ATOMIC_TYPES else _deepcopy(item, memo)
+    elif cls is list:
+        result = memo[id(value)] = []
+        for item in value:
+            result.append(item if type(item) in _ATOMIC_TYPES
+                          else _deepcopy(item, memo))
+    else:
+        result = copy.deepcopy(value, memo)
+    return result
+
+
+def _find_validation_hooks(cls, field_names, is_async=False):
+    """Find `validate_<field_name>` post-init validation methods.
+
+    :param cls: Document class
+    :param field_names: iterable of field names
+    :param is_async: find coroutine functions instead of regular ones
+    :return: tuple of (field_name, method_name, function) items, function is
+    None if the method is not a static function
+    """
+    hooks = []
+    for field_name in field_names:
+        method_name = 'validate_%s' % field_name
+        for klass in cls.__mro__:
+            if method_name in klass.__dict__:
+                method = None
+                if isinstance(klass.__dict__[method_name], staticmethod):
+                    method = getattr(cls, method_name)
+                    if not inspect.isfunction(method):
+                        method = None
+                if is_coroutine_function(method) == is_async:
+                    hooks.append((field_name, method_name, method))
+                break
+    return tuple(hooks)
+
 
 @six.add_metaclass(DocumentMeta)
 class Document(MutableMapping):
@@ -72,27 +458,255 @@ class Document(MutableMapping):
         # if field is not passed to the constructor, exclude it from structure
         OMIT_MISSED_FIELDS = False
 
+        # store field values in slots instead of the instance dict
+        USE_SLOTS = False
+
+        # size of ImmutableDocument.intern cache, 0 disables interning
+        INTERN_CACHE_SIZE = 0
+
+        # fraction of `construct` calls which validate the data the regular
+        # way, e.g. 0.01 to catch invalid trusted data in debug mode
+        CONSTRUCT_VALIDATION_RATE = 0
+
         # TODO: it might make sense to add option to raise an error if unknown
         # field is given for the document
 
+    # Names of extra fields, it's set per instance if the document has any
+    _extra_fields = ()
+
+    # Names of fields set after the init, it's replaced on the first change
+    # of every field
+    _changed_fields = frozenset()
+
     def __init__(self, data=None, **kwargs):
+        """
+        :param data: document data mapping
+        :param kwargs: extra parameters, they are passed through to the
+        nested documents. `copy_data=False` hands the ownership of the data
+        over to the document: it's used as is without making a deep copy
+        and may be modified by the document. Nested documents are built
+        from the data owned by the document, so they never copy it again.
+        """
+        if self._has_async_validation:
+            warn_async_skipped(self.__class__.__name__, stacklevel=2)
         if data is None:
             data = {}
 
-        if self._meta['ALLOW_EXTRA_FIELDS']:
-            self._fields = copy.deepcopy(self._fields)
-
         if not isinstance(data, MutableMapping):
             raise ModelValidationError(
                 "Data must be instance of mapping, but got '%s'!" %
                 type(data))
 
-        data = copy.deepcopy(data)
+        # it's not a field parameter, custom typecasts don't expect it
+        if kwargs.pop('copy_data', True):
+            data = _deepcopy(data)
         data = self._clean_data(data)
 
         self._prepare_fields(data, **kwargs)
         self._post_init_validation()
 
+    @classmethod
+    def acreate(cls, data=None, **kwargs):
+        """Create a document and await its coroutine validators and
+        `validate_<field>` hooks, see `simplemodels.aio`. Python 3.5+ only.
+
+        Usage:
+
+            user = await User.acreate(data)
+
+        :param data: document data mapping
+        :param kwargs: init parameters, see `Document.__init__`
+        :return: coroutine
+        """
+        from simplemodels.aio import create
+        return create(cls, data, **kwargs)
+
+    @classmethod
+    def construct(cls, data=None, **kwargs):
+        """Create a document from the trusted data, e.g. the `as_dict`
+        result of a valid document stored in a cache. Values are stored as
+        is: there are no copying, typecasts, validators and post-init hooks,
+        only nested documents and lists are built. Datetime strings of the
+        field format are parsed.
+
+        Documents which override `__init__` are created the regular way.
+
+        Usage:
+
+            user = User.construct(cache.get(key))
+
+        :param data: trusted document data mapping, it's owned by the
+        document afterwards
+        :param kwargs: init parameters, they're passed to nested documents
+        :return: document
+        :raise ValidationError: if the document is validated as a sample of
+        CONSTRUCT_VALIDATION_RATE meta option and the data is invalid
+        """
+        kwargs.pop('copy_data', None)
+        if cls._construct_fields is None:
+            # custom __init__ may not accept the copy_data parameter
+            return cls(data, **kwargs)
+        rate = cls._meta['CONSTRUCT_VALIDATION_RATE']
+        if rate and random.random() < rate:
+            return cls(data, copy_data=False, **kwargs)
+
+        if data is None:
+            data = {}
+        document = cls.__new__(cls)
+        document._construct_fields(data, kwargs)
+        if cls._meta['ALLOW_EXTRA_FIELDS']:
+            fields = cls._fields
+            extra = {key: value for key, value in data.items()
+                     if key not in fields}
+            if extra:
+                document._set_extra_fields(extra)
+        return document
+
+    @classmethod
+    def from_many(cls, rows, **kwargs):
+        """Create documents from the iterable of data mappings.
+
+        It's the same as `[cls(data, **kwargs) for data in rows]`, but
+        per-class checks are done once for the whole batch.
+
+        :param rows: iterable of data mappings
+        :param kwargs: init parameters, see `Document.__init__`
+        :return: list of documents
+        :raise ValidationError: error of the first invalid row
+        """
+        create = cls._batch_factory(kwargs)
+        return [create(data) for data in rows]
+
+    @classmethod
+    def validate_many(cls, rows, **kwargs):
+        """Create documents from the iterable of data mappings, invalid
+        rows are reported instead of raising the error.
+
+        :param rows: iterable of data mappings
+        :param kwargs: init parameters, see `Document.__init__`
+        :return: tuple (documents, errors). Documents list is aligned with
+        the rows, it has `None` in place of invalid rows. Errors is a dict
+        of {row index: exception}.
+        """
+        create = cls._batch_factory(kwargs)
+        documents, errors = [], {}
+        for idx, data in enumerate(rows):
+            try:
+                documents.append(create(data))
+            except Exception as err:
+                documents.append(None)
+                errors[idx] = err
+        return documents, errors
+
+    @classmethod
+    def validate_parallel(cls, rows, **kwargs):
+        """Same as `validate_many`, but rows are validated by chunks in
+        a pool of processes. The model must be defined at the module level.
+
+        :param rows: iterable of data mappings
+        :param kwargs: `simplemodels.parallel.validate_parallel` parameters,
+        e.g. `chunk_size`, `max_workers`, and init parameters
+        :return: tuple (documents, errors), see `validate_many`
+        """
+        return validate_parallel(cls, rows, **kwargs)
+
+    @classmethod
+    def from_json(cls, text, **kwargs):
+        """Create the document from the JSON object. It's the same as
+        `cls(json.loads(text))`, but the decoded data is handed over to
+        the document without a deep copy.
+
+        :param text: JSON text or utf-8 encoded bytes
+        :param kwargs: `simplemodels.streams.load_document` parameters
+        :return: document
+        :raise ValueError: on malformed JSON
+        :raise ValidationError:
+        """
+        return load_document(cls, text, **kwargs)
+
+    @classmethod
+    def iter_from_file(cls, fp, **kwargs):
+        """Iterate over documents stored in a file as a newline delimited
+        JSON or a JSON array. The file is read incrementally.
+
+        :param fp: file object
+        :param kwargs: `simplemodels.streams.iter_documents` parameters
+        :return: generator of documents
+        """
+        return iter_documents(cls, fp, **kwargs)
+
+    @classmethod
+    def dump_to_file(cls, documents, fp, **kwargs):
+        """Write documents to a file as a newline delimited JSON
+        (or a JSON array with `array=True`) one by one.
+
+        :param documents: iterable of documents
+        :param fp: file object
+        :param kwargs: `simplemodels.streams.dump_documents` parameters
+        :return: number of written documents
+        """
+        return dump_documents(documents, fp, **kwargs)
+
+    @classmethod
+    def _batch_factory(cls, kwargs):
+        """Get a function which creates a document from the data mapping.
+        It does the same as `Document.__init__`, but checks which depend
+        only on the class are done beforehand.
+
+        :param kwargs: init parameters
+        :return: function(data)
+        """
+        if _lookup(cls.__mro__, '__init__') is not \
+                Document.__dict__['__init__']:
+            # custom __init__ may not accept the copy_data parameter
+            kwargs = {k: v for k, v in kwargs.items() if k != 'copy_data'}
+            return lambda data: cls(data, **kwargs)
+
+        if cls._has_async_validation:
+            warn_async_skipped(cls.__name__, stacklevel=3)
+        kwargs = dict(kwargs)
+        copy_data = kwargs.pop('copy_data', True)
+        fields = cls._fields
+        # Unknown keys are dropped before copying, it gives the same result
+        # as Document._clean_data after the copy
+        filter_keys = not cls._meta['ALLOW_EXTRA_FIELDS'] and \
+            _lookup(cls.__mro__, '_clean_data') is \
+            Document.__dict__['_clean_data']
+        clean_data = cls._clean_data
+        # Post-init validation is a no-op if there are no hooks and extra
+        # fields, which could bring new ones
+        post_init = bool(cls._validation_hooks) or \
+            cls._meta['ALLOW_EXTRA_FIELDS'] or \
+            _lookup(cls.__mro__, '_post_init_validation') is not \
+            Document.__dict__['_post_init_validation']
+        new = cls.__new__
+
+        def create(data):
+            if data is None:
+                data = {}
+            elif type(data) is not dict and \
+                    not isinstance(data, MutableMapping):
+                raise ModelValidationError(
+                    "Data must be instance of mapping, but got '%s'!" %
+                    type(data))
+
+            if filter_keys:
+                data = {k: v for k, v in data.items() if k in fields}
+                if copy_data:
+                    data = _deepcopy(data)
+            else:
+                if copy_data:
+                    data = _deepcopy(data)
+                data = clean_data(data)
+
+            document = new(cls)
+            document._prepare_fields(data, **kwargs)
+            if post_init:
+                document._post_init_validation()
+            return document
+
+        return create
+
     def __getitem__(self, name):
         return getattr(self, name)
 
@@ -108,19 +722,218 @@ class Document(MutableMapping):
         Fields, which values are `None` will be returned only
         in case `OMIT_MISSED_FIELDS` meta variable is `False`.
         """
-        for field_name in self._fields:
+        for field_name in chain(self._fields, self._extra_fields):
             if self.get(field_name) is not None or not self._meta['OMIT_MISSED_FIELDS']:
                 yield field_name
 
     def __len__(self):
-        return len(self._fields)
+        return len(self._fields) + len(self._extra_fields)
 
     def as_dict(self):
+        """Serialize the document to the dict, nested documents are
+        serialized as well.
+
+        :return: dict
+        """
+        return self._as_dict()
+
+    def to_json(self, **kwargs):
+        """Serialize the document to the compact JSON string. Stored values
+        are encoded directly, without the intermediate `as_dict` result.
+
+        :param kwargs: `simplemodels.streams.DocumentEncoder` parameters,
+        e.g. `decimal_as_string=True`
+        :return: unicode string
+        """
+        encoder = DocumentEncoder(**kwargs) if kwargs else DEFAULT_ENCODER
+        return self._to_json(encoder)
+
+    @property
+    def changed_fields(self):
+        """Names of fields, including extra ones, set since the init or
+        the last `mark_clean` call. Only assignments of fields are tracked,
+        in place changes of values, e.g. nested documents or lists, are not.
+
+        :return: frozenset
+        """
+        return self._changed_fields
+
+    @property
+    def is_dirty(self):
+        """Check if some fields were set since the init or the last
+        `mark_clean` call, nested documents and lists changes are taken into
+        account as well
+
+        :return: bool
+        """
+        if self._changed_fields:
+            return True
+        for _, value in self._container_values():
+            if _is_changed(value):
+                return True
+        return False
+
+    def mark_clean(self):
+        """Reset changes tracking of the document and its nested documents
+        and lists
+        """
+        self._reset_changes()
+        for _, value in self._container_values():
+            _mark_clean(value)
+
+    def _container_values(self):
+        """Get stored values of nested documents and lists, lazy values are
+        not built
+
+        :return: list of tuples (field, value)
+        """
+        # The instance dict is read only for fields stored there, it's not
+        # created for documents with slots only
+        return [
+            (field, self.__dict__.get(key) if slot is None else
+             getattr(self, slot, None))
+            for field, key, slot in self._container_fields]
+
+    def _mark_changed(self, field_name):
+        changed = self._changed_fields
+        if field_name not in changed:
+            # the set is replaced, so document copies don't share it.
+            # Custom __setattr__, e.g. the ImmutableDocument one, is bypassed
+            object.__setattr__(
+                self, '_changed_fields', changed | {field_name})
+
+    def _reset_changes(self):
+        try:
+            object.__delattr__(self, '_changed_fields')
+        except AttributeError:  # nothing is changed
+            pass
+
+    def revalidate(self):
+        """Re-run validation of the changed document: field validators of
+        the changed fields (e.g. the value could be modified in place after
+        the assignment) and all `validate_<field>` hooks, which are run only
+        on the init otherwise, since they may check other fields as well.
+        Changed fields are reset if the document is valid, changes of nested
+        documents are kept, they're revalidated separately.
+
+        Usage:
+
+            user.password = new_password
+            user.password_confirm = new_password
+            user.revalidate()
+
+        :raise ValidationError:
+        """
+        changed = self._changed_fields
+        if not changed:
+            return
+        for field_name, field in self._fields.items():
+            if field_name in changed:
+                field.validate(self[field_name])
+        self._post_init_validation()
+        self._reset_changes()
+
+    def as_patch(self):
+        """Serialize changes since the init or the last `mark_clean` call to
+        JSON Merge Patch (RFC 7386) like dict: values of the changed fields,
+        patches of the changed nested documents and whole lists if they or
+        their documents are changed. Reassigned nested documents are given
+        with all values, missed ones are None.
+
+        Usage:
+
+            patch = document.as_patch()
+            document.mark_clean()
+            ...
+            replica.apply_patch(patch)
+
+        :return: dict, it's empty if nothing is changed
+        """
+        changed = self._changed_fields
+        fields = self._fields
+        patch = {}
+        for field_name in changed:
+            value = self[field_name]
+            field = fields.get(field_name, EXTRA_FIELD)
+            if value is None:
+                patch[field_name] = None
+            elif isinstance(field, DocumentField):
+                # patch of the nested document is merged into the existing
+                # one, all its values are given to drop the stale ones
+                patch[field_name] = _replacement_patch(value)
+            else:
+                patch[field_name] = field.to_python(value)
+
+        for field, value in self._container_values():
+            if field.name in changed:
+                continue
+            if type(value) is ListType or type(value) is CompactListType:
+                if _is_changed(value):
+                    patch[field.name] = field.to_python(value)
+            elif hasattr(value, 'as_patch'):
+                nested_patch = value.as_patch()
+                if nested_patch:
+                    patch[field.name] = nested_patch
+        return patch
+
+    def apply_patch(self, patch):
+        """Apply the patch made by `as_patch`: nested documents are patched
+        recursively, the rest of values are set as usual. Only patched fields
+        are validated, but all `validate_<field>` hooks are run, see
+        `revalidate`.
+
+        Patched fields are tracked as changed. Unknown fields are added as
+        extra fields if the document has ALLOW_EXTRA_FIELDS meta option,
+        otherwise they're skipped. The document may be partially patched if
+        the patch is invalid.
+
+        :param patch: dict
+        :raise ValidationError:
+        """
+        fields = self._fields
+        for field_name, value in patch.items():
+            field = fields.get(field_name)
+            if field is None:
+                if field_name in self._extra_fields:
+                    self[field_name] = value
+                elif self._meta['ALLOW_EXTRA_FIELDS']:
+                    self._set_extra_fields({field_name: value})
+                    self._mark_changed(field_name)
+                continue
+            if type(value) is dict and isinstance(field, DocumentField):
+                nested = self[field_name]
+                if isinstance(nested, Document):
+                    nested.apply_patch(value)
+                    continue
+            self[field_name] = value
+        if patch:
+            self._post_init_validation()
+
+    def validate_all(self):
+        """Build lazy nested documents, see `DocumentField(lazy=True)`,
+        to get their validation errors. Nested documents are checked
+        recursively.
+
+        :raise ValidationError:
+        """
+        for value in self.values():
+            if isinstance(value, Document):
+                value.validate_all()
+            elif isinstance(value, ListType):
+                for item in value:
+                    if isinstance(item, Document):
+                        item.validate_all()
+
+    def _generic_as_dict(self):
+        fields = self._fields
         return {
-            field_name: self._fields[field_name].to_python(value)
+            field_name: fields.get(field_name, EXTRA_FIELD).to_python(value)
             for field_name, value in self.items()
         }
 
+    def _generic_to_json(self, encoder):
+        return encoder.encode(self.as_dict())
+
     def _prepare_fields(self, data, **kwargs):
         """Do field validations and set defaults
 
@@ -128,44 +941,38 @@ class Document(MutableMapping):
         :return:
         """
 
-        # It validates values on set, check fields.SimpleField#__set_value__
-        for field_name, field_obj in self._fields.items():
-            field_val = data.get(field_name, field_obj.default)
-
-            # Build model structure
-            if field_name in data:
-                # remove field from data, so at the end
-                # only extra fields would left.
-                data.pop(field_name)
-
-                # set presented field
-                field_obj.__set_value__(self, field_val, **kwargs)
-            else:
-                # field is not presented in the given init parameters
-                if field_val is None and self._meta['OMIT_MISSED_FIELDS']:
-                    # Run validation even on skipped fields to validate
-                    # 'required' and other attributes
-                    field_obj.validate(field_val)
-                    continue
-                field_obj.__set_value__(self, field_val, **kwargs)
+        # Known fields are set by the compiled per-class routine, which does
+        # the same as fields.SimpleField#__set_value__ for each field.
+        # It pops known fields from data, so at the end only extra fields
+        # would left.
+        if type(data) is not dict:
+            data = dict(data)
+        data = self._init_fields(data, kwargs)
 
         # Create extra fields if any were not filtered by `_clean_data` method.
         # ALLOW_EXTRA_FIELDS has an effect here
-        for key, value in data.items():
-            # py3 will raise an AttributeError without explicitly given 'None'
-            # as a 3rd parameter
-            if getattr(self, key, None):
-                raise DocumentError(
-                    "Can't add extra field '%s.%s' because document already has "
-                    "entity with the same name" % (self.__class__.__name__, key))
-            field_obj = ExtraField()
-            field_obj._name = key
-            field_obj._holder_name = self.__class__.__name__
-            self._fields[key] = field_obj
-
-            field_obj.__set_value__(self, value, **kwargs)
+        if data:
+            self._set_extra_fields(data)
         return data
 
+    def _set_extra_fields(self, data):
+        """Store extra values as is, see fields.ExtraField
+
+        :param data: dict of extra fields
+        """
+        cls = type(self)
+        for key in data:
+            # class attributes with falsy values, e.g. the `_extra_fields`
+            # default, are document internals as well
+            if hasattr(cls, key) or getattr(self, key, None):
+                raise DocumentError(
+                    "Can't add extra field '%s.%s' because document "
+                    "already has entity with the same name" %
+                    (self.__class__.__name__, key))
+
+        self.__dict__.update(data)
+        self.__dict__['_extra_fields'] = self._extra_fields + tuple(data)
+
     @classmethod
     def _clean_data(cls, kwargs):
         """Clean with excluding extra fields if the model has
@@ -185,19 +992,23 @@ class Document(MutableMapping):
     def _post_init_validation(self):
         """Validate model after init with validate_%s extra methods
         """
-        internals = dir(self)
-        # NOTE: this can be done in the DocumentMeta
-        for field_name, field_obj in self._fields.items():
-            method_name = 'validate_%s' % field_name
-            if method_name in internals:
-                validation_method = getattr(self, method_name)
-                if inspect.isfunction(validation_method):
-                    # NOTE: probably need to pass immutable copy of the object
-                    validation_method(self, self[field_name])
-                else:
-                    raise ModelValidationError(
-                        '%s (%r) is not a function' %
-                        (method_name, validation_method,))
+        hooks = self._validation_hooks
+        if self._extra_fields:
+            hooks += _find_validation_hooks(type(self), self._extra_fields)
+        self._run_validation_hooks(hooks)
+
+    def _run_validation_hooks(self, hooks):
+        """
+        :param hooks: list of (field name, method name, method), see
+        `_find_validation_hooks`
+        """
+        for field_name, method_name, validation_method in hooks:
+            if validation_method is None:
+                raise ModelValidationError(
+                    '%s (%r) is not a function' %
+                    (method_name, getattr(self, method_name),))
+            # NOTE: probably need to pass immutable copy of the object
+            validation_method(self, self[field_name])
 
     def __repr__(self):
         return '%s(%s)' % (self.__class__.__name__, dict(self))
@@ -206,6 +1017,48 @@ class Document(MutableMapping):
 class ImmutableDocument(Document):
     """Read only document. Useful for validation purposes only"""
 
+    @classmethod
+    def intern(cls, data=None, **kwargs):
+        """Get the document of the data from the model interning cache, the
+        document is created and cached if the data is seen the first time.
+
+        Enable the cache with INTERN_CACHE_SIZE meta option, nested
+        documents of the model are interned as well then. Without the cache
+        it's the same as `cls(data, **kwargs)`. Documents with values which
+        may be changed in place, e.g. a list of a `SimpleField`, are not
+        cached.
+
+        Usage:
+
+            class Person(ImmutableDocument):
+                name = CharField()
+
+                class Meta:
+                    INTERN_CACHE_SIZE = 1024
+
+            Person.intern({'name': 'John'}) is Person.intern({'name': 'John'})
+
+        :param data: document data mapping
+        :param kwargs: init parameters, see `Document.__init__`
+        :return: document
+        """
+        cache = cls._intern_cache
+        if cache is None:
+            return cls(data, **kwargs)
+        try:
+            key = freeze(data), freeze(
+                {k: v for k, v in kwargs.items() if k != 'copy_data'})
+            document = cache.get(key)
+        except TypeError:  # unhashable data
+            return cls(data, **kwargs)
+        if document is None:
+            document = cls(data, **kwargs)
+            # shared documents must not be changed in place, e.g. lists
+            # of generic fields
+            if all(_is_frozen(value) for value in document.values()):
+                cache[key] = document
+        return document
+
     def __setattr__(self, key, value):
         raise DocumentError(
             '{} is immutable. Set operation is not allowed.'.format(self))
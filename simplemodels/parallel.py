@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+"""Parallel validation of large batches in a pool of processes.
+
+Rows are sent to the worker processes by chunks, workers resolve the model
+by its module and registry name, so the model must be defined at the
+module level. Workers send back the validated data, documents are rebuilt
+by `Document.construct` in the calling process.
+
+Python 2 requires `futures` package: pip install simple-models[parallel]
+"""
+import sys
+from collections import deque
+from importlib import import_module
+from itertools import islice
+from multiprocessing import cpu_count
+
+from simplemodels.registry import registry
+
+try:
+    from concurrent.futures import ProcessPoolExecutor
+except ImportError:
+    ProcessPoolExecutor = None
+
+__all__ = ['validate_parallel']
+
+CHUNK_SIZE = 1000
+
+
+def _resolve_model(module_name, model_name):
+    """Get the model class in the worker process
+
+    :param module_name: name of the module which defines the model
+    :param model_name: model class name
+    :return: Document class
+    """
+    model = registry.get('%s.%s' % (module_name, model_name))
+    if model is None:
+        # the module isn't imported yet
+        model = getattr(import_module(module_name), model_name)
+    return model
+
+
+def _validate_chunk(module_name, model_name, rows, kwargs):
+    model = _resolve_model(module_name, model_name)
+    documents, errors = model.validate_many(rows, **kwargs)
+    rows = [None if doc is None else doc.as_dict() for doc in documents]
+    return rows, errors
+
+
+def _chunks(rows, chunk_size):
+    rows = iter(rows)
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def validate_parallel(model, rows, chunk_size=CHUNK_SIZE, max_workers=None,
+                      executor=None, **kwargs):
+    """Parallel version of `Document.validate_many`.
+
+    Rows are consumed lazily, only a few chunks per worker are in flight
+    at once.
+
+    :param model: Document class defined at the module level
+    :param rows: iterable of data mappings
+    :param chunk_size: number of rows sent to a worker at once
+    :param max_workers: number of processes, CPU count by default
+    :param executor: existing `concurrent.futures.Executor` to use instead
+    of creating a process pool, pass its `max_workers` as well
+    :param kwargs: init parameters, see `Document.__init__`
+    :return: tuple (documents, errors), see `Document.validate_many`
+    """
+    module_name, model_name = model.__module__, model.__name__
+    # Documents are pickled back by the class reference as well
+    if getattr(sys.modules.get(module_name), model_name, None) is not model:
+        raise ValueError(
+            "Model %r can't be resolved by workers, it must be defined at "
+            "the module level" % model)
+
+    max_workers = max_workers or cpu_count()
+    if executor is None:
+        if ProcessPoolExecutor is None:
+            raise ImportError(
+                "Parallel validation requires 'futures' package on python 2")
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            return validate_parallel(
+                model, rows, chunk_size=chunk_size, max_workers=max_workers,
+                executor=executor, **kwargs)
+
+    # Limit of chunks in flight keeps the memory bounded for large inputs
+    max_pending = 2 * max_workers
+    construct = model.construct
+    documents, errors = [], {}
+    pending = deque()
+
+    def collect():
+        offset = len(documents)
+        chunk_rows, chunk_errors = pending.popleft().result()
+        documents.extend([None if data is None else construct(data)
+                          for data in chunk_rows])
+        for idx, err in chunk_errors.items():
+            errors[offset + idx] = err
+
+    for chunk in _chunks(rows, chunk_size):
+        if len(pending) >= max_pending:
+            collect()
+        pending.append(executor.submit(
+            _validate_chunk, module_name, model_name, chunk, kwargs))
+    while pending:
+        collect()
+    return documents, errors
@@ -0,0 +1,374 @@
+# -*- coding: utf-8 -*-
+"""Fixed-width records of documents packed to a contiguous buffer.
+
+Documents of the models which have only fixed size fields (`IntegerField`,
+`FloatField`, `BooleanField`, `DateTimeField` and `CharField` with
+`max_length`) are packed by `struct` to records of the same size. Records
+are read by views which decode field values on access, so millions of
+records are kept in a single buffer instead of a python object per record.
+
+Usage:
+
+    layout = RecordLayout(Event)
+    records = layout.pack_many(events)  # RecordArray
+    records[0].duration  # decoded from the buffer
+    event = records[0].to_document()
+"""
+import hashlib
+import struct
+from collections import Sequence
+
+import six
+
+from simplemodels.binary import _datetime_to_int, _int_to_datetime, \
+    _ordered, fingerprint
+from simplemodels.compiler import defined_by
+from simplemodels.exceptions import DocumentError
+from simplemodels.fields import BooleanField, CharField, DateTimeField, \
+    FloatField, IntegerField, SimpleField
+
+__all__ = ['RecordLayout', 'RecordView', 'RecordArray']
+
+# Bit mask of None values, it's the first item of the record
+_MASK = struct.Struct('<Q')
+_MAX_FIELDS = 64
+
+
+def _char_codec(size):
+    def encode(value):
+        if not isinstance(value, six.binary_type):
+            value = six.text_type(value).encode('utf-8')
+        if len(value) > size:
+            raise ValueError('Value %r is longer than %d bytes' % (
+                value, size))
+        return value
+
+    def decode(value):
+        return value.rstrip(b'\0').decode('utf-8')
+
+    return encode, decode
+
+
+def _field_format(field, char_size):
+    """Get the struct format of the field value and its converters.
+
+    :return: tuple (format, encode, decode, null value) or None if the field
+    has no fixed size
+    """
+    typecast_cls = defined_by(field, '_typecast')
+    to_python_cls = defined_by(field, 'to_python')
+    if typecast_cls is DateTimeField and to_python_cls is DateTimeField:
+        return 'q', _datetime_to_int, _int_to_datetime, 0
+    if to_python_cls is not SimpleField:
+        return None
+    if typecast_cls is IntegerField:
+        return 'q', None, None, 0
+    if typecast_cls is FloatField:
+        return 'd', None, None, 0.0
+    if typecast_cls is BooleanField:
+        return '?', None, None, False
+    if typecast_cls is CharField and field._max_length:
+        size = field._max_length * char_size
+        encode, decode = _char_codec(size)
+        return '%ds' % size, encode, decode, b''
+    return None
+
+
+class RecordLayout(object):
+    """Struct layout of the document records: the bit mask of None values
+    followed by field values ordered by field names, the order doesn't
+    depend on the python version.
+
+    Datetime values are stored as epoch microseconds, char values as utf-8
+    bytes padded with zero bytes. Check `fingerprint` of the layout which
+    stored records have been written with, e.g. keep it along with them.
+    """
+
+    def __init__(self, model, char_size=4):
+        """
+        :param model: Document class
+        :param char_size: bytes per character of `CharField(max_length=N)`
+        values, 4 fits any utf-8 value, 1 is enough for ascii ones
+        :raise DocumentError: if the model has fields of no fixed size
+        """
+        fields = _ordered(model)
+        if len(fields) > _MAX_FIELDS:
+            raise DocumentError('Records support up to %d fields, %s has %d'
+                                % (_MAX_FIELDS, model.__name__, len(fields)))
+
+        formats, self._fields = [], []
+        for field in fields:
+            field_format = _field_format(field, char_size)
+            if field_format is None:
+                raise DocumentError(
+                    "Field '%s.%s' has no fixed size record format" % (
+                        model.__name__, field.name))
+            formats.append(field_format[0])
+            self._fields.append((field.name,) + field_format[1:])
+
+        self.model = model
+        record_format = '<Q' + ''.join(formats)
+        self.struct = struct.Struct(record_format)
+        self.size = self.struct.size
+        # schema of the model and sizes of char fields
+        self.fingerprint = hashlib.sha1(
+            fingerprint(model) + record_format.encode('ascii')).digest()[:8]
+        self.view_class = self._build_view_class(formats)
+
+    def _build_view_class(self, formats):
+        attrs = {'__slots__': (), 'layout': self}
+        offset = _MASK.size
+        for bit, (field_format, field) in enumerate(zip(formats,
+                                                        self._fields)):
+            item = struct.Struct('<' + field_format)
+            attrs[field[0]] = _RecordField(
+                field[0], item.unpack_from, offset, 1 << bit, field[2])
+            offset += item.size
+        name = '%sView' % self.model.__name__
+        return type(name if six.PY3 else name.encode(), (RecordView,), attrs)
+
+    def field_index(self, name):
+        """
+        :param name: field name
+        :return: position of the field in the record
+        :raise KeyError: if there is no such field
+        """
+        for index, field in enumerate(self._fields):
+            if field[0] == name:
+                return index
+        raise KeyError(name)
+
+    def pack_into(self, buf, offset, document):
+        """Write the document record to the buffer
+
+        :param buf: writable buffer, e.g. bytearray
+        :param offset: record offset in bytes
+        :param document: Document instance
+        :raise ValueError: if a value doesn't fit the record
+        """
+        mask = 0
+        values = [0]
+        for bit, (name, encode, _, null) in enumerate(self._fields):
+            value = getattr(document, name)
+            if value is None:
+                mask |= 1 << bit
+                value = null
+            elif encode is not None:
+                value = encode(value)
+            values.append(value)
+        values[0] = mask
+        try:
+            self.struct.pack_into(buf, offset, *values)
+        except struct.error as err:
+            raise ValueError('%s record of %r: %s' % (
+                self.model.__name__, document, err))
+
+    def pack(self, document):
+        """
+        :param document: Document instance
+        :return: bytes of the record
+        """
+        buf = bytearray(self.size)
+        self.pack_into(buf, 0, document)
+        return bytes(buf)
+
+    def pack_many(self, documents):
+        """Pack documents to a single buffer
+
+        :param documents: iterable of documents
+        :return: RecordArray
+        """
+        documents = list(documents)
+        buf = bytearray(self.size * len(documents))
+        for index, document in enumerate(documents):
+            self.pack_into(buf, index * self.size, document)
+        return RecordArray(self, buf)
+
+    def unpack_data(self, buf, offset=0):
+        """Read the record to the data mapping
+
+        :param buf: buffer, e.g. bytes or memoryview
+        :param offset: record offset in bytes
+        :return: dict
+        """
+        values = self.struct.unpack_from(buf, offset)
+        mask = values[0]
+        data = {}
+        for bit, (name, _, decode, _) in enumerate(self._fields):
+            value = values[bit + 1]
+            if mask >> bit & 1:
+                value = None
+            elif decode is not None:
+                value = decode(value)
+            data[name] = value
+        return data
+
+    def unpack(self, buf, offset=0):
+        """Read the record to the document, it's created by
+        `Document.construct`
+
+        :return: document
+        """
+        return self.model.construct(self.unpack_data(buf, offset))
+
+    def __repr__(self):
+        return '<%s of %s: %d bytes>' % (
+            self.__class__.__name__, self.model.__name__, self.size)
+
+
+class _RecordField(object):
+    """Descriptor which decodes the field value of the record view"""
+
+    def __init__(self, name, unpack_from, offset, bit, decode):
+        self.name = name
+        self._unpack_from = unpack_from
+        self._offset = offset
+        self._bit = bit
+        self._decode = decode
+
+    def __get__(self, view, owner):
+        if view is None:
+            return self
+        buf, offset = view._buf, view._offset
+        if _MASK.unpack_from(buf, offset)[0] & self._bit:
+            return None
+        value = self._unpack_from(buf, offset + self._offset)[0]
+        if self._decode is not None:
+            return self._decode(value)
+        return value
+
+    def __set__(self, view, value):
+        raise AttributeError("Record field '%s' is read-only" % self.name)
+
+
+class RecordView(object):
+    """Read-only view of the record in the buffer, field values are decoded
+    on access. View classes are built by `RecordLayout`, see
+    `RecordLayout.view_class`.
+    """
+
+    __slots__ = ('_buf', '_offset')
+
+    layout = None
+
+    def __init__(self, buf, offset=0):
+        """
+        :param buf: buffer, e.g. memoryview
+        :param offset: record offset in bytes
+        """
+        self._buf = buf
+        self._offset = offset
+
+    def as_data(self):
+        """
+        :return: dict of the field values
+        """
+        return self.layout.unpack_data(self._buf, self._offset)
+
+    def to_document(self):
+        return self.layout.unpack(self._buf, self._offset)
+
+    def __eq__(self, other):
+        if isinstance(other, RecordView):
+            return self.layout is other.layout and self.as_data() == \
+                other.as_data()
+        return NotImplemented
+
+    def __ne__(self, other):
+        result = self.__eq__(other)
+        return result if result is NotImplemented else not result
+
+    __hash__ = None
+
+    def __repr__(self):
+        return '<%s: %r>' % (self.__class__.__name__, self.as_data())
+
+
+class RecordArray(Sequence):
+    """Sequence of record views over the contiguous buffer, slices share
+    the buffer.
+    """
+
+    def __init__(self, layout, buf, fingerprint=None):
+        """
+        :param layout: RecordLayout
+        :param buf: buffer of records, e.g. bytearray or mmap
+        :param fingerprint: layout fingerprint the records are written
+        with, it's checked if given, see `RecordLayout.fingerprint`
+        :raise DocumentError: if the fingerprint doesn't match the layout
+        """
+        if fingerprint is not None and fingerprint != layout.fingerprint:
+            raise DocumentError(
+                "Records are written by an incompatible layout of '%s' model"
+                % layout.model.__name__)
+        buf = memoryview(buf)
+        if buf.ndim != 1 or buf.itemsize != 1:
+            buf = buf.cast('B')
+        if len(buf) % layout.size:
+            raise ValueError('Buffer size %d is not a multiple of the record '
+                             'size %d' % (len(buf), layout.size))
+        self.layout = layout
+        self.buffer = buf
+
+    def __len__(self):
+        return len(self.buffer) // self.layout.size
+
+    def __getitem__(self, index):
+        size = self.layout.size
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self))
+            if step != 1:
+                raise ValueError('Record array slice step must be 1')
+            stop = max(start, stop)
+            return RecordArray(self.layout,
+                               self.buffer[start * size:stop * size])
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError('record index out of range')
+        return self.layout.view_class(self.buffer, index * size)
+
+    def __iter__(self):
+        view_class, buf = self.layout.view_class, self.buffer
+        for offset in range(0, len(buf), self.layout.size):
+            yield view_class(buf, offset)
+
+    def column(self, name):
+        """Decode values of the field of all records at once
+
+        :param name: field name
+        :return: list of values
+        """
+        layout = self.layout
+        bit = layout.field_index(name)
+        decode = layout._fields[bit][2]
+        if hasattr(layout.struct, 'iter_unpack'):
+            rows = layout.struct.iter_unpack(self.buffer)
+        else:  # python 2
+            unpack_from, buf = layout.struct.unpack_from, self.buffer
+            rows = (unpack_from(buf, offset)
+                    for offset in range(0, len(buf), layout.size))
+
+        index = bit + 1
+        result = []
+        append = result.append
+        for row in rows:
+            if row[0] >> bit & 1:
+                append(None)
+            elif decode is not None:
+                append(decode(row[index]))
+            else:
+                append(row[index])
+        return result
+
+    def to_documents(self):
+        """
+        :return: list of documents
+        """
+        unpack, buf = self.layout.unpack, self.buffer
+        return [unpack(buf, offset)
+                for offset in range(0, len(buf), self.layout.size)]
+
+    def __repr__(self):
+        return '<%s of %s: %d records>' % (
+            self.__class__.__name__, self.layout.model.__name__, len(self))
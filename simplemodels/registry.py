@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+"""Registry of document classes, string model references of `DocumentField`
+and `ListField` are resolved through it.
+
+Models are registered by the class name and by the full
+`<module>.<class name>` one, use the latter to refer to a model whose name
+is not unique.
+"""
+import warnings
+import weakref
+
+from simplemodels.exceptions import ModelNotFoundError
+
+__all__ = ['registry', 'register', 'resolve_models', 'ModelReference']
+
+registry = weakref.WeakValueDictionary()
+
+# Incremented on every registration, it invalidates resolved references
+version = 0
+
+
+def register(model):
+    """Add the model to the registry. The latest model wins if several
+    models of different modules have the same name, a warning is issued.
+
+    :param model: Document class
+    """
+    global version
+
+    name = model.__name__
+    full_name = '%s.%s' % (model.__module__, name)
+    registered = registry.get(name)
+    if registered is not None and registered.__module__ != model.__module__:
+        warnings.warn(
+            "Model '%s' of '%s' module shadows the one of '%s' module, use "
+            "full '%s' name to refer to it" % (
+                name, model.__module__, registered.__module__, full_name),
+            stacklevel=3)
+    registry[name] = model
+    registry[full_name] = model
+    version += 1
+
+
+def resolve_models():
+    """Resolve string model references of all registered models, e.g. at
+    the application startup, instead of doing it on the first use.
+
+    :raise ModelNotFoundError: if some reference can't be resolved
+    """
+    for model in set(registry.values()):
+        for field in model._fields.values():
+            reference = getattr(field, '_reference', None)
+            if reference is not None:
+                reference.resolve()
+
+
+class ModelReference(object):
+    """Model name which is resolved once, the result is cached until the
+    registry is changed or the model is collected.
+    """
+
+    __slots__ = ('name', '_cache')
+
+    def __init__(self, name):
+        """
+        :param name: model name or full `<module>.<class name>` one
+        """
+        self.name = name
+        # tuple (registry version, model weakref), it's replaced at once,
+        # so concurrent readers always get a consistent pair
+        self._cache = None
+
+    def get(self):
+        """
+        :return: Document class or None if it's not registered
+        """
+        cache = self._cache
+        if cache is not None and cache[0] == version:
+            model = cache[1]()
+            if model is not None:
+                return model
+
+        # version is read before the lookup, a model registered meanwhile
+        # invalidates the cache
+        current_version = version
+        model = registry.get(self.name)
+        if model is not None:
+            self._cache = current_version, weakref.ref(model)
+        return model
+
+    def resolve(self):
+        """
+        :return: Document class
+        :raise ModelNotFoundError:
+        """
+        model = self.get()
+        if model is None:
+            raise ModelNotFoundError("Model '%s' does not exist" % self.name)
+        return model
+
+    def __repr__(self):
+        return '%s(%r)' % (self.__class__.__name__, self.name)
@@ -0,0 +1,292 @@
+# -*- coding: utf-8 -*-
+"""Append-only files of documents read through the memory mapping.
+
+Documents are written in the `simplemodels.binary` format one after
+another, the end offsets of records are appended to the `<path>.idx`
+index file. Readers map both files, so processes which open the same
+store share its pages through the OS page cache, and records are decoded
+only when they are accessed.
+
+Usage:
+
+    with StoreWriter('products.sms', Product) as writer:
+        writer.extend(products)
+
+    with StoreReader('products.sms', Product) as products:
+        product = products[100500]  # StoredDocument
+        product.title  # the record is decoded on the first access
+"""
+import mmap
+import os
+import struct
+
+from simplemodels.binary import HEADER_SIZE, MAGIC, _codec
+from simplemodels.exceptions import DocumentError
+
+__all__ = ['StoreWriter', 'StoreReader', 'StoredDocument']
+
+_OFFSET = struct.Struct('<Q')
+
+
+def _index_path(path):
+    return path + '.idx'
+
+
+class StoreWriter(object):
+    """Appends documents to the store, the file is created if it doesn't
+    exist. Offsets are appended to the index only after the data is synced
+    to the disk, records which are written, but not indexed, e.g. on a
+    crash, are dropped on open.
+    """
+
+    #: Count of records which offsets are kept in memory before the flush
+    INDEX_BUFFER_SIZE = 1024
+
+    def __init__(self, path, model):
+        """
+        :param path: data file path
+        :param model: Document class
+        :raise DocumentError: if the store is written by another schema
+        """
+        self.model = model
+        self._codec = _codec(model)
+        self._pending = []
+        self._fp = open(path, 'a+b')
+        self._index = open(_index_path(path), 'a+b')
+        try:
+            self._end = self._recover()
+        except Exception:
+            self.close()
+            raise
+
+    def _recover(self):
+        """Check the header and cut the tail which isn't indexed
+
+        :return: end offset of the last record
+        """
+        fp, index = self._fp, self._index
+        fp.seek(0)
+        header = fp.read(HEADER_SIZE)
+        if not header:
+            fp.write(self._codec.header)
+            fp.flush()
+            header = self._codec.header
+        _check_header(header, self._codec, self.model)
+
+        def read_offset(record_index):
+            index.seek(record_index * _OFFSET.size)
+            return _OFFSET.unpack(index.read(_OFFSET.size))[0]
+
+        fp.seek(0, os.SEEK_END)
+        index.seek(0, os.SEEK_END)
+        # partial entry and entries of data which isn't on the disk
+        self._count = _indexed_count(
+            read_offset, index.tell() // _OFFSET.size, fp.tell())
+        end = read_offset(self._count - 1) if self._count else HEADER_SIZE
+        index.truncate(self._count * _OFFSET.size)
+        fp.truncate(end)
+        return end
+
+    def append(self, document):
+        """The record is visible for readers after the writer is flushed,
+        it's done for every `INDEX_BUFFER_SIZE` records and on close.
+
+        :param document: Document instance
+        :return: index of the record
+        """
+        parts = []
+        self._codec.encode(document, parts.append)
+        record = b''.join(parts)
+        self._fp.write(record)
+        self._end += len(record)
+        self._pending.append(self._end)
+        self._count += 1
+        if len(self._pending) >= self.INDEX_BUFFER_SIZE:
+            self.flush()
+        return self._count - 1
+
+    def extend(self, documents):
+        for document in documents:
+            self.append(document)
+
+    def flush(self):
+        """Write records to the disk, then append their offsets to the
+        index, so the index never refers to data which isn't written
+        """
+        self._fp.flush()
+        os.fsync(self._fp.fileno())
+        if self._pending:
+            self._index.write(b''.join(
+                _OFFSET.pack(end) for end in self._pending))
+            del self._pending[:]
+        self._index.flush()
+
+    def close(self):
+        if not self._fp.closed:
+            self.flush()
+        self._fp.close()
+        self._index.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class StoreReader(object):
+    """Read-only sequence of stored documents, items are `StoredDocument`
+    views. Records appended after the reader is opened are not visible.
+    """
+
+    def __init__(self, path, model):
+        """
+        :param path: data file path
+        :param model: Document class
+        :raise DocumentError: if the store is written by another schema
+        """
+        self.model = model
+        self._codec = _codec(model)
+        with open(path, 'rb') as fp:
+            _check_header(fp.read(HEADER_SIZE), self._codec, model)
+            self._data = mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+        with open(_index_path(path), 'rb') as fp:
+            size = os.fstat(fp.fileno()).st_size
+            self._index = mmap.mmap(
+                fp.fileno(), 0, access=mmap.ACCESS_READ) if size else b''
+        # index may be appended after the data is mapped
+        self._count = _indexed_count(
+            lambda i: _OFFSET.unpack_from(self._index, i * _OFFSET.size)[0],
+            size // _OFFSET.size, len(self._data))
+
+    def __len__(self):
+        return self._count
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[idx] for idx in range(*index.indices(self._count))]
+        if index < 0:
+            index += self._count
+        if not 0 <= index < self._count:
+            raise IndexError('store index out of range')
+        return StoredDocument(self, index)
+
+    def __iter__(self):
+        for index in range(self._count):
+            yield StoredDocument(self, index)
+
+    def record(self, index):
+        """Get the encoded record
+
+        :param index: non-negative record index
+        :return: bytearray
+        """
+        start = HEADER_SIZE
+        if index:
+            start = _OFFSET.unpack_from(
+                self._index, (index - 1) * _OFFSET.size)[0]
+        end = _OFFSET.unpack_from(self._index, index * _OFFSET.size)[0]
+        return bytearray(self._data[start:end])
+
+    def load(self, index):
+        """Decode the document of the record, it's created by
+        `Document.construct`
+
+        :param index: non-negative record index
+        :return: document
+        """
+        data, _ = self._codec.decode(self.record(index), 0)
+        return self.model.construct(data)
+
+    def close(self):
+        self._data.close()
+        if not isinstance(self._index, bytes):
+            self._index.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __repr__(self):
+        return '<%s of %s: %d documents>' % (
+            self.__class__.__name__, self.model.__name__, self._count)
+
+
+class StoredDocument(object):
+    """Lazy view of the stored document, the record is decoded on the first
+    access of its fields. Fixed-width records of `simplemodels.records` over
+    the mapped file decode single fields instead.
+    """
+
+    __slots__ = ('_reader', '_index', '_document')
+
+    def __init__(self, reader, index):
+        self._reader = reader
+        self._index = index
+        self._document = None
+
+    @property
+    def index(self):
+        return self._index
+
+    @property
+    def document(self):
+        """
+        :return: Document instance
+        """
+        if self._document is None:
+            self._document = self._reader.load(self._index)
+        return self._document
+
+    def __getattr__(self, name):
+        # Private names are looked up before the slots are set, e.g. by
+        # `copy` or `pickle`, so delegating them would recurse
+        if name.startswith('_') or name == 'document':
+            raise AttributeError(name)
+        return getattr(self.document, name)
+
+    def __getitem__(self, name):
+        return self.document[name]
+
+    def __copy__(self):
+        result = self.__class__(self._reader, self._index)
+        result._document = self._document
+        return result
+
+    def __reduce__(self):
+        raise TypeError("Can't pickle %s, it refers to the open store, "
+                        "pickle its document instead"
+                        % self.__class__.__name__)
+
+    def __repr__(self):
+        if self._document is None:
+            return '<%s of %s #%d>' % (self.__class__.__name__,
+                                       self._reader.model.__name__,
+                                       self._index)
+        return '<%s #%d: %r>' % (self.__class__.__name__, self._index,
+                                 self._document)
+
+
+def _indexed_count(read_offset, count, size):
+    """Skip the index entries which refer past the end of data
+
+    :param read_offset: function of the record index, returns its end
+    offset
+    :param count: count of index entries
+    :param size: data size
+    :return: count of records
+    """
+    while count and read_offset(count - 1) > size:
+        count -= 1
+    return count
+
+
+def _check_header(header, codec, model):
+    if len(header) < HEADER_SIZE or header[:len(MAGIC)] != MAGIC:
+        raise ValueError('Not a simplemodels store')
+    if header != codec.header:
+        raise DocumentError(
+            "Store is written by an incompatible schema of '%s' model"
+            % model.__name__)
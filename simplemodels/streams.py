@@ -0,0 +1,302 @@
+# -*- coding: utf-8 -*-
+"""Streaming JSON input and output of documents.
+
+The reader accepts both newline delimited JSON (one document per line) and
+a top-level JSON array of documents. The data is parsed incrementally, only
+the current chunk of the file and a single document are kept in memory.
+Documents are written by `Document.to_json`, which encodes stored values
+directly without the intermediate `as_dict` result.
+"""
+import codecs
+import io
+import json
+import re
+from decimal import Decimal
+from json.encoder import encode_basestring, encode_basestring_ascii
+
+import six
+
+__all__ = ['iter_json', 'iter_documents', 'load_document', 'dump_documents',
+           'DocumentEncoder']
+
+CHUNK_SIZE = 64 * 1024
+
+_WHITESPACE = re.compile(r'[ \t\n\r]*')
+
+# Rest of the number which is cut by the end of the buffer
+_NUMBER_TAIL = re.compile(r'[0-9.eE+-]+\Z')
+_NUMBER_TYPES = frozenset(six.integer_types + (float,))
+
+# Length of the longest JSON token which isn't a string or a number,
+# i.e. the '\uXXXX' escape
+_MAX_TOKEN_SIZE = 6
+
+
+class _Scanner(object):
+    """Incremental JSON values scanner over a file object"""
+
+    def __init__(self, fp, chunk_size):
+        self._read = fp.read
+        self._chunk_size = chunk_size
+        self._decoder = codecs.getincrementaldecoder('utf-8-sig')()
+        self._raw_decode = json.JSONDecoder().raw_decode
+        self.buffer = u''
+        self.pos = 0
+        self.eof = False
+
+    def fill(self, size=0):
+        """Read the next chunk of the file, consumed part of the buffer
+        is dropped.
+
+        :param size: minimal size of the chunk
+        :return: False if the end of the file is reached
+        """
+        if self.eof:
+            return False
+        chunk = self._read(max(size, self._chunk_size))
+        while isinstance(chunk, six.binary_type):
+            raw = chunk
+            chunk = self._decoder.decode(raw, final=not raw)
+            if chunk or not raw:
+                break
+            # incomplete multibyte character
+            chunk = self._read(self._chunk_size)
+        if not chunk:
+            self.eof = True
+            return False
+        if not self.buffer and chunk[0] == u'\ufeff':
+            # byte order mark of a file opened in text mode
+            chunk = chunk[1:]
+        self.buffer = self.buffer[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self):
+        """Skip whitespaces and get the next character.
+
+        :return: character or empty string at the end of the file
+        """
+        while True:
+            self.pos = _WHITESPACE.match(self.buffer, self.pos).end()
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self.fill():
+                return u''
+
+    def value(self):
+        """Decode the next JSON value, the buffer is extended until the
+        value is complete.
+        """
+        self.peek()
+        while True:
+            try:
+                value, end = self._raw_decode(self.buffer, self.pos)
+            except ValueError as err:
+                # Python 2 errors have no reliable position
+                if getattr(err, 'pos', None) is not None and \
+                        not self._is_truncated(err):
+                    raise
+                # Value is decoded from scratch after each read, so read
+                # large values by exponentially growing chunks
+                if self.fill(len(self.buffer) - self.pos):
+                    continue
+                raise
+            # A number may continue in the next chunk, e.g. '-1' of '-1.5'
+            if (end == len(self.buffer) or
+                    type(value) in _NUMBER_TYPES and
+                    _NUMBER_TAIL.match(self.buffer, end)) and self.fill():
+                continue
+            self.pos = end
+            return value
+
+    def _is_truncated(self, err):
+        """Check if the decoding error may be caused by the end of the
+        buffer, i.e. the value may continue in the next chunk. Otherwise
+        the value is malformed, and the rest of the file isn't read.
+
+        :param err: json.JSONDecodeError
+        :return: bool
+        """
+        if err.msg.startswith('Unterminated string'):
+            return True
+        # The rest of the buffer is too short to hold a complete token,
+        # e.g. 'fals' or an incomplete '\uXXXX' escape
+        return len(self.buffer) - err.pos < _MAX_TOKEN_SIZE
+
+    def expect(self, chars):
+        char = self.peek()
+        if char not in chars:
+            raise ValueError('Expecting %s at %r' % (
+                ' or '.join(repr(c) for c in chars),
+                self.buffer[self.pos:self.pos + 20]))
+        self.pos += 1
+        return char
+
+
+class DocumentEncoder(object):
+    """Options of the direct JSON serialization of documents, see
+    `Document.to_json`. The output is compact, i.e. without whitespaces
+    between items.
+
+    Document classes compile their encoding routine which reads
+    the `encode`, `string` and `decimal` functions of the encoder.
+    """
+
+    def __init__(self, decimal_as_string=False, ensure_ascii=True,
+                 default=None):
+        """
+        :param decimal_as_string: encode `DecimalField` values as strings
+        instead of numbers to keep the precision for float based parsers
+        :param ensure_ascii: escape non-ascii characters, see `json.dumps`
+        :param default: function which gets a serializable version of
+        an unsupported value, see `json.dumps`
+        """
+        self._default = default
+        self.encode = json.JSONEncoder(
+            ensure_ascii=ensure_ascii, separators=(',', ':'),
+            default=self.default).encode
+        self.string = \
+            encode_basestring_ascii if ensure_ascii else encode_basestring
+        self.decimal = _decimal_string if decimal_as_string else six.text_type
+        self.decimal_as_string = decimal_as_string
+
+    def default(self, value):
+        """Get a serializable version of values of generic fields, e.g.
+        decimals in a `DictField`
+        """
+        if isinstance(value, Decimal):
+            # json module can't write a raw number
+            return str(value) if self.decimal_as_string else float(value)
+        if self._default is not None:
+            return self._default(value)
+        raise TypeError('%r is not JSON serializable' % (value,))
+
+
+def _decimal_string(value):
+    return u'"%s"' % value
+
+
+DEFAULT_ENCODER = DocumentEncoder()
+
+# dump_documents parameters which are supported by the DocumentEncoder
+_ENCODER_PARAMS = frozenset(['decimal_as_string', 'ensure_ascii', 'default'])
+
+
+def iter_json(fp, chunk_size=CHUNK_SIZE):
+    """Iterate over JSON values of a newline delimited JSON or items of
+    a top-level JSON array.
+
+    :param fp: file object opened in text or binary mode, binary data
+    must be utf-8 encoded
+    :param chunk_size: size of the chunk to read from the file at once
+    :return: generator of decoded values
+    :raise ValueError: on malformed JSON
+    """
+    scanner = _Scanner(fp, chunk_size)
+    if scanner.peek() == u'[':
+        scanner.pos += 1
+        if scanner.peek() != u']':
+            while True:
+                yield scanner.value()
+                if scanner.expect((u',', u']')) == u']':
+                    break
+        else:
+            scanner.pos += 1
+        if scanner.peek():
+            raise ValueError('Extra data after the JSON array')
+    else:
+        while scanner.peek():
+            yield scanner.value()
+
+
+def iter_documents(model, fp, chunk_size=CHUNK_SIZE, **kwargs):
+    """Iterate over documents stored in a newline delimited JSON or
+    a top-level JSON array.
+
+    Decoded data isn't referenced by anyone else, so it's handed over to
+    the documents without a copy, unless `copy_data` is given explicitly.
+
+    :param model: Document class
+    :param fp: file object, see `iter_json`
+    :param chunk_size: size of the chunk to read from the file at once
+    :param kwargs: init parameters, see `Document.__init__`
+    :return: generator of documents
+    """
+    kwargs.setdefault('copy_data', False)
+    create = model._batch_factory(kwargs)
+    for data in iter_json(fp, chunk_size=chunk_size):
+        yield create(data)
+
+
+def load_document(model, text, **kwargs):
+    """Decode a single document from the JSON object.
+
+    The data is decoded by the C accelerated json module and handed over to
+    the document without a copy, unless `copy_data` is given explicitly.
+    Unknown keys are dropped while the data is passed to the fields,
+    see `Document.from_many`.
+
+    :param model: Document class
+    :param text: JSON text or utf-8 encoded bytes
+    :param kwargs: init parameters, see `Document.__init__`
+    :return: document
+    :raise ValueError: on malformed JSON
+    """
+    if isinstance(text, six.binary_type):
+        text = text.decode('utf-8')
+    kwargs.setdefault('copy_data', False)
+    return model._batch_factory(kwargs)(json.loads(text))
+
+
+def dump_documents(documents, fp, array=False, **dumps_kwargs):
+    """Write documents one by one as a newline delimited JSON or
+    a JSON array.
+
+    Documents are encoded by `Document.to_json`, other `json.dumps`
+    parameters than the `DocumentEncoder` ones, e.g. `indent`, make it
+    fall back to `json.dumps(document.as_dict())`.
+
+    :param documents: iterable of documents
+    :param fp: file object opened in text or binary mode
+    :param array: write a JSON array instead of a newline delimited JSON
+    :param dumps_kwargs: `DocumentEncoder` or `json.dumps` parameters,
+    e.g. `default`
+    :return: number of written documents
+    """
+    write = fp.write
+    if _is_binary(fp):
+        write = lambda text: fp.write(text.encode('utf-8'))
+    if _ENCODER_PARAMS.issuperset(dumps_kwargs):
+        encoder = DocumentEncoder(**dumps_kwargs) \
+            if dumps_kwargs else DEFAULT_ENCODER
+        dumps = lambda document: document._to_json(encoder)
+    else:
+        dumps = lambda document: json.dumps(
+            document.as_dict(), **dumps_kwargs)
+    separator = u',\n' if array else u'\n'
+
+    count = 0
+    for count, document in enumerate(documents, 1):
+        if array:
+            write(u'[' if count == 1 else separator)
+        write(dumps(document))
+        if not array:
+            write(separator)
+
+    if array:
+        write(u']' if count else u'[]')
+    return count
+
+
+def _is_binary(fp):
+    """
+    :param fp: file object
+    :return: True if the file is written by bytes
+    """
+    if isinstance(fp, io.TextIOBase):
+        return False
+    if six.PY2 or isinstance(fp, (io.RawIOBase, io.BufferedIOBase)):
+        # python 2 files accept str bytes in both modes
+        return True
+    mode = getattr(fp, 'mode', None)
+    return isinstance(mode, six.string_types) and 'b' in mode
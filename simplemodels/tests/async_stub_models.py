@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+"""Tests stub models with async validators, python 3.5+ only"""
+import asyncio
+
+from simplemodels.exceptions import ModelValidationError
+from simplemodels.fields import CharField, DocumentField, IntegerField, \
+    ListField
+from simplemodels.models import Document
+
+# Names of the running validators, it's used to check they run concurrently
+running = set()
+calls = []
+
+
+async def known_user(value):
+    running.add('user')
+    await asyncio.sleep(0.01)
+    calls.append(('user', value, sorted(running)))
+    running.discard('user')
+    return value != 'unknown'
+
+
+async def known_country(value):
+    running.add('country')
+    await asyncio.sleep(0.01)
+    calls.append(('country', value, sorted(running)))
+    running.discard('country')
+    return value != 'Atlantis'
+
+
+class AsyncAddress(Document):
+    country = CharField(validators=[known_country])
+
+
+class AsyncUser(Document):
+    name = CharField(required=True, validators=[known_user])
+    age = IntegerField()
+    address = DocumentField(AsyncAddress)
+    addresses = ListField(of=AsyncAddress)
+
+    @staticmethod
+    async def validate_age(document, value):
+        await asyncio.sleep(0)
+        calls.append(('hook', value))
+        if value is not None and value < 0:
+            raise ModelValidationError('Age must be positive')
+
+
+class LazyAsyncUser(Document):
+    address = DocumentField(AsyncAddress, lazy=True)
+    addresses = ListField(of=AsyncAddress, lazy=True)
+
+
+class SlottedAsyncUser(AsyncUser):
+    class Meta:
+        USE_SLOTS = True
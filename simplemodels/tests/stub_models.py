@@ -46,6 +46,11 @@ class Person(Document):
     phones = ListField(int)
 
 
+class SlottedPerson(Person):
+    class Meta:
+        USE_SLOTS = True
+
+
 class Comment(Document):
     body = CharField()
     author = DocumentField(Person)
@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+import sys
+import unittest
+import warnings
+
+from simplemodels.exceptions import AsyncValidationWarning, \
+    FieldRequiredError, ModelValidationError, ValidationError
+from simplemodels.tests.stub_models import Person
+
+if sys.version_info >= (3, 5):
+    import asyncio
+    from simplemodels.aio import has_async_validation
+    from simplemodels.tests import async_stub_models
+    from simplemodels.tests.async_stub_models import AsyncUser, \
+        LazyAsyncUser, SlottedAsyncUser
+
+
+@unittest.skipIf(sys.version_info < (3, 5), 'async syntax is not supported')
+class AsyncCreateTest(unittest.TestCase):
+
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        del async_stub_models.calls[:]
+
+    def tearDown(self):
+        self.loop.close()
+
+    def run_async(self, coroutine):
+        return self.loop.run_until_complete(coroutine)
+
+    def test_acreate(self):
+        user = self.run_async(AsyncUser.acreate(
+            {'name': 'John', 'age': 20, 'address': {'country': 'Norway'}}))
+        self.assertEqual(user.name, 'John')
+        self.assertEqual(user.address.country, 'Norway')
+
+        calls = async_stub_models.calls
+        # Fields validators run concurrently and before hooks
+        self.assertEqual(sorted(call[:2] for call in calls[:2]), [
+            ('country', 'Norway'), ('user', 'John')])
+        self.assertEqual(calls[0][2], ['country', 'user'])
+        self.assertEqual(calls[2], ('hook', 20))
+
+    def test_acreate_errors(self):
+        with self.assertRaises(ValidationError):
+            self.run_async(AsyncUser.acreate({'name': 'unknown'}))
+        with self.assertRaises(ValidationError):
+            self.run_async(AsyncUser.acreate(
+                {'name': 'John', 'addresses': [{'country': 'Atlantis'}]}))
+        with self.assertRaises(ModelValidationError):
+            self.run_async(AsyncUser.acreate({'name': 'John', 'age': -1}))
+        # Sync validators are run as usual
+        with self.assertRaises(FieldRequiredError):
+            self.run_async(AsyncUser.acreate({}))
+
+    def test_sync_models(self):
+        self.assertFalse(has_async_validation(Person))
+        self.assertTrue(has_async_validation(AsyncUser))
+
+        person = self.run_async(Person.acreate({'name': 'John'}))
+        self.assertEqual(person.name, 'John')
+
+        # Sync constructor skips async validators with a warning
+        def warned(create):
+            with warnings.catch_warnings(record=True) as caught:
+                warnings.simplefilter('always')
+                result = create()
+            return result, {str(warning.message).split()[0]
+                            for warning in caught
+                            if warning.category is AsyncValidationWarning}
+
+        user, names = warned(
+            lambda: AsyncUser({'name': 'unknown', 'age': -1}))
+        self.assertEqual(user.name, 'unknown')
+        self.assertEqual(async_stub_models.calls, [])
+        self.assertEqual(names, {'AsyncUser', 'AsyncAddress'})
+        self.assertEqual(warned(lambda: setattr(user, 'name', 'x'))[1],
+                         {'AsyncUser.name'})
+        self.assertIn('AsyncUser', warned(
+            lambda: AsyncUser.from_many([{'name': 'John'}]))[1])
+
+        user = warned(lambda: SlottedAsyncUser({'name': 'John'}))[0]
+        user.mark_clean()
+        self.assertIn('name', SlottedAsyncUser._slot_fields)
+        self.assertEqual(warned(lambda: setattr(user, 'name', 'x'))[1],
+                         {'AsyncUser.name'})
+        self.assertEqual(user.changed_fields, {'name'})
+        self.assertEqual(warned(lambda: Person({'name': 'John'}))[1], set())
+        self.assertEqual(warned(lambda: self.run_async(
+            AsyncUser.acreate({'name': 'John'})))[1], set())
+
+        # lazy nested documents are built by the async validation
+        self.assertEqual(warned(lambda: self.run_async(
+            LazyAsyncUser.acreate({'address': {'country': 'Norway'},
+                                   'addresses': [{'country': 'Norway'}]})
+        ))[1], set())
+        with self.assertRaises(ValidationError):
+            self.run_async(LazyAsyncUser.acreate(
+                {'address': {'country': 'Atlantis'}}))
+
+        # warnings filter opts out
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter('always')
+            warnings.simplefilter('ignore', AsyncValidationWarning)
+            AsyncUser({'name': 'unknown'})
+        self.assertEqual(caught, [])
@@ -0,0 +1,167 @@
+# -*- coding: utf-8 -*-
+import unittest
+from datetime import datetime, timedelta, tzinfo
+from decimal import Decimal
+
+import six
+
+from simplemodels import binary
+from simplemodels.exceptions import DocumentError, FieldRequiredError
+from simplemodels.fields import BooleanField, CharField, DateTimeField, \
+    DecimalField, DictField, FloatField, IntegerField, ListField
+from simplemodels.models import Document
+from simplemodels.tests.stub_models import Post, SlottedPerson
+
+
+class Offset(tzinfo):
+
+    def utcoffset(self, dt):
+        return timedelta(hours=3)
+
+    def dst(self, dt):
+        return timedelta(0)
+
+
+class BinarySample(Document):
+    class Meta:
+        ALLOW_EXTRA_FIELDS = True
+
+    count = IntegerField()
+    ratio = FloatField()
+    flag = BooleanField()
+    name = CharField()
+    price = DecimalField()
+    created = DateTimeField()
+    meta = DictField()
+    numbers = ListField(of=int, compact=True)
+    ratios = ListField(of=float, compact=True)
+    flags = ListField(of=bool)
+    names = ListField(of=six.text_type)
+    children = ListField(of='BinarySample')
+
+
+class BinaryTest(unittest.TestCase):
+
+    def setUp(self):
+        self.data = {
+            'title': u'Привет', 'tags': ['a', 'b'],
+            'author': {'name': 'John', 'address': {'zip': -221},
+                       'phones': [1, 2 ** 40]},
+            'comments': [{'body': 'x', 'author': {'name': 'Mary'},
+                          'created': '2019-01-02T03:04:05Z',
+                          'favorite_by': [{'name': 'John'}]}]}
+
+    def test_dumps(self):
+        post = Post(self.data)
+        payload = binary.dumps(post)
+        self.assertLess(len(payload) * 3, len(post.to_json()))
+        self.assertEqual(binary.loads(Post, payload).as_dict(),
+                         post.as_dict())
+        self.assertEqual(binary.loads(Post, payload, validate=True).as_dict(),
+                         post.as_dict())
+
+        person = SlottedPerson({'name': 'John', 'phones': [1]})
+        self.assertEqual(
+            binary.loads(SlottedPerson, binary.dumps(person)).as_dict(),
+            person.as_dict())
+
+    def test_value_kinds(self):
+        sample = BinarySample({
+            'count': -2 ** 70, 'ratio': 0.1, 'flag': False, 'name': u'Jürgen',
+            'price': '1.10', 'created': datetime(1900, 1, 2, 3, 4, 5, 6),
+            'meta': {'a': [1]}, 'numbers': [0, -1, 300], 'ratios': [0.5],
+            'flags': [True, False], 'names': [u'ä', ''],
+            'children': [{'count': 1, 'created': datetime(
+                2019, 1, 2, 3, tzinfo=Offset())}],
+            'extra': {'x': None}})
+        result = binary.loads(BinarySample, binary.dumps(sample))
+        self.assertEqual(result.as_dict(), sample.as_dict())
+        self.assertEqual(result.extra, {'x': None})
+        self.assertEqual(result.price, Decimal('1.10'))
+        self.assertEqual(result.created, sample.created)
+        created = result.children[0].created
+        self.assertEqual(created, sample.children[0].created)
+        self.assertEqual(created.utcoffset(), timedelta(hours=3))
+
+        empty = binary.loads(BinarySample, binary.dumps(BinarySample()))
+        self.assertEqual(empty.as_dict(), BinarySample().as_dict())
+
+    def test_timezone(self):
+        class Event(Document):
+            start = DateTimeField(date_fmt='%Y-%m-%dT%H:%M:%S%z')
+            end = DateTimeField(date_fmt='%Y-%m-%dT%H:%M:%S%z')
+
+        event = Event({
+            'start': datetime(2019, 1, 2, 3, tzinfo=Offset()),
+            'end': datetime(2019, 1, 2, 5, tzinfo=binary.UTC)})
+        result = binary.loads(Event, binary.dumps(event))
+        self.assertEqual(result.as_dict(), event.as_dict())
+        self.assertEqual(result.as_dict()['start'],
+                         '2019-01-02T03:00:00+0300')
+        self.assertEqual(result.end.utcoffset(), timedelta(0))
+
+    def test_many(self):
+        posts = [Post(self.data), Post(dict(self.data, title=None))]
+        result = binary.loads_many(Post, binary.dumps_many(Post, posts))
+        self.assertEqual([post.as_dict() for post in result],
+                         [post.as_dict() for post in posts])
+        self.assertEqual(
+            binary.loads_many(Post, binary.dumps_many(Post, [])), [])
+
+    def test_incompatible_data(self):
+        class Item(Document):
+            name = CharField()
+
+        payload = binary.dumps(Item({'name': 'x'}))
+
+        class Item(Document):
+            name = CharField()
+            count = IntegerField()
+
+        self.assertNotEqual(binary.fingerprint(Item), payload[4:12])
+        with self.assertRaises(DocumentError):
+            binary.loads(Item, payload)
+
+        payload = binary.dumps(Post(self.data))
+        for data in (payload[:-1], payload + b'\x00', b'{}'):
+            with self.assertRaises(ValueError):
+                binary.loads(Post, data)
+
+        class Event(Document):
+            start = DateTimeField()
+
+        payload = binary.dumps(Event({'start': datetime(2019, 1, 2)}))
+        with self.assertRaises(ValueError):
+            binary.loads(Event, payload[:-8] + b'\xfe' + b'\xff' * 6 + b'\x7f')
+
+    def test_validation_errors(self):
+        def check(value):
+            raise IndexError('invalid')
+
+        class Item(Document):
+            name = CharField(validators=[check])
+
+        payload = binary.dumps(Item.construct({'name': 'x'}))
+        with self.assertRaises(IndexError):
+            binary.loads(Item, payload, validate=True)
+
+    def test_validate(self):
+        class Item(Document):
+            name = CharField(required=True)
+
+        payload = binary.dumps(Item.construct({}))
+        self.assertIsNone(binary.loads(Item, payload).name)
+        with self.assertRaises(FieldRequiredError):
+            binary.loads(Item, payload, validate=True)
+
+    def test_custom_init(self):
+        class Note(Document):
+            text = CharField()
+
+            def __init__(self, data=None):
+                super(Note, self).__init__(data)
+
+        payload = binary.dumps(Note({'text': 'x'}))
+        for validate in (False, True):
+            self.assertEqual(
+                binary.loads(Note, payload, validate=validate).text, 'x')
@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+import unittest
+from datetime import datetime
+
+from simplemodels.columnar import DocumentBatch, np
+from simplemodels.exceptions import FieldRequiredError, ValidationError
+from simplemodels.fields import BooleanField, CharField, DateTimeField, \
+    FloatField, IntegerField, ListField
+from simplemodels.models import Document
+
+
+class Event(Document):
+    name = CharField(required=True, max_length=10)
+    kind = CharField(choices=['click', 'view'], default='view')
+    count = IntegerField()
+    duration = FloatField()
+    is_bot = BooleanField(default=False)
+    created = DateTimeField()
+    tags = ListField(of=str)
+
+
+ROWS = [
+    {'name': 'a', 'kind': 'click', 'count': 1, 'duration': 1.5,
+     'created': '2019-01-02T03:04:05Z', 'tags': ['x', 'y']},
+    {'name': 'b', 'count': '2', 'duration': 2, 'is_bot': 1},
+    {'name': 'c', 'count': None, 'created': datetime(2019, 5, 6)},
+]
+
+
+@unittest.skipIf(np is None, "'numpy' is not installed")
+class DocumentBatchTest(unittest.TestCase):
+
+    def test_columns(self):
+        batch = DocumentBatch.from_rows(Event, ROWS)
+        self.assertEqual(len(batch), 3)
+        self.assertEqual(batch.column('count').dtype, np.int64)
+        self.assertEqual(batch.column('count').tolist()[:2], [1, 2])
+        self.assertEqual(batch.nulls['count'].tolist(), [False, False, True])
+        self.assertEqual(batch.column('duration')[:2].sum(), 3.5)
+        self.assertEqual(batch.column('is_bot').tolist(),
+                         [False, True, False])
+        self.assertEqual(batch.column('created').dtype.kind, 'M')
+        self.assertEqual(batch.column('kind').tolist(),
+                         ['click', 'view', 'view'])
+        self.assertTrue(batch.valid.all())
+
+    def test_rows(self):
+        batch = DocumentBatch.from_rows(Event, ROWS)
+        expected = [Event(row) for row in ROWS]
+        self.assertEqual(batch.to_dicts(), [dict(doc) for doc in expected])
+
+        event = batch[-1]
+        self.assertIsInstance(event, Event)
+        self.assertEqual(event.as_dict(), expected[-1].as_dict())
+        self.assertEqual([doc.as_dict() for doc in batch],
+                         [doc.as_dict() for doc in expected])
+        with self.assertRaises(IndexError):
+            batch[3]
+
+    def test_validation(self):
+        rows = ROWS + [{'kind': 'view'}, {'name': 'd', 'kind': 'buy'},
+                       {'name': 'e', 'count': 'x'},
+                       {'name': 'f' * 11}]
+        with self.assertRaises(FieldRequiredError):
+            DocumentBatch.from_rows(Event, rows)
+
+        batch = DocumentBatch.from_rows(Event, rows, raise_errors=False)
+        self.assertEqual(sorted(batch.errors), [3, 4, 5, 6])
+        self.assertIsInstance(batch.errors[3], FieldRequiredError)
+        self.assertIn('restricted by choices', str(batch.errors[4]))
+        self.assertIsInstance(batch.errors[5], ValueError)
+        self.assertIsInstance(batch.errors[6], ValidationError)
+        self.assertEqual(batch.valid.tolist(), [True] * 3 + [False] * 4)
+        self.assertEqual(len(batch.to_dicts()), 3)
+        with self.assertRaises(ValidationError):
+            batch[4]
+
+    def test_fixed_width_chars(self):
+        batch = DocumentBatch.from_rows(Event, ROWS, fixed_width_chars=True)
+        self.assertEqual(batch.column('name').dtype.kind, 'U')
+        self.assertEqual(batch.to_dicts()[1]['name'], 'b')
+
+    def test_custom_init(self):
+        class Note(Document):
+            text = CharField()
+
+            def __init__(self, data=None):
+                super(Note, self).__init__(data)
+
+        batch = DocumentBatch.from_rows(Note, [{'text': 'x'}])
+        self.assertEqual(batch[0].text, 'x')
@@ -1,5 +1,8 @@
 # -*- coding: utf-8 -*-
+import array
+import copy
 import hashlib
+import pickle
 import unittest
 from collections import OrderedDict, Sequence
 from decimal import Decimal, InvalidOperation
@@ -85,6 +88,25 @@ class FieldsTest(unittest.TestCase):
                 ValueError, r"Incorrect type 'dict' for 'dt_field' field!"):
             self.model(dict(dt_field=dict()))
 
+    def test_datetime_formats(self):
+        for date_fmt in (None, '%Y-%m-%d', '%d.%m.%Y %H:%M', '%Y%m%d %%',
+                         '%Y-%m-%dT%H:%M:%S.%fZ', '%b %d %Y'):
+            field = DateTimeField(date_fmt=date_fmt)
+            value = datetime(2017, 5, 3, 22, 46)
+            formatted = value.strftime(field._date_fmt)
+            self.assertEqual(field.to_python(value), formatted)
+            self.assertEqual(field._typecast(formatted),
+                             datetime.strptime(formatted, field._date_fmt))
+
+        field = DateTimeField()
+        # not zero padded values fall back to strptime
+        self.assertEqual(field._typecast('2017-5-3T22:46:9Z'),
+                         datetime(2017, 5, 3, 22, 46, 9))
+        for value in ('2017-02-30T00:00:00Z', '2017-05-03T22:46:09',
+                      '2017-05-03 22:46:09Z', '+017-05-03T22:46:09Z'):
+            with self.assertRaises(ValueError):
+                field._typecast(value)
+
     @unittest.skipIf(PYTHON_VERSION > 2, 'only py2 test')
     def test_char(self):
         instance = self.model(dict(char_field='abc'))
@@ -299,6 +321,48 @@ class DocumentFieldTest(unittest.TestCase):
             User()
             self.assertIn("Model 'Address1' does not exist", err)
 
+    def test_lazy_document(self):
+        calls = []
+
+        def counted(value):
+            calls.append(value)
+            return True
+
+        class Header(Document):
+            key = CharField(required=True, validators=[counted])
+
+        class Envelope(Document):
+            id = IntegerField()
+            header = DocumentField(Header, lazy=True)
+            body = DocumentField(Header, lazy=True)
+
+        self.assertIsInstance(Envelope.__dict__['header'], DocumentField)
+        self.assertIs(type(Envelope.__dict__['header']),
+                      type(DocumentField(Header, True)))
+        self.assertIsNot(type(DocumentField(Header, False)),
+                         type(Envelope.__dict__['header']))
+
+        envelope = Envelope({'id': '1', 'header': {'key': 'x'}, 'body': {}})
+        self.assertEqual(calls, [])
+        self.assertEqual(envelope.header.key, 'x')
+        self.assertIs(envelope.header, envelope.header)
+        self.assertEqual(calls, ['x'])
+
+        # Errors are raised on access or by validate_all
+        with self.assertRaises(FieldRequiredError):
+            envelope.body
+        with self.assertRaises(FieldRequiredError):
+            Envelope({'body': {}}).validate_all()
+        with self.assertRaises(FieldRequiredError):
+            Envelope({'body': {}}).as_dict()
+
+        envelope = Envelope({'header': {'key': 'x'}, 'body': {'key': 'y'}})
+        envelope.validate_all()
+        self.assertEqual(envelope.as_dict(), {
+            'id': None, 'header': {'key': 'x'}, 'body': {'key': 'y'}})
+        envelope.header = {'key': 'z'}
+        self.assertEqual(envelope.header.key, 'z')
+
 
 class ListFieldTest(unittest.TestCase):
 
@@ -521,6 +585,103 @@ class ListFieldTest(unittest.TestCase):
         user_foo.friends.append(user_bar)
         print(user_foo)
 
+    def test_lazy_list(self):
+        converted = []
+
+        def convert(value):
+            converted.append(value)
+            return int(value)
+
+        class Page(Document):
+            rows = ListField(of=convert, lazy=True)
+
+        page = Page({'rows': ['1', '2', '3', '4', 'x']})
+        self.assertEqual(len(page.rows), 5)
+        self.assertEqual(converted, [])
+
+        self.assertEqual(page.rows[1], 2)
+        self.assertEqual(page.rows[-2], 4)
+        self.assertEqual(page.rows[1:3], [2, 3])
+        self.assertEqual(converted, ['2', '4', '3'])
+        with self.assertRaises(IndexError):
+            page.rows[5]
+
+        # Items are converted during iteration
+        rows = iter(page.rows)
+        self.assertEqual(next(rows), 1)
+        self.assertEqual(converted[-1], '1')
+        with self.assertRaises(ValueError):
+            list(rows)
+
+        del page.rows[-1]
+        page.rows.insert(0, '0')
+        page.rows[1] = 10
+        self.assertEqual(page.rows, [0, 10, 2, 3, 4])
+        self.assertEqual(page.as_dict(), {'rows': [0, 10, 2, 3, 4]})
+        self.assertEqual(converted, ['2', '4', '3', '1', 'x', '0'])
+
+        # Eager validation by default
+        class EagerPage(Document):
+            rows = ListField(of=int)
+
+        with self.assertRaises(ValueError):
+            EagerPage({'rows': ['1', 'x']})
+
+    def test_compact_list(self):
+        class Series(Document):
+            ints = ListField(of=int, compact=True)
+            floats = ListField(of=float, compact=True)
+
+        series = Series({'ints': [1, '2', 3.7, True], 'floats': [1, 2.5]})
+        self.assertIsInstance(series.ints, array.array)
+        self.assertIsInstance(series.ints, Sequence)
+        self.assertEqual(series.ints, [1, 2, 3, 1])
+        self.assertEqual(series.floats, [1.0, 2.5])
+        self.assertEqual(series.floats.typecode, 'd')
+        self.assertEqual(Series().ints, [])
+
+        series.floats.append(3)
+        self.assertEqual(series.as_dict(), {
+            'ints': [1, 2, 3, 1], 'floats': [1.0, 2.5, 3.0]})
+        self.assertIsInstance(series.as_dict()['floats'], list)
+        self.assertEqual(repr(series.ints), '[1, 2, 3, 1]')
+        self.assertEqual(copy.deepcopy(series).floats, series.floats)
+        for protocol in range(pickle.HIGHEST_PROTOCOL + 1):
+            value = pickle.loads(pickle.dumps(series.ints, protocol))
+            self.assertEqual(value, [1, 2, 3, 1])
+            self.assertEqual(type(value), type(series.ints))
+        if PYTHON_VERSION > 2:
+            self.assertEqual(memoryview(series.floats).tolist(),
+                             [1.0, 2.5, 3.0])
+
+        with self.assertRaises(ValueError):
+            Series({'floats': [1, 'x']})
+        with self.assertRaises(ValueError):
+            Series({'floats': '123'})
+        with self.assertRaises(ValueError) as err:
+            Series({'ints': [1, 2 ** 70]})
+        self.assertIn('Series.ints', str(err.exception))
+        with self.assertRaises(FieldError):
+            ListField(of=str, compact=True)
+
+        # trusted data is converted the same way
+        self.assertEqual(Series.construct({'ints': [1.9, '2']}).ints, [1, 2])
+
+    def test_lazy_list_of_documents(self):
+        class Comment(Document):
+            body = CharField(required=True)
+
+        class Post(Document):
+            comments = ListField(of='Comment')
+
+        post = Post({'comments': [{'body': 'first'}, {}]})
+        self.assertEqual(len(post.comments), 2)
+        self.assertEqual(post.comments[0].body, 'first')
+        with self.assertRaises(FieldRequiredError):
+            post.comments[1]
+        with self.assertRaises(FieldRequiredError):
+            post.validate_all()
+
 
 class ValidatorsTest(unittest.TestCase):
 
@@ -1,16 +1,31 @@
 # -*- coding: utf-8 -*-
+import copy
+import gc
+import io
 import json
 import os.path as op
+import pickle
 import time
+import warnings
 from datetime import datetime
-from unittest import TestCase
+from decimal import Decimal
+from unittest import TestCase, skipIf
 
 from simplemodels.exceptions import FieldRequiredError, ModelValidationError, \
-    ValidationError, DocumentError
+    ValidationError, DocumentError, ImmutableFieldError, ModelNotFoundError
 from simplemodels.fields import BooleanField, CharField, DateTimeField, \
-    DocumentField, FloatField, IntegerField, ListField, SimpleField
-from simplemodels.models import Document, ImmutableDocument, registry
-from simplemodels.tests.stub_models import Address, Comment, Person, Post
+    DecimalField, DictField, DocumentField, FloatField, IntegerField, \
+    ListField, SimpleField
+from simplemodels.models import Document, ImmutableDocument, registry, \
+    resolve_models
+from simplemodels.tests.stub_models import Address, Comment, MailboxItem, \
+    Person, Post, SlottedPerson
+
+
+try:
+    import tracemalloc
+except ImportError:  # python 2
+    tracemalloc = None
 
 
 CUR_DIR = op.abspath(op.dirname(__file__))
@@ -252,6 +267,17 @@ class DocumentTest(TestCase):
             )
         )
         self.assertEqual(msg.level, 'DEBUG')
+        self.assertEqual(len(msg), 4)
+        self.assertEqual(msg.as_dict()['level'], 'DEBUG')
+        self.assertIn('level', list(msg))
+
+        # Extra fields are stored per instance
+        self.assertNotIn('level', LogMessage._fields)
+        msg_2 = LogMessage(dict(text='another message', user='john'))
+        self.assertEqual(sorted(msg_2),
+                         ['app_name', 'text', 'timestamp', 'user'])
+        self.assertEqual(len(msg), 4)
+        self.assertNotIn('user', list(msg))
 
     def test_choices_option(self):
         class LogMessage(Document):
@@ -359,6 +385,39 @@ class DocumentTest(TestCase):
         user = User(dict(name='Mikko', password='1234567890', is_admin=True))
         self.assertIsInstance(user, User)
 
+    def test_post_model_validation_hooks(self):
+        def validate_name(document, value):
+            if value == 'root':
+                raise ModelValidationError('root is reserved')
+
+        class User(Document):
+            name = CharField()
+
+            def validate_id(self, value):
+                pass
+
+        class Admin(User):
+            id = IntegerField()
+
+        self.assertTrue(User(dict(name='root')))
+
+        # Late-added hooks require explicit schema refresh
+        User.validate_name = staticmethod(validate_name)
+        self.assertTrue(User(dict(name='root')))
+        User.refresh_schema()
+        with self.assertRaises(ModelValidationError):
+            User(dict(name='root'))
+
+        # Subclass is refreshed and inherits the hook
+        with self.assertRaises(ModelValidationError) as err:
+            Admin(dict(name='root'))
+        self.assertIn('root is reserved', str(err.exception))
+
+        # Non-static hooks are not allowed
+        with self.assertRaises(ModelValidationError) as err:
+            Admin(dict(name='admin', id=1))
+        self.assertIn('validate_id', str(err.exception))
+
     def test_model_with_self_field(self):
         class User(Document):
 
@@ -496,6 +555,88 @@ class DocumentTest(TestCase):
         # # user.tag.tags.append(dict(value='bar'))  # THIS DOESN't WORK!!!
         self.assertEqual(user.tag.tags[1].password, 'secret')
 
+    def test_init_without_data_copy(self):
+        class Attrs(Document):
+            values = SimpleField()
+
+        class Item(Document):
+            attrs = SimpleField()
+            nested = DocumentField(Attrs)
+            children = ListField(of=Attrs)
+
+        data = {'attrs': {'x': 1},
+                'nested': {'values': [1, 2]},
+                'children': [{'values': [3]}]}
+
+        item = Item(data)
+        self.assertEqual(item.attrs, data['attrs'])
+        self.assertIsNot(item.attrs, data['attrs'])
+        self.assertIsNot(item.nested.values, data['nested']['values'])
+
+        item = Item(data, copy_data=False)
+        self.assertIs(item.attrs, data['attrs'])
+        self.assertIs(item.nested.values, data['nested']['values'])
+        self.assertIs(item.children[0].values,
+                      data['children'][0]['values'])
+        self.assertEqual(item.as_dict(), data)
+
+        # Values inserted or assigned after the init are still copied
+        attrs = Attrs(dict(values=[4]))
+        item.children.append(attrs)
+        self.assertIsNot(item.children[-1].values, attrs.values)
+        raw = {'values': [5]}
+        item.children.append(raw)
+        item.nested = raw
+        item.children = [raw]
+        self.assertEqual(raw, {'values': [5]})
+        self.assertIsNot(item.nested.values, raw['values'])
+        self.assertIsNot(item.children[0].values, raw['values'])
+
+    def test_nested_model_with_custom_init(self):
+        class Attrs(Document):
+            values = SimpleField()
+
+            def __init__(self, data=None):
+                super(Attrs, self).__init__(data)
+
+        class Item(Document):
+            nested = DocumentField(Attrs)
+            children = ListField(of=Attrs)
+            lazy_children = ListField(of=Attrs, lazy=True)
+
+        data = {'nested': {'values': [1]},
+                'children': [{'values': [2]}],
+                'lazy_children': [{'values': [3]}]}
+        for item in (Item(data), Item(data, copy_data=False)):
+            self.assertEqual(item.as_dict(), data)
+
+    def test_copy_data_is_not_a_typecast_parameter(self):
+        class Upper(SimpleField):
+            def _typecast(self, value, **kwargs):
+                return super(Upper, self)._typecast(
+                    value, lambda x: x.upper(), **kwargs)
+
+        class Item(Document):
+            name = Upper()
+
+        for item in (Item({'name': 'x'}, copy_data=False),
+                     Item.from_json('{"name": "x"}'),
+                     Item.from_many([{'name': 'x'}], copy_data=False)[0],
+                     next(Item.iter_from_file(io.StringIO(u'{"name": "x"}')))):
+            self.assertEqual(item.name, 'X')
+
+    def test_init_data_copy_keeps_shared_values(self):
+        class Item(Document):
+            first = SimpleField()
+            second = SimpleField()
+
+        shared = {'tags': [1, 2], 'ts': datetime.now()}
+        item = Item(dict(first=shared, second=shared))
+        self.assertIsNot(item.first, shared)
+        self.assertIs(item.first, item.second)
+        self.assertIsNot(item.first['tags'], shared['tags'])
+        self.assertEqual(item.first, shared)
+
     def test_allow_extra_fields_error_cases(self):
         """If a document has an ALLOW_EXTRA_FIELDS flag enabled we get
         ambiguity of picking the value of if some method has already existed
@@ -523,12 +664,430 @@ class DocumentTest(TestCase):
             # Pass 'get_id' as a field
             Message(dict(id=1, get_id='hello'))
 
+        # Internals which are empty by default
+        with self.assertRaises(DocumentError):
+            Message(dict(id=1, _extra_fields=['x']))
+
         # Success case
         msg = Message(dict(id=1))
         self.assertTrue(msg.id == msg.get_id() == 1)
         self.assertEqual(msg.answer, 42)
 
 
+class CompiledInitTest(TestCase):
+
+    def test_custom_field_methods(self):
+        class UpperField(SimpleField):
+            def _typecast(self, value, **kwargs):
+                return value.upper() if value else value
+
+        class StrictField(SimpleField):
+            def validate(self, value):
+                if value == 'bad':
+                    raise ValidationError('bad value')
+
+        class Message(Document):
+            title = UpperField(default='untitled')
+            text = StrictField()
+
+        msg = Message(dict(text='good'))
+        self.assertEqual(msg.title, 'UNTITLED')
+        self.assertEqual(Message(dict(title='hi')).title, 'HI')
+        with self.assertRaises(ValidationError):
+            Message(dict(text='bad'))
+
+    def test_validators_order(self):
+        calls = []
+
+        def first(value):
+            calls.append('first')
+            return True
+
+        class User(Document):
+            name = CharField(required=True, max_length=3,
+                             validators=[first, lambda v: v != 'nop'])
+
+        self.assertEqual(User(dict(name='bob')).name, 'bob')
+        self.assertEqual(calls, ['first'])
+
+        with self.assertRaises(FieldRequiredError):
+            User()
+        with self.assertRaises(ValidationError) as err:
+            User(dict(name='nop'))
+        self.assertIn("haven't passed validation", str(err.exception))
+        with self.assertRaises(ValidationError) as err:
+            User(dict(name='john'))
+        self.assertIn('Max length is exceeded', str(err.exception))
+
+    def test_data_is_not_modified(self):
+        class User(Document):
+            id = IntegerField()
+
+        data = {'id': '1', 'name': 'John'}
+        self.assertEqual(User(data).id, 1)
+        self.assertEqual(data, {'id': '1', 'name': 'John'})
+
+
+class BatchCreateTest(TestCase):
+
+    def test_from_many(self):
+        rows = [{'name': 'John', 'address': {'zip': '1'}, 'age': 20},
+                {'name': 'Mary', 'phones': ['1', 2]}]
+        people = Person.from_many(iter(rows))
+        self.assertEqual([p.as_dict() for p in people],
+                         [Person(data).as_dict() for data in rows])
+        self.assertEqual(people[0].address.zip, 1)
+        self.assertEqual(rows[0]['address'], {'zip': '1'})
+
+        people = Person.from_many(rows, copy_data=False)
+        self.assertEqual(people[1].phones, [1, 2])
+
+        with self.assertRaises(FieldRequiredError):
+            Person.from_many([{'name': 'John'}, {}])
+        with self.assertRaises(ModelValidationError):
+            Person.from_many([['name', 'John']])
+
+    def test_validate_many(self):
+        rows = [{'name': 'John'}, {}, None, {'name': 'Mary', 'phones': ['x']}]
+        people, errors = Person.validate_many(rows)
+        self.assertEqual(len(people), 4)
+        self.assertEqual(people[0].name, 'John')
+        self.assertEqual(people[1:], [None, None, None])
+        self.assertEqual(sorted(errors), [1, 2, 3])
+        self.assertIsInstance(errors[1], FieldRequiredError)
+        self.assertIsInstance(errors[3], ValueError)
+
+    def test_meta_options_and_hooks(self):
+        class User(Document):
+            name = CharField()
+
+            class Meta:
+                ALLOW_EXTRA_FIELDS = True
+
+            @staticmethod
+            def validate_role(document, value):
+                if value != 'admin':
+                    raise ModelValidationError('Unknown role')
+
+        users, errors = User.validate_many(
+            [{'name': 'John', 'role': 'admin'}, {'role': 'user'}])
+        self.assertEqual(users[0].as_dict(), {'name': 'John', 'role': 'admin'})
+        self.assertIsNone(users[1])
+        self.assertEqual(list(errors), [1])
+
+        # Custom __init__ is respected
+        items = MailboxItem.from_many([{'subject': 'hi'}])
+        self.assertIsNotNone(items[0].received_at)
+
+
+class DirtyTrackingTest(TestCase):
+
+    def setUp(self):
+        class Range(Document):
+            start = IntegerField()
+            end = IntegerField(required=True)
+            tags = ListField(of=str)
+
+            @staticmethod
+            def validate_end(document, value):
+                if value < document.start:
+                    raise ModelValidationError('End is before start')
+
+        self.model = Range
+
+    def test_changed_fields(self):
+        for model in (self.model, SlottedPerson):
+            document = model.construct({'start': 1, 'end': 2, 'name': 'x'})
+            self.assertFalse(document.is_dirty)
+            self.assertEqual(document.changed_fields, frozenset())
+
+        document = self.model({'start': 1, 'end': 2})
+        document.start = '2'
+        document['tags'] = ['a']
+        self.assertTrue(document.is_dirty)
+        self.assertEqual(document.changed_fields, {'start', 'tags'})
+
+        copied = copy.copy(document)
+        copied.end = 3
+        self.assertEqual(document.changed_fields, {'start', 'tags'})
+
+        document.mark_clean()
+        self.assertFalse(document.is_dirty)
+        self.assertTrue(copied.is_dirty)
+
+        person = SlottedPerson({'name': 'John'})
+        person.phones = [1]
+        self.assertEqual(person.changed_fields, {'phones'})
+
+        # internals can't be overwritten by extra fields
+        class Webhook(Document):
+            class Meta:
+                ALLOW_EXTRA_FIELDS = True
+
+        with self.assertRaises(DocumentError):
+            Webhook({'a': 1, '_changed_fields': 'zz'})
+        webhook = Webhook({'a': 1})
+        webhook.a = 2
+        self.assertEqual(webhook.a, 2)
+
+    def test_revalidate(self):
+        document = self.model({'start': 1, 'end': 2})
+        document.revalidate()
+
+        document.end = 0
+        with self.assertRaises(ModelValidationError):
+            document.revalidate()
+        self.assertTrue(document.is_dirty)
+
+        document.start = -1
+        document.revalidate()
+        self.assertFalse(document.is_dirty)
+
+        # hooks of not changed fields check the changed ones as well
+        document.start = 5
+        with self.assertRaises(ModelValidationError):
+            document.revalidate()
+        document.start = 0
+        document.revalidate()
+
+        # values modified in place after the assignment
+        document.end = 10
+        document.__dict__['end'] = None
+        with self.assertRaises(FieldRequiredError):
+            document.revalidate()
+
+
+class PatchTest(TestCase):
+
+    def setUp(self):
+        author = {'name': 'John', 'address': {'street': 'Baker', 'zip': 221},
+                  'phones': [1, 2]}
+        self.data = {
+            'title': 'Hi', 'author': author, 'tags': ['a'],
+            'comments': [{'body': 'x', 'author': author,
+                          'created': '2019-01-02T03:04:05Z'}]}
+
+    def assert_synced(self, post, replica, patch):
+        replica.apply_patch(patch)
+        self.assertEqual(replica.as_dict(), post.as_dict())
+        self.assertEqual(replica.as_patch(), patch)
+        replica.mark_clean()
+
+    def test_patch(self):
+        post, replica = Post(self.data), Post(self.data)
+        self.assertEqual(post.as_patch(), {})
+        self.assertFalse(post.is_dirty)
+
+        post.title = 'Hello'
+        post.author.address.zip = '222'
+        self.assertTrue(post.is_dirty)
+        patch = post.as_patch()
+        self.assertEqual(patch, {'title': 'Hello',
+                                 'author': {'address': {'zip': 222}}})
+        self.assert_synced(post, replica, patch)
+
+        post.mark_clean()
+        self.assertFalse(post.is_dirty)
+        self.assertEqual(post.as_patch(), {})
+
+        # lists are replaced as a whole
+        post.tags.append('b')
+        post.comments[0].body = 'y'
+        patch = post.as_patch()
+        self.assertEqual(patch['tags'], ['a', 'b'])
+        self.assertEqual(patch['comments'][0]['body'], 'y')
+        self.assertEqual(patch['comments'][0]['created'],
+                         '2019-01-02T03:04:05Z')
+        self.assert_synced(post, replica, patch)
+
+        # reassigned documents are serialized as a whole
+        post.mark_clean()
+        post.author = {'name': 'Mary'}
+        patch = post.as_patch()
+        self.assertEqual(patch, {'author': {
+            'name': 'Mary', 'address': {'street': None, 'zip': None},
+            'phones': []}})
+        self.assert_synced(post, replica, patch)
+
+    def test_reassigned_document_patch(self):
+        class Location(Document):
+            street = CharField()
+            zip = IntegerField()
+
+            class Meta:
+                OMIT_MISSED_FIELDS = True
+
+        class Venue(Document):
+            name = CharField()
+            location = DocumentField(Location)
+
+        data = {'name': 'Hall', 'location': {'street': 'old', 'zip': 1}}
+        venue, replica = Venue(data), Venue(data)
+        venue.location = {'street': 'new'}
+        patch = venue.as_patch()
+        self.assertEqual(patch, {'location': {'street': 'new', 'zip': None}})
+        replica.apply_patch(patch)
+        self.assertEqual(replica.as_dict(), venue.as_dict())
+        self.assertEqual(replica.location.as_dict(), {'street': 'new'})
+
+    def test_extra_fields_patch(self):
+        class Event(Document):
+            name = CharField()
+
+            class Meta:
+                ALLOW_EXTRA_FIELDS = True
+
+        event = Event({'name': 'x', 'note': 'a'})
+        replica = Event({'name': 'x', 'note': 'a'})
+        event.note = 'b'
+        self.assertEqual(event.changed_fields, {'note'})
+        patch = event.as_patch()
+        self.assertEqual(patch, {'note': 'b'})
+        self.assert_synced(event, replica, patch)
+
+        # unknown fields are added as extra ones
+        event, replica = Event({'name': 'x', 'tag': 't'}), Event({'name': 'x'})
+        event['tag'] = 'u'
+        self.assert_synced(event, replica, event.as_patch())
+        self.assertEqual(replica.tag, 'u')
+
+        class SlottedEvent(Event):
+            class Meta:
+                USE_SLOTS = True
+
+        event = SlottedEvent({'name': 'x', 'note': 'a'})
+        event.note = 'b'
+        self.assertEqual(event.as_patch(), {'note': 'b'})
+
+    def test_compact_list_changes(self):
+        class Series(Document):
+            values = ListField(of=int, compact=True)
+
+        series = Series({'values': [1, 2]})
+        replica = Series({'values': [1, 2]})
+        series.values.append(3)
+        self.assertTrue(series.is_dirty)
+        patch = series.as_patch()
+        self.assertEqual(patch, {'values': [1, 2, 3]})
+        self.assert_synced(series, replica, patch)
+
+        series.mark_clean()
+        self.assertFalse(series.is_dirty)
+        for change in (lambda values: values.__setitem__(0, 5),
+                       lambda values: values.__delitem__(slice(0, 1)),
+                       lambda values: values.extend([4]),
+                       lambda values: values.pop()):
+            change(series.values)
+            self.assertTrue(series.is_dirty)
+            self.assert_synced(series, replica, series.as_patch())
+            series.mark_clean()
+
+    def test_apply_patch_validation(self):
+        class Range(Document):
+            start = IntegerField()
+            end = IntegerField()
+
+            @staticmethod
+            def validate_end(document, value):
+                if value < document.start:
+                    raise ModelValidationError('End is before start')
+
+            @staticmethod
+            def validate_start(document, value):
+                calls.append(value)
+
+        calls = []
+        document = Range({'start': 1, 'end': 2})
+        document.apply_patch({'end': '3', 'unknown': 1})
+        self.assertEqual(document.end, 3)
+        # hooks of not patched fields are run as well
+        self.assertEqual(calls, [1, 1])
+
+        with self.assertRaises(ModelValidationError):
+            document.apply_patch({'end': 0})
+        with self.assertRaises(ModelValidationError):
+            document.apply_patch({'start': 5})
+        with self.assertRaises(ValueError):
+            document.apply_patch({'start': 'x'})
+
+
+class ConstructTest(TestCase):
+
+    def test_construct(self):
+        author = {'name': 'John', 'address': {'street': 'Baker', 'zip': 221},
+                  'phones': [1, 2]}
+        post = Post({
+            'title': 'Hi', 'author': author, 'tags': ['a'],
+            'comments': [{'body': 'x', 'author': author,
+                          'created': '2019-01-02T03:04:05Z',
+                          'favorite_by': [author]}]})
+        data = post.as_dict()
+
+        constructed = Post.construct(data)
+        self.assertEqual(constructed.as_dict(), data)
+        self.assertIsInstance(constructed.author, Person)
+        self.assertIsInstance(constructed.author.address, Address)
+        self.assertIsInstance(constructed.comments[0], Comment)
+        self.assertIsInstance(constructed.comments[0].favorite_by[0], Person)
+        self.assertEqual(constructed.comments[0].created,
+                         datetime(2019, 1, 2, 3, 4, 5))
+        constructed.tags.append('b')
+        self.assertEqual(constructed.tags, ['a', 'b'])
+
+        # documents are used as is
+        self.assertIs(Post.construct({'author': post.author}).author,
+                      post.author)
+
+    def test_no_validation(self):
+        person = Person.construct({'phones': ['x'], 'unknown': 1})
+        self.assertIsNone(person.name)
+        self.assertEqual(person.phones, ['x'])
+        self.assertIsInstance(person.address, Address)
+        self.assertNotIn('unknown', person.as_dict())
+
+        # defaults
+        first, second = Post.construct(), Post.construct()
+        self.assertEqual(first.tags, [])
+        first.tags.append('a')
+        self.assertEqual(second.tags, [])
+
+    def test_meta_options(self):
+        class User(Document):
+            name = CharField()
+            age = IntegerField()
+
+            class Meta:
+                ALLOW_EXTRA_FIELDS = True
+                OMIT_MISSED_FIELDS = True
+
+        user = User.construct({'name': 'John', 'role': 'admin'})
+        self.assertEqual(user.as_dict(), {'name': 'John', 'role': 'admin'})
+
+        person = SlottedPerson.construct({'name': 'John', 'phones': [1]})
+        self.assertEqual(person.as_dict(), {'name': 'John', 'phones': [1],
+                                            'address': {'street': None,
+                                                        'zip': None}})
+
+        class ValidatedUser(User):
+            class Meta:
+                CONSTRUCT_VALIDATION_RATE = 1
+
+        with self.assertRaises(ValueError):
+            ValidatedUser.construct({'age': 'x'})
+        self.assertEqual(ValidatedUser.construct({'age': '1'}).age, 1)
+
+        # Custom __init__ is respected
+        self.assertIsNotNone(MailboxItem.construct({}).received_at)
+
+        class Note(Document):
+            text = CharField()
+
+            def __init__(self, data=None):
+                super(Note, self).__init__(data)
+
+        self.assertEqual(Note.construct({'text': 'x'}).text, 'x')
+
+
 class DocumentToPythonTest(TestCase):
 
     def setUp(self):
@@ -655,6 +1214,107 @@ class DocumentToPythonTest(TestCase):
 
         self.assertDictEqual(post.as_dict(), get_json_fixture('post_2.json'))
 
+    def test_as_dict_with_meta_options(self):
+        class Message(Document):
+            text = CharField()
+            created = DateTimeField()
+            author = DocumentField(Person)
+            rate = FloatField(name='Interest Rate')
+
+            class Meta:
+                OMIT_MISSED_FIELDS = True
+                ALLOW_EXTRA_FIELDS = True
+
+        msg = Message(dict(created='2017-05-31T00:00:00Z',
+                           author={'name': 'John'}, level='INFO', extra=None))
+        self.assertDictEqual(msg.as_dict(), {
+            'created': '2017-05-31T00:00:00Z',
+            'author': {'name': 'John',
+                       'address': {'street': None, 'zip': None},
+                       'phones': []},
+            'level': 'INFO'})
+
+    def test_as_dict_with_custom_mapping_interface(self):
+        class Secret(Document):
+            login = CharField()
+            password = CharField()
+
+            def __iter__(self):
+                return (key for key in self._fields if key != 'password')
+
+        secret = Secret(dict(login='john', password='qwerty'))
+        self.assertDictEqual(secret.as_dict(), {'login': 'john'})
+
+
+class ToJsonTest(TestCase):
+
+    def test_to_json(self):
+        author = {'name': 'John', 'address': {'zip': 221}, 'phones': [1, 2]}
+        data = {
+            'title': u'"Hi" \u2603', 'tags': ['a'], 'author': author,
+            'comments': [{'body': 'x', 'author': author,
+                          'created': '2019-01-02T03:04:05Z'}]}
+        for post in (Post(data), Post.construct(data)):
+            self.assertEqual(json.loads(post.to_json()), post.as_dict())
+        self.assertIn(u'\u2603', Post(data).to_json(ensure_ascii=False))
+
+        person = SlottedPerson({'name': 'John', 'phones': [1]})
+        self.assertEqual(json.loads(person.to_json()), person.as_dict())
+
+    def test_field_types(self):
+        class Sample(Document):
+            class Meta:
+                ALLOW_EXTRA_FIELDS = True
+
+            count = IntegerField()
+            ratio = FloatField()
+            flag = BooleanField()
+            price = DecimalField()
+            created = DateTimeField(date_fmt='%d "%m" %Y')
+            numbers = ListField(of=float, compact=True)
+            meta = DictField()
+
+        sample = Sample({'count': 1, 'ratio': float('nan'), 'flag': False,
+                         'price': '1.10', 'created': '02 "01" 2019',
+                         'numbers': [0.5], 'meta': {'a': Decimal('2')},
+                         'extra': None})
+        result = json.loads(sample.to_json(), parse_float=Decimal)
+        self.assertNotEqual(result.pop('ratio'), sample.ratio)  # NaN
+        self.assertEqual(result, {
+            'count': 1, 'flag': False,
+            'price': Decimal('1.10'), 'created': '02 "01" 2019',
+            'numbers': [Decimal('0.5')], 'meta': {'a': Decimal('2.0')},
+            'extra': None})
+        result = json.loads(sample.to_json(decimal_as_string=True))
+        self.assertEqual((result['price'], result['meta']),
+                         ('1.10', {'a': '2'}))
+
+    def test_model_reference(self):
+        class CrewMember(Document):
+            name = CharField()
+
+        class Crew(Document):
+            members = ListField(of='CrewMember')
+
+        crew = Crew({'members': [{'name': u'J\xfcrgen'}, {}]})
+        field = Crew._fields['members']
+        self.assertEqual(field.to_python(crew.members),
+                         [{'name': u'J\xfcrgen'}, {'name': None}])
+        self.assertEqual(crew.to_json(),
+                         json.dumps(crew.as_dict(), separators=(',', ':')))
+
+    def test_omit_missed_fields(self):
+        class Sample(Document):
+            class Meta:
+                OMIT_MISSED_FIELDS = True
+                ALLOW_EXTRA_FIELDS = True
+
+            name = CharField()
+            address = DocumentField(Address)
+
+        for sample in (Sample(), Sample({'name': 'x', 'extra': 1})):
+            self.assertEqual(json.loads(sample.to_json()), sample.as_dict())
+
 
 class DocumentMetaOptionsTest(TestCase):
 
@@ -745,6 +1405,150 @@ class DocumentMetaOptionsTest(TestCase):
         self.assertEqual(user, {'name': 'Mr.Robot'})
 
 
+class SlottedUser(Document):
+    name = CharField()
+    age = IntegerField()
+
+    class Meta:
+        USE_SLOTS = True
+
+
+class SlotsStorageTest(TestCase):
+
+    def assert_no_instance_dict(self, func):
+        """Check that func doesn't create instance dicts of documents
+        which values are stored in slots only
+        """
+        documents = [SlottedUser(dict(name='John', age=i))
+                     for i in range(100)]
+        # warm up per-class caches
+        func(SlottedUser())
+        gc.collect()
+        tracemalloc.start()
+        try:
+            before = tracemalloc.get_traced_memory()[0]
+            for document in documents:
+                func(document)
+            gc.collect()
+            growth = tracemalloc.get_traced_memory()[0] - before
+        finally:
+            tracemalloc.stop()
+        self.assertLess(growth, 16 * len(documents))
+
+    def test_slots_storage(self):
+        class User(Document):
+            id = IntegerField(immutable=True)
+            name = CharField(required=True, max_length=10)
+            rate = FloatField(name='Interest Rate')
+
+            class Meta:
+                USE_SLOTS = True
+
+        self.assertEqual(sorted(User.__slots__),
+                         ['_changed_fields_slot', 'id', 'name', 'rate'])
+
+        user = User({'id': '1', 'name': 'John', 'Interest Rate': '1.5'})
+        self.assertEqual(user, {'id': 1, 'name': 'John', 'Interest Rate': 1.5})
+        self.assertEqual(user['Interest Rate'], 1.5)
+        self.assertEqual(user.rate, 1.5)
+        self.assertFalse(user.__dict__)
+
+        # Values are validated on set
+        user.name = 'Jack'
+        user['Interest Rate'] = '2'
+        self.assertEqual(user.as_dict(),
+                         {'id': 1, 'name': 'Jack', 'Interest Rate': 2.0})
+        with self.assertRaises(ValidationError):
+            user.name = 'J' * 11
+        with self.assertRaises(FieldRequiredError):
+            user.name = None
+        with self.assertRaises(ImmutableFieldError):
+            user.id = 2
+        self.assertEqual(user.name, 'Jack')
+
+    def test_slots_with_meta_options(self):
+        class Message(Document):
+            text = CharField()
+            level = CharField(default='INFO')
+
+            class Meta:
+                USE_SLOTS = True
+                OMIT_MISSED_FIELDS = True
+                ALLOW_EXTRA_FIELDS = True
+
+        msg = Message(dict(user='john'))
+        self.assertIsNone(msg.text)
+        self.assertEqual(msg, {'level': 'INFO', 'user': 'john'})
+        self.assertEqual(len(msg), 3)
+
+    def test_slots_inheritance(self):
+        class Base(Document):
+            name = CharField()
+
+        class User(Base):
+            id = IntegerField()
+
+            class Meta:
+                USE_SLOTS = True
+
+        class Admin(User):
+            name = CharField(default='admin')
+
+        self.assertEqual(Admin.__slots__, ())
+        admin = Admin(dict(id='1'))
+        self.assertEqual(admin, {'id': 1, 'name': 'admin'})
+        self.assertFalse(admin.__dict__)
+
+    def test_slots_immutable_document(self):
+        class User(ImmutableDocument):
+            name = CharField(default='John')
+
+            class Meta:
+                USE_SLOTS = True
+
+        user = User()
+        self.assertEqual(user.name, 'John')
+        with self.assertRaises(DocumentError):
+            user.name = 'Jorge'
+        self.assertEqual(copy.deepcopy(user), user)
+
+    def test_slots_copy_and_pickle(self):
+        person = SlottedPerson(dict(name='John', address={'zip': '1'},
+                                    phones=[1, 2]))
+        for copied in (copy.deepcopy(person),
+                       pickle.loads(pickle.dumps(person, 2))):
+            self.assertIsInstance(copied, SlottedPerson)
+            self.assertEqual(copied.as_dict(), person.as_dict())
+            self.assertIsNot(copied.address, person.address)
+
+        # Nested documents are copied on init
+        person_2 = SlottedPerson(dict(name='Jack', address=person.address))
+        self.assertEqual(person_2.address, {'street': None, 'zip': 1})
+
+    @skipIf(tracemalloc is None, 'python 3 only')
+    def test_slots_to_json(self):
+        self.assert_no_instance_dict(lambda document: document.to_json())
+
+    @skipIf(tracemalloc is None, 'python 3 only')
+    def test_slots_binary_dumps(self):
+        from simplemodels import binary
+        self.assert_no_instance_dict(binary.dumps)
+
+    @skipIf(tracemalloc is None, 'python 3 only')
+    def test_slots_changes_tracking(self):
+        self.assert_no_instance_dict(lambda document: document.is_dirty)
+        self.assert_no_instance_dict(lambda document: document.as_patch())
+
+        def change(document):
+            document.age = 1
+            self.assertEqual(document.changed_fields, {'age'})
+            document.mark_clean()
+            document.name = 'Jack'
+            document.revalidate()
+
+        self.assert_no_instance_dict(change)
+
+
 class ValidationTest(TestCase):
 
     def test_raise_validation_error(self):
@@ -816,6 +1620,105 @@ class ImmutableDocumentTest(TestCase):
         user.name = 'Jorge'
         self.assertEqual(user.name, 'Jorge')
 
+    def test_intern(self):
+        class Author(ImmutableDocument):
+            name = CharField()
+            age = IntegerField()
+            tags = SimpleField()
+
+            class Meta:
+                INTERN_CACHE_SIZE = 2
+
+        class Note(Document):
+            author = DocumentField(model=Author)
+            coauthors = ListField(of=Author)
+
+        data = {'name': 'John', 'age': 42, 'tags': ('a',)}
+        author = Author.intern(data)
+        self.assertIs(Author.intern(dict(reversed(list(data.items())))),
+                      author)
+        self.assertIsNot(Author.intern(dict(data, age='42')), author)
+
+        notes = [Note({'author': data, 'coauthors': [data, {'name': 'Mary'}]})
+                 for _ in range(3)]
+        for note in notes:
+            self.assertIs(note.author, author)
+            self.assertIs(note.coauthors[0], author)
+            self.assertIs(note.coauthors[1], notes[0].coauthors[1])
+        self.assertEqual(notes[0].as_dict()['author'], Author(data).as_dict())
+
+        # the cache is bounded
+        for age in range(10):
+            Author.intern({'age': age})
+        self.assertEqual(len(Author._intern_cache), 2)
+        self.assertIsNot(Author.intern(data), author)
+
+        # errors are not cached
+        for _ in range(2):
+            with self.assertRaises(ValueError):
+                Author.intern({'age': 'x'})
+
+        # unhashable data isn't interned
+        self.assertIsNot(Author.intern({'tags': [set()]}),
+                         Author.intern({'tags': [set()]}))
+
+        # documents with values which may be changed in place aren't
+        # interned
+        first = Author.intern({'tags': ['a']})
+        first.tags.append('b')
+        self.assertEqual(Author.intern({'tags': ['a']}).tags, ['a'])
+
+        class Plain(ImmutableDocument):
+            name = CharField()
+
+        self.assertIsNone(Plain._intern_cache)
+        self.assertIsNot(Plain.intern({}), Plain.intern({}))
+
+        with self.assertRaises(DocumentError):
+            class Mutable(Document):
+                class Meta:
+                    INTERN_CACHE_SIZE = 10
+
+        class Tag(Document):
+            name = CharField()
+
+        for field in (ListField(of=str), ListField(of=int, compact=True),
+                      DictField(), DocumentField(Tag)):
+            with self.assertRaises(DocumentError):
+                type('Tagged', (ImmutableDocument,), {
+                    'tags': field,
+                    'Meta': type('Meta', (), {'INTERN_CACHE_SIZE': 10})})
+
+    def test_intern_nested_mutable_values(self):
+        class Tags(ImmutableDocument):
+            names = ListField(of=str)
+
+        class Author(ImmutableDocument):
+            name = CharField()
+            tags = DocumentField(Tags)
+
+            class Meta:
+                INTERN_CACHE_SIZE = 10
+
+        first = Author.intern({'name': 'John', 'tags': {'names': ['a']}})
+        first.tags.names.append('b')
+        second = Author.intern({'name': 'John', 'tags': {'names': ['a']}})
+        self.assertIsNot(second, first)
+        self.assertEqual(second.tags.names, ['a'])
+
+        class Label(ImmutableDocument):
+            name = CharField()
+
+        class Book(ImmutableDocument):
+            label = DocumentField(Label)
+
+            class Meta:
+                INTERN_CACHE_SIZE = 10
+
+        # documents of immutable values are interned
+        book = Book.intern({'label': {'name': 'x'}})
+        self.assertIs(Book.intern({'label': {'name': 'x'}}), book)
+
 
 class JsonValidationTest(TestCase):
 
@@ -879,3 +1782,66 @@ class RegistryTest(TestCase):
 
         self.assertIn('User', registry)
         self.assertIs(registry['User'], User)
+        self.assertIs(registry['simplemodels.tests.test_models.User'], User)
+
+    def test_name_collision(self):
+        class Gadget(Document):
+            __module__ = 'simplemodels.tests.other_models'
+
+        other_gadget = Gadget
+
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter('always')
+
+            class Gadget(Document):
+                pass
+
+        self.assertEqual(len(caught), 1)
+        self.assertIn("full 'simplemodels.tests.test_models.Gadget' name",
+                      str(caught[0].message))
+        self.assertIs(registry['Gadget'], Gadget)
+        self.assertIs(registry['simplemodels.tests.other_models.Gadget'],
+                      other_gadget)
+
+    def test_model_reference(self):
+        class Part(Document):
+            name = CharField()
+
+        class Machine(Document):
+            part = DocumentField(model='Part')
+            parts = ListField(of='Part')
+            other = DocumentField(
+                model='simplemodels.tests.test_models.Part')
+
+        data = {'part': {'name': 'a'}, 'parts': [{'name': 'b'}],
+                'other': {'name': 'c'}}
+        machine = Machine(data)
+        self.assertIsInstance(machine.part, Part)
+        self.assertIsInstance(machine.parts[0], Part)
+        self.assertIsInstance(machine.other, Part)
+
+        # references are updated when the model is re-registered
+        class Part(Document):
+            name = IntegerField()
+
+        with self.assertRaises(ValueError):
+            Machine(data)
+        machine = Machine({'part': {'name': '1'}, 'parts': [{'name': 2}]})
+        self.assertIsInstance(machine.part, Part)
+        self.assertEqual(machine.part.name, 1)
+        self.assertIsInstance(machine.parts[0], Part)
+
+    def test_resolve_models(self):
+        class Gear(Document):
+            pass
+
+        class Engine(Document):
+            gear = DocumentField(model='Gear')
+            wheel = DocumentField(model='MissingWheel')
+
+        with self.assertRaises(ModelNotFoundError):
+            resolve_models()
+        self.assertIs(Engine._fields['gear']._reference.get(), Gear)
+
+        del registry['Engine']
+        del registry['simplemodels.tests.test_models.Engine']
@@ -0,0 +1,47 @@
+# -*- coding: utf-8 -*-
+import unittest
+
+from simplemodels.exceptions import FieldRequiredError
+from simplemodels.fields import SimpleField
+from simplemodels.models import Document
+from simplemodels.parallel import ProcessPoolExecutor, validate_parallel
+from simplemodels.tests.stub_models import Person
+
+
+@unittest.skipIf(ProcessPoolExecutor is None, "'futures' is not installed")
+class ParallelValidationTest(unittest.TestCase):
+
+    def test_validate_parallel(self):
+        rows = [{'name': 'John %d' % i, 'phones': [i]} for i in range(10)]
+        rows[3] = {'phones': [1]}
+        rows[8] = {'name': 'Mary', 'phones': ['x']}
+
+        people, errors = Person.validate_parallel(
+            iter(rows), chunk_size=3, max_workers=2)
+        expected, expected_errors = Person.validate_many(rows)
+
+        self.assertEqual([p and p.as_dict() for p in people],
+                         [p and p.as_dict() for p in expected])
+        self.assertEqual(sorted(errors), [3, 8])
+        self.assertIsInstance(errors[3], FieldRequiredError)
+        self.assertIsInstance(errors[8], ValueError)
+        self.assertIsInstance(people[0].address, Document)
+
+        self.assertEqual(Person.validate_parallel([]), ([], {}))
+
+    def test_executor(self):
+        rows = [{'name': 'John', 'phones': [1]}, {}]
+        with ProcessPoolExecutor(max_workers=2) as executor:
+            people, errors = validate_parallel(
+                Person, rows, chunk_size=1, executor=executor)
+        self.assertEqual(people[0].as_dict(), Person(rows[0]).as_dict())
+        self.assertIsInstance(people[0], Person)
+        self.assertIsNone(people[1])
+        self.assertEqual(list(errors), [1])
+
+    def test_local_model(self):
+        class Local(Document):
+            name = SimpleField()
+
+        with self.assertRaises(ValueError):
+            validate_parallel(Local, [{'name': 'x'}])
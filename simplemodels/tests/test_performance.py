@@ -1,9 +1,12 @@
 # -*- coding: utf-8 -*-
+import os
 import unittest
 import time
 from datetime import datetime
+from multiprocessing import cpu_count
 from simplemodels.exceptions import ModelValidationError
 from simplemodels.models import Document
+from simplemodels.parallel import ProcessPoolExecutor
 from simplemodels import fields
 import random
 import string
@@ -31,7 +34,11 @@ class User(Document):
 
     @classmethod
     def get_random_instance(cls):
-        return cls(
+        return cls(**cls.get_random_data())
+
+    @classmethod
+    def get_random_data(cls):
+        return dict(
             id=cls.get_id(),
             name=cls.get_name(),
             password=cls.get_password(),
@@ -79,6 +86,24 @@ class User(Document):
         return ['tag1', 'tag2', 'tag3']
 
 
+class Event(Document):
+    """CPU-heavy test model"""
+
+    created = fields.DateTimeField()
+    started = fields.DateTimeField()
+    finished = fields.DateTimeField()
+    updated = fields.DateTimeField()
+    name = fields.CharField(max_length=50)
+
+    @classmethod
+    def get_random_data(cls):
+        ts = '2019-%02d-%02dT%02d:%02d:00Z' % (
+            random.randint(1, 12), random.randint(1, 28),
+            random.randint(0, 23), random.randint(0, 59))
+        return dict(created=ts, started=ts, finished=ts, updated=ts,
+                    name=User.get_name())
+
+
 @unittest.skip('skip awhile')
 class PerformanceTest(unittest.TestCase):
     SAMPLE_SET = 10000
@@ -111,3 +136,57 @@ class PerformanceTest(unittest.TestCase):
         for _ in range(self.WRITE_OPS):
             pass
         elapsed = time.time() - t0
+
+
+@unittest.skipUnless(os.environ.get('SIMPLEMODELS_BENCHMARK'),
+                     'set SIMPLEMODELS_BENCHMARK=1 to run benchmarks')
+class BatchCreateBenchmark(unittest.TestCase):
+    SAMPLE_SET = 10000
+
+    def setUp(self):
+        self.rows = [User.get_random_data() for _ in range(self.SAMPLE_SET)]
+
+    def test_from_many(self):
+        t0 = time.time()
+        loop_result = [User(data) for data in self.rows]
+        loop_time = time.time() - t0
+
+        t0 = time.time()
+        batch_result = User.from_many(self.rows)
+        batch_time = time.time() - t0
+
+        self.assertEqual(len(loop_result), len(batch_result))
+        print('loop: {:.6f}s, from_many: {:.6f}s'.format(
+            loop_time, batch_time))
+
+    def test_validate_many(self):
+        t0 = time.time()
+        documents, errors = User.validate_many(self.rows)
+        print('validate_many: {:.6f}s'.format(time.time() - t0))
+        self.assertFalse(errors)
+
+
+@unittest.skipUnless(os.environ.get('SIMPLEMODELS_BENCHMARK'),
+                     'set SIMPLEMODELS_BENCHMARK=1 to run benchmarks')
+@unittest.skipIf(ProcessPoolExecutor is None, "'futures' is not installed")
+@unittest.skipIf(cpu_count() < 2, 'parallel validation requires 2+ CPUs')
+class ParallelValidationBenchmark(unittest.TestCase):
+    SAMPLE_SET = 100000
+
+    def setUp(self):
+        self.rows = [Event.get_random_data() for _ in range(self.SAMPLE_SET)]
+
+    def test_scaling(self):
+        t0 = time.time()
+        Event.validate_many(self.rows)
+        print('validate_many: {:.6f}s'.format(time.time() - t0))
+
+        for workers in (1, 2, 4, 8):
+            if workers > cpu_count():
+                break
+            t0 = time.time()
+            documents, errors = Event.validate_parallel(
+                self.rows, max_workers=workers)
+            print('validate_parallel, {} workers: {:.6f}s'.format(
+                workers, time.time() - t0))
+            self.assertFalse(errors)
@@ -0,0 +1,126 @@
+# -*- coding: utf-8 -*-
+import binascii
+import unittest
+from datetime import datetime
+
+from simplemodels.exceptions import DocumentError
+from simplemodels.fields import BooleanField, CharField, DateTimeField, \
+    FloatField, IntegerField, ListField
+from simplemodels.models import Document
+from simplemodels.records import RecordArray, RecordLayout, RecordView
+
+
+class Reading(Document):
+    sensor = CharField(max_length=8)
+    value = FloatField()
+    count = IntegerField()
+    is_valid = BooleanField(default=True)
+    created = DateTimeField()
+
+
+FINGERPRINT = b'e93f5f25217ed45d'
+
+ROWS = [
+    {'sensor': u'tëmp', 'value': 1.5, 'count': -2 ** 63,
+     'created': datetime(1969, 12, 31, 23, 59, 59, 999999)},
+    {'sensor': u'', 'value': None, 'count': 7, 'is_valid': False},
+    {},
+]
+
+
+class RecordsTest(unittest.TestCase):
+
+    def setUp(self):
+        self.layout = RecordLayout(Reading)
+        self.readings = [Reading(row) for row in ROWS]
+
+    def test_layout(self):
+        # mask, 8 chars of 4 bytes, double, long long, bool, datetime
+        self.assertEqual(self.layout.size, 8 + 32 + 8 + 8 + 1 + 8)
+        self.assertEqual(RecordLayout(Reading, char_size=1).size, 41)
+        # the same on python 2 and 3
+        self.assertEqual([field[0] for field in self.layout._fields],
+                         ['count', 'created', 'is_valid', 'sensor', 'value'])
+        self.assertEqual(binascii.hexlify(self.layout.fingerprint),
+                         FINGERPRINT)
+        self.assertNotEqual(RecordLayout(Reading, char_size=1).fingerprint,
+                            self.layout.fingerprint)
+
+        class Post(Document):
+            title = CharField()
+
+        with self.assertRaises(DocumentError):
+            RecordLayout(Post)
+
+        class Post(Document):
+            tags = ListField(of=str)
+
+        with self.assertRaises(DocumentError):
+            RecordLayout(Post)
+
+    def test_pack(self):
+        for reading in self.readings:
+            record = self.layout.pack(reading)
+            self.assertEqual(len(record), self.layout.size)
+            self.assertEqual(self.layout.unpack(record).as_dict(),
+                             reading.as_dict())
+
+        with self.assertRaises(ValueError):
+            RecordLayout(Reading, char_size=1).pack(
+                Reading({'sensor': u'ëëëëë'}))
+        with self.assertRaises(ValueError):
+            self.layout.pack(Reading({'count': 2 ** 63}))
+
+    def test_views(self):
+        records = self.layout.pack_many(self.readings)
+        self.assertEqual(len(records), 3)
+        self.assertEqual([view.as_data() for view in records],
+                         [self.layout.unpack_data(self.layout.pack(reading))
+                          for reading in self.readings])
+
+        view = records[0]
+        self.assertIsInstance(view, RecordView)
+        self.assertEqual(view.sensor, u'tëmp')
+        self.assertEqual(view.count, -2 ** 63)
+        self.assertEqual(view.created, self.readings[0].created)
+        self.assertIsNone(records[1].value)
+        self.assertIs(records[1].is_valid, False)
+        self.assertIsNone(records[-1].sensor)
+        self.assertEqual(records[0], records[0])
+        self.assertNotEqual(records[0], records[1])
+        self.assertFalse(hasattr(view, '__dict__'))
+        with self.assertRaises(AttributeError):
+            view.count = 1
+        with self.assertRaises(IndexError):
+            records[3]
+
+        self.assertEqual([reading.as_dict() for reading
+                          in records.to_documents()],
+                         [reading.as_dict() for reading in self.readings])
+        self.assertEqual(records[0].to_document().as_dict(),
+                         self.readings[0].as_dict())
+
+    def test_array(self):
+        records = self.layout.pack_many(self.readings)
+        self.assertEqual(records.column('count'), [-2 ** 63, 7, None])
+        self.assertEqual(records.column('sensor'), [u'tëmp', u'', None])
+        with self.assertRaises(KeyError):
+            records.column('unknown')
+
+        # slices and arrays over the same buffer share it
+        tail = records[1:]
+        self.assertEqual(len(tail), 2)
+        self.assertEqual(tail[0].count, 7)
+        buf = bytearray(records.buffer)
+        records = RecordArray(self.layout, buf)
+        self.layout.pack_into(buf, 0, self.readings[1])
+        self.assertEqual(records[0].count, 7)
+
+        with self.assertRaises(ValueError):
+            RecordArray(self.layout, buf[1:])
+
+        records = RecordArray(self.layout, buf, self.layout.fingerprint)
+        self.assertEqual(len(records), 3)
+        with self.assertRaises(DocumentError):
+            RecordArray(self.layout, buf,
+                        RecordLayout(Reading, char_size=1).fingerprint)
@@ -0,0 +1,140 @@
+# -*- coding: utf-8 -*-
+import copy
+import os
+import pickle
+import shutil
+import tempfile
+import unittest
+
+from simplemodels.exceptions import DocumentError
+from simplemodels.fields import BooleanField, CharField, IntegerField
+from simplemodels.models import Document
+from simplemodels.store import StoredDocument, StoreReader, StoreWriter
+from simplemodels.tests.stub_models import Post
+
+
+class StoreTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp_dir, 'posts.sms')
+        self.posts = [
+            Post({'title': u'Привет %d' % i, 'tags': ['a'] * i,
+                  'author': {'name': 'John'}})
+            for i in range(5)]
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_read(self):
+        with StoreWriter(self.path, Post) as writer:
+            writer.extend(self.posts[:3])
+        with StoreWriter(self.path, Post) as writer:
+            self.assertEqual(writer.append(self.posts[3]), 3)
+            writer.append(self.posts[4])
+
+        with StoreReader(self.path, Post) as posts:
+            self.assertEqual(len(posts), 5)
+            post = posts[1]
+            self.assertIsInstance(post, StoredDocument)
+            self.assertIsNone(post._document)
+            self.assertEqual(post.title, u'Привет 1')
+            self.assertEqual(post.author.name, 'John')
+            self.assertEqual(post['tags'], ['a'])
+            self.assertEqual(posts[-1].document.as_dict(),
+                             self.posts[-1].as_dict())
+            self.assertEqual([post.as_dict() for post in posts],
+                             [post.as_dict() for post in self.posts])
+            self.assertEqual([post.index for post in posts[3:]], [3, 4])
+            with self.assertRaises(IndexError):
+                posts[5]
+
+    def test_copy(self):
+        with StoreWriter(self.path, Post) as writer:
+            writer.extend(self.posts[:2])
+
+        with StoreReader(self.path, Post) as posts:
+            post = posts[1]
+            with self.assertRaises(AttributeError):
+                post._missing
+            result = copy.copy(post)
+            self.assertIsNot(result, post)
+            self.assertEqual(result.index, 1)
+            self.assertEqual(result.title, u'Привет 1')
+            self.assertIsNone(post._document)
+            self.assertIs(copy.copy(result).document, result.document)
+            with self.assertRaises(TypeError):
+                pickle.dumps(post)
+            self.assertEqual(pickle.loads(pickle.dumps(post.document)),
+                             post.document)
+
+    def test_empty(self):
+        StoreWriter(self.path, Post).close()
+        with StoreReader(self.path, Post) as posts:
+            self.assertEqual(len(posts), 0)
+            self.assertEqual(list(posts), [])
+
+    def test_recover(self):
+        with StoreWriter(self.path, Post) as writer:
+            writer.extend(self.posts[:2])
+        size = os.path.getsize(self.path)
+        # a record which isn't indexed and a part of the index entry
+        with open(self.path, 'ab') as fp:
+            fp.write(b'\x01\x02')
+        with open(self.path + '.idx', 'ab') as fp:
+            fp.write(b'\x01')
+
+        with StoreWriter(self.path, Post) as writer:
+            self.assertEqual(os.path.getsize(self.path), size)
+            writer.append(self.posts[2])
+        with StoreReader(self.path, Post) as posts:
+            self.assertEqual([post.title for post in posts],
+                             [post.title for post in self.posts[:3]])
+
+    def test_index_after_data(self):
+        class Flag(Document):
+            on = BooleanField()
+
+        with StoreWriter(self.path, Flag) as writer:
+            for _ in range(StoreWriter.INDEX_BUFFER_SIZE + 500):
+                writer.append(Flag({'on': True}))
+            # index on the disk refers to the written data only
+            with StoreReader(self.path, Flag) as flags:
+                self.assertEqual(len(flags), StoreWriter.INDEX_BUFFER_SIZE)
+                self.assertIs(flags[-1].on, True)
+        with StoreReader(self.path, Flag) as flags:
+            self.assertEqual(len(flags), StoreWriter.INDEX_BUFFER_SIZE + 500)
+
+    def test_recover_lost_data(self):
+        with StoreWriter(self.path, Post) as writer:
+            writer.extend(self.posts[:2])
+        size = os.path.getsize(self.path)
+        # index entries of the data which didn't reach the disk
+        with open(self.path + '.idx', 'ab') as fp:
+            fp.write(b'\xff' * 8 * 2)
+
+        with StoreReader(self.path, Post) as posts:
+            self.assertEqual(len(posts), 2)
+        StoreWriter(self.path, Post).close()
+        self.assertEqual(os.path.getsize(self.path), size)
+        self.assertEqual(os.path.getsize(self.path + '.idx'), 8 * 2)
+
+    def test_incompatible_store(self):
+        class Item(Document):
+            name = CharField()
+
+        StoreWriter(self.path, Item).close()
+
+        class Item(Document):
+            name = CharField()
+            count = IntegerField()
+
+        with self.assertRaises(DocumentError):
+            StoreWriter(self.path, Item)
+        with self.assertRaises(DocumentError):
+            StoreReader(self.path, Item)
+
+        with open(self.path, 'wb') as fp:
+            fp.write(b'{}')
+        with self.assertRaises(ValueError):
+            StoreReader(self.path, Item)
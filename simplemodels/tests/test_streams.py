@@ -0,0 +1,175 @@
+# -*- coding: utf-8 -*-
+import gzip
+import io
+import json
+import os
+import tempfile
+import unittest
+
+import six
+
+from simplemodels.exceptions import FieldRequiredError
+from simplemodels.fields import CharField
+from simplemodels.models import Document
+from simplemodels.streams import iter_json
+from simplemodels.tests.stub_models import Person
+
+
+ROWS = [
+    {'name': u'John', 'address': {'street': u'Baker', 'zip': 221},
+     'phones': [123456789, 42]},
+    {'name': u'Jürgen', 'address': None, 'phones': []},
+    {'name': u'Mary', 'address': {'street': None, 'zip': None},
+     'phones': [1.5e10, -7]},
+]
+
+
+def dumps(value, **kwargs):
+    return six.text_type(json.dumps(value, **kwargs))
+
+
+class IterJsonTest(unittest.TestCase):
+
+    def assert_parsed(self, text, expected):
+        # Small chunks make values cross the chunks boundaries
+        for chunk_size in (1, 3, 7, 4096):
+            self.assertEqual(
+                list(iter_json(io.StringIO(text), chunk_size=chunk_size)),
+                expected)
+            self.assertEqual(
+                list(iter_json(io.BytesIO(text.encode('utf-8')),
+                               chunk_size=chunk_size)),
+                expected)
+
+    def test_ndjson(self):
+        text = u'\n'.join(dumps(row) for row in ROWS) + u'\n'
+        self.assert_parsed(text, ROWS)
+        self.assert_parsed(u'12345\n{"a": 1}  {"b": true}\n\n', [
+            12345, {'a': 1}, {'b': True}])
+        self.assert_parsed(u'', [])
+
+    def test_array(self):
+        self.assert_parsed(dumps(ROWS, indent=2), ROWS)
+        self.assert_parsed(u' [ ] ', [])
+        self.assert_parsed(u'[12345,\n678 ]\n', [12345, 678])
+        self.assert_parsed(u'﻿[{"name": "x"}]', [{'name': 'x'}])
+
+    def test_malformed_json(self):
+        for text in (u'[1, 2', u'[1 2]', u'[1, 2] 3', u'{"a": 1',
+                     u'{"a": 1}}'):
+            with self.assertRaises(ValueError):
+                list(iter_json(io.StringIO(text), chunk_size=2))
+
+    @unittest.skipIf(six.PY2, 'python 2 json errors have no position')
+    def test_malformed_line(self):
+        # the rest of the file isn't read
+        fp = io.StringIO(u'{"a": x}\n' + u'{"a": 1}\n' * 10000)
+        with self.assertRaises(ValueError):
+            list(iter_json(fp, chunk_size=64))
+        self.assertLessEqual(fp.tell(), 64)
+
+        fp = io.StringIO(u'[{"a": x}, ' + u'{"a": 1}, ' * 10000 + u'{}]')
+        with self.assertRaises(ValueError):
+            list(iter_json(fp, chunk_size=64))
+        self.assertLessEqual(fp.tell(), 64)
+
+    def test_values_across_chunks(self):
+        # values are cut by the chunks boundaries at any position
+        text = dumps([u'abc\u00e9', True, False, None, -1.5, {'a': [1]}])
+        for chunk_size in range(1, 8):
+            self.assertEqual(
+                list(iter_json(io.StringIO(text), chunk_size=chunk_size)),
+                [u'abc\u00e9', True, False, None, -1.5, {'a': [1]}])
+
+
+class DocumentStreamsTest(unittest.TestCase):
+
+    def test_iter_from_file(self):
+        text = dumps(ROWS)
+        people = Person.iter_from_file(io.StringIO(text), chunk_size=16)
+        self.assertFalse(isinstance(people, list))
+        self.assertEqual([person.as_dict() for person in people],
+                         [Person(row).as_dict() for row in ROWS])
+
+        with self.assertRaises(FieldRequiredError):
+            list(Person.iter_from_file(io.StringIO(u'{"name": "x"}\n{}')))
+
+    def test_from_json(self):
+        for row in ROWS:
+            text = dumps(dict(row, unknown={'a': 1}))
+            for value in (text, text.encode('utf-8')):
+                person = Person.from_json(value)
+                self.assertEqual(person.as_dict(), Person(row).as_dict())
+                self.assertEqual(Person.from_json(person.to_json()).as_dict(),
+                                 person.as_dict())
+
+        with self.assertRaises(FieldRequiredError):
+            Person.from_json(u'{}')
+        with self.assertRaises(ValueError):
+            Person.from_json(u'{"name": ')
+
+    def test_from_json_custom_init(self):
+        class Note(Document):
+            text = CharField()
+
+            def __init__(self, data=None):
+                super(Note, self).__init__(data)
+
+        self.assertEqual(Note.from_json(u'{"text": "x"}').text, 'x')
+
+    def test_iter_from_file_custom_init(self):
+        class Note(Document):
+            text = CharField()
+
+            def __init__(self, data=None):
+                super(Note, self).__init__(data)
+
+        notes = Note.iter_from_file(io.StringIO(u'{"text": "x"}\n'))
+        self.assertEqual([note.text for note in notes], ['x'])
+
+    def test_dump_to_file(self):
+        people = Person.from_many(ROWS)
+        for array in (False, True):
+            fd, path = tempfile.mkstemp()
+            os.close(fd)
+            try:
+                with open(path, 'w') as fp:
+                    count = Person.dump_to_file(iter(people), fp, array=array)
+                self.assertEqual(count, len(ROWS))
+
+                with open(path, 'rb') as fp:
+                    content = fp.read().decode('utf-8')
+                    fp.seek(0)
+                    loaded = list(Person.iter_from_file(fp))
+            finally:
+                os.remove(path)
+
+            self.assertEqual(content.startswith('['), array)
+            self.assertEqual([person.as_dict() for person in loaded],
+                             [person.as_dict() for person in people])
+
+        # binary sinks
+        fp = io.BytesIO()
+        Person.dump_to_file(people, fp)
+        fp.seek(0)
+        self.assertEqual([person.as_dict() for person
+                          in Person.iter_from_file(fp)],
+                         [person.as_dict() for person in people])
+        buf = io.BytesIO()
+        with gzip.GzipFile(fileobj=buf, mode='wb') as fp:
+            Person.dump_to_file(people, fp, ensure_ascii=False)
+        buf.seek(0)
+        with gzip.GzipFile(fileobj=buf, mode='rb') as fp:
+            self.assertEqual([person.as_dict() for person
+                              in Person.iter_from_file(fp)],
+                             [person.as_dict() for person in people])
+
+        fp = six.StringIO()
+        self.assertEqual(Person.dump_to_file([], fp, array=True), 0)
+        self.assertEqual(json.loads(fp.getvalue()), [])
+
+        # json.dumps parameters which the document encoder doesn't support
+        fp = six.StringIO()
+        Person.dump_to_file(people, fp, array=True, indent=2)
+        self.assertEqual(json.loads(fp.getvalue()),
+                         [person.as_dict() for person in people])
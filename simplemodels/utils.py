@@ -1,6 +1,15 @@
 # -*- coding: utf-8 -*-
 """Validator helpers"""
-from simplemodels.exceptions import ValidationError
+import threading
+import warnings
+from contextlib import contextmanager
+
+from simplemodels.exceptions import AsyncValidationWarning, ValidationError
+
+try:
+    from asyncio import iscoroutinefunction
+except ImportError:  # python 2
+    iscoroutinefunction = None
 
 
 def is_instance(class_or_type_or_tuple):
@@ -36,3 +45,57 @@ def is_document(value):
         return issubclass(value, Document)
     except TypeError:
         return False
+
+
+def owned_data_kwargs(model, kwargs):
+    """Get init parameters which hand the data over to the document without
+    a copy, see `Document.__init__`. Documents with custom `__init__` may not
+    accept the `copy_data` parameter, they get the parameters as is.
+
+    :param model: Document class
+    :param kwargs: init parameters
+    :return: dict
+    """
+    if getattr(model, '_construct_fields', None) is None:
+        return kwargs
+    return dict(kwargs, copy_data=False)
+
+
+def is_coroutine_function(func):
+    """Check if func is a coroutine function, e.g. `async def` function
+
+    :param func: callable
+    :return: bool, always False on python 2
+    """
+    return iscoroutinefunction is not None and iscoroutinefunction(func)
+
+
+_async_state = threading.local()
+
+
+def warn_async_skipped(name, stacklevel=1):
+    """Warn that coroutine validators are skipped by the synchronous
+    validation, unless they're awaited afterwards, see `awaiting_async`.
+    Ignore `AsyncValidationWarning` by the warnings filter to opt out.
+
+    :param name: model or field name
+    :param stacklevel: stack level of the caller, see `warnings.warn`
+    """
+    if not getattr(_async_state, 'awaiting', False):
+        warnings.warn(
+            '%s has coroutine validators, they are skipped by the '
+            'synchronous validation, use `acreate` instead' % name,
+            AsyncValidationWarning, stacklevel=stacklevel + 1)
+
+
+@contextmanager
+def awaiting_async():
+    """Context of the synchronous part of the async validation, coroutine
+    validators are awaited after it
+    """
+    awaiting = getattr(_async_state, 'awaiting', False)
+    _async_state.awaiting = True
+    try:
+        yield
+    finally:
+        _async_state.awaiting = awaiting